@@ -2,10 +2,9 @@
 """
 Octopus - Delta-Neutral Trading Bot for Aster DEX
 """
-import time
 from loguru import logger
 from octopus.database.db import init_db
-from octopus.strategy.delta_neutral import DeltaNeutralStrategy
+from octopus.strategy.runner import StrategyRunner
 from octopus.config.settings import settings
 
 def setup_logging():
@@ -25,32 +24,23 @@ def main():
     logger.info(f"Capital: ${settings.capital_usdt}")
     logger.info(f"Leverage: {settings.leverage}x")
     logger.info(f"Target Daily Volume: ${settings.daily_volume_target}")
+    logger.info(f"Trading Pairs: {', '.join(settings.trading_pairs)}")
     logger.info("=" * 60)
     
     # Initialize database
     init_db()
     
-    # Initialize strategy
-    strategy = DeltaNeutralStrategy()
+    # One strategy per trading pair, sharing the client and streams
+    runner = StrategyRunner()
     
-    # Main loop - run every 10 minutes
-    cycle_interval_seconds = 600  # 10 minutes
+    # Cycles run every cycle_interval_sec; rotations and stream events wake strategies in between
+    logger.info(f"Cycle interval: {settings.cycle_interval_sec} seconds")
     
     try:
-        while True:
-            try:
-                strategy.run_cycle()
-            except Exception as e:
-                logger.error(f"Cycle error: {e}")
-                logger.info("Continuing in 60 seconds...")
-                time.sleep(60)
-                continue
-            
-            logger.info(f"Sleeping for {cycle_interval_seconds} seconds...")
-            time.sleep(cycle_interval_seconds)
-            
+        runner.run()
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
+        runner.stop()
     except Exception as e:
         logger.critical(f"Fatal error: {e}")
         raise
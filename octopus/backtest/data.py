@@ -0,0 +1,104 @@
+from typing import NamedTuple, Optional, Sequence, Tuple
+import os
+
+import numpy as np
+import pandas as pd
+
+from octopus.data.store import ColumnStore
+
+TIME_COLUMNS = ("time", "timestamp", "open_time", "E", "T", "fundingTime", "funding_time")
+PRICE_COLUMNS = ("mark_price", "markPrice", "p", "close", "price")
+FUNDING_COLUMNS = ("funding_rate", "fundingRate", "r", "rate")
+
+
+class MarketData(NamedTuple):
+    symbol: str
+    times: np.ndarray          # event times, ms
+    prices: np.ndarray         # mark (or trade/close) price at each time
+    funding_times: np.ndarray  # funding settlement times, ms
+    funding_rates: np.ndarray
+
+
+def _read(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+def _column(frame: pd.DataFrame, candidates: Sequence[str], path: str) -> np.ndarray:
+    for name in candidates:
+        if name in frame.columns:
+            return frame[name].to_numpy()
+    raise ValueError(f"{path}: none of the columns {', '.join(candidates)} found")
+
+
+def load_market_data(
+    symbol: str,
+    prices_path: str,
+    funding_path: Optional[str] = None,
+    step_ms: int = 1000
+) -> MarketData:
+    """
+    Load a price series and optional funding history from CSV or Parquet, or
+    from a market data store directory written by the recorder.
+
+    The price file may hold mark price updates, aggTrades or klines; the time
+    and price columns are picked by name. Prices are downsampled to the last
+    value per `step_ms` bucket, which keeps a month of aggTrades to a few
+    million ticks without changing what the strategy can observe. A store's
+    mark price stream also yields the funding settlements, unless
+    `funding_path` is given.
+    """
+    recorded_funding = None
+    if os.path.isdir(prices_path):
+        times, prices, recorded_funding = _read_recorded(symbol, prices_path)
+    else:
+        frame = _read(prices_path)
+        times = _column(frame, TIME_COLUMNS, prices_path).astype(np.int64)
+        prices = _column(frame, PRICE_COLUMNS, prices_path).astype(np.float64)
+        order = np.argsort(times, kind="stable")
+        times, prices = times[order], prices[order]
+
+    if step_ms > 1 and len(times):
+        buckets = times // step_ms
+        last = np.append(np.flatnonzero(np.diff(buckets)), len(times) - 1)
+        times, prices = times[last], prices[last]
+
+    funding_times = np.empty(0, dtype=np.int64)
+    funding_rates = np.empty(0)
+    if recorded_funding is not None:
+        funding_times, funding_rates = recorded_funding
+    if funding_path:
+        funding = _read(funding_path)
+        funding_times = _column(funding, TIME_COLUMNS, funding_path).astype(np.int64)
+        funding_rates = _column(funding, FUNDING_COLUMNS, funding_path).astype(np.float64)
+        order = np.argsort(funding_times, kind="stable")
+        funding_times, funding_rates = funding_times[order], funding_rates[order]
+
+    return MarketData(symbol, times, prices, funding_times, funding_rates)
+
+
+def _read_recorded(symbol: str, root: str) -> Tuple[np.ndarray, np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Mark prices and settled funding from a market data store: the recorded
+    mark price stream if there is one, else downloaded 1m mark (or trade)
+    klines at their close times; downloaded funding history when present.
+    """
+    store = ColumnStore(root)
+    mark = store.read(symbol, "mark")
+    if len(mark["time"]):
+        times, prices = mark["time"], mark["price"]
+        # A funding period settled when nextFundingTime moves on, at the last rate quoted for it
+        next_funding = mark["next_funding_time"]
+        settled = np.flatnonzero(np.diff(next_funding) > 0)
+        funding_times = next_funding[settled].astype(np.int64)
+        funding_rates = mark["funding_rate"][settled].astype(np.float64)
+    else:
+        klines = store.read(symbol, "mark_kline_1m")
+        if not len(klines["time"]):
+            klines = store.read(symbol, "kline_1m")
+        times, prices = klines["close_time"], klines["close"]
+        funding_times, funding_rates = np.empty(0, dtype=np.int64), np.empty(0)
+
+    funding = store.read(symbol, "funding")
+    if len(funding["time"]):
+        funding_times, funding_rates = funding["time"], funding["funding_rate"]
+    return times, prices, (funding_times, funding_rates)
@@ -0,0 +1,155 @@
+from loguru import logger
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional
+import random
+
+from octopus.backtest.data import MarketData
+from octopus.backtest.exchange import DEFAULT_SLIPPAGE_BPS, DEFAULT_TAKER_FEE, SimulatedExchange
+from octopus.config.settings import settings
+from octopus.database.db import configure_db, init_db
+from octopus.strategy.delta_neutral import DeltaNeutralStrategy
+from octopus.utils.scheduler import Scheduler, SimulatedClock
+
+# Between cycles the live bot checks risk on every mark price; the replay does it at this interval
+RISK_CHECK_INTERVAL_SEC = 60
+
+# Settings that only matter for a live process (a replay has nothing to recover);
+# the in-memory database lives on one connection, so writes stay on the replay thread
+BACKTEST_SETTINGS = {"checkpoint_interval_sec": 0, "journal_enabled": False, "fill_reconcile_enabled": False}
+
+
+@contextmanager
+def override_settings(params: Dict[str, Any]):
+    """Temporarily set strategy parameters on the global settings"""
+    previous = {}
+    for name, value in params.items():
+        if not hasattr(settings, name):
+            raise ValueError(f"Unknown setting: {name}")
+        previous[name] = getattr(settings, name)
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+
+def run_backtest(
+    data: MarketData,
+    params: Optional[Dict[str, Any]] = None,
+    taker_fee: float = DEFAULT_TAKER_FEE,
+    slippage_bps: float = DEFAULT_SLIPPAGE_BPS,
+    symbol_info: Optional[dict] = None,
+    seed: int = 0,
+    quiet: bool = True
+) -> Dict[str, Any]:
+    """
+    Replay `data` through DeltaNeutralStrategy and return summary metrics.
+
+    The strategy and RiskManager are the live code: only the exchange is
+    simulated, time comes from a SimulatedClock driven tick by tick, and
+    trades/positions go to a throwaway in-memory database.
+    """
+    params = dict(params or {})
+    if len(data.times) == 0:
+        raise ValueError(f"No price data for {data.symbol}")
+    if quiet:
+        logger.disable("octopus")
+    random.seed(seed)
+    try:
+        with override_settings({**BACKTEST_SETTINGS, **params}):
+            configure_db("sqlite://")
+            init_db()
+            return _replay(data, params, taker_fee, slippage_bps, symbol_info)
+    finally:
+        if quiet:
+            logger.enable("octopus")
+
+
+def _replay(
+    data: MarketData,
+    params: Dict[str, Any],
+    taker_fee: float,
+    slippage_bps: float,
+    symbol_info: Optional[dict]
+) -> Dict[str, Any]:
+    start_ms = int(data.times[0])
+    clock = SimulatedClock(start=datetime.utcfromtimestamp(start_ms / 1000))
+    scheduler = Scheduler(clock=clock)
+    exchange = SimulatedExchange(data.symbol, settings.capital_usdt, taker_fee, slippage_bps, symbol_info)
+    exchange.set_mark(float(data.prices[0]), start_ms)
+
+    strategy = DeltaNeutralStrategy(
+        symbol=data.symbol, client=exchange, clock=clock, snapshot=exchange.get_account_snapshot()
+    )
+    strategy.attach(scheduler)
+    scheduler.every(RISK_CHECK_INTERVAL_SEC, strategy._check_risk, name="risk check")
+    # A triggered stop reaches the live bot as an ACCOUNT_UPDATE; react the same way
+    exchange.on_position_change = lambda: scheduler.post(strategy.trigger_cycle)
+
+    funding_times = data.funding_times
+    funding_rates = data.funding_rates
+    next_funding = 0
+    peak_equity = exchange.equity()
+    max_drawdown_pct = 0.0
+    liquidated = False
+
+    for time_ms, price in zip(data.times.tolist(), data.prices.tolist()):
+        scheduler.run_until((time_ms - start_ms) / 1000)
+        exchange.set_mark(price, time_ms)
+        while next_funding < len(funding_times) and funding_times[next_funding] <= time_ms:
+            exchange.settle_funding(float(funding_rates[next_funding]))
+            next_funding += 1
+
+        equity = exchange.equity()
+        if equity > peak_equity:
+            peak_equity = equity
+        elif peak_equity > 0:
+            max_drawdown_pct = max(max_drawdown_pct, (peak_equity - equity) / peak_equity * 100)
+        if equity <= 0:
+            liquidated = True
+            break
+
+    days = (data.times[-1] - start_ms) / 86_400_000 or 1.0
+    final_equity = exchange.equity()
+    return {
+        "symbol": data.symbol,
+        "params": params,
+        "days": round(float(days), 3),
+        "final_equity": final_equity,
+        "return_pct": (final_equity - settings.capital_usdt) / settings.capital_usdt * 100,
+        "max_drawdown_pct": max_drawdown_pct,
+        "realized_pnl": exchange.realized_pnl,
+        "unrealized_pnl": exchange.unrealized_pnl(),
+        "fees": exchange.fees,
+        "funding": exchange.funding,
+        "volume": exchange.volume,
+        "volume_per_day": exchange.volume / float(days),
+        "fills": exchange.fills,
+        "pairs_opened": exchange.pairs_opened,
+        "stops_triggered": exchange.stops_triggered,
+        "liquidated": liquidated,
+    }
+
+
+def param_grid(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of parameter values: {"a": [1, 2], "b": [3]} -> [{"a": 1, "b": 3}, {"a": 2, "b": 3}]"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def run_grid(
+    data: MarketData,
+    grid: Dict[str, Iterable[Any]],
+    processes: Optional[int] = None,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """Run one backtest per parameter combination across a process pool"""
+    combos = param_grid(grid)
+    logger.info(f"Backtesting {len(combos)} parameter sets on {data.symbol} ({len(data.times)} ticks)")
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(run_backtest, data, params, **kwargs) for params in combos]
+        return [future.result() for future in futures]
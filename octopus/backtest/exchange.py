@@ -0,0 +1,274 @@
+from loguru import logger
+from typing import Any, Callable, Dict, List, Optional
+import itertools
+
+from octopus.exchange.aster_client import PAIR_LEGS
+from octopus.exchange.symbol_info import SymbolFilters
+
+DEFAULT_TAKER_FEE = 0.00035
+DEFAULT_SLIPPAGE_BPS = 1.0
+
+
+def default_symbol_info(symbol: str) -> dict:
+    """exchangeInfo entry used when the backtest isn't given the real one"""
+    return {
+        "symbol": symbol,
+        "filters": [
+            {"filterType": "PRICE_FILTER", "tickSize": "0.1", "minPrice": "0.1", "maxPrice": "1000000"},
+            {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "1000"},
+            {"filterType": "MARKET_LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "120"},
+            {"filterType": "MIN_NOTIONAL", "notional": "5"},
+        ],
+    }
+
+
+class SimulatedExchange:
+    """
+    Stand-in for AsterExchangeClient that fills against a replayed price.
+
+    Implements the methods the strategy uses. Market orders fill at once at the
+    current mark plus modelled slippage and pay the taker fee; positions are
+    kept per position side (hedge mode) with average entry prices; funding is
+    settled on the position notional; closePosition stops trigger on the mark.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        capital: float,
+        taker_fee: float = DEFAULT_TAKER_FEE,
+        slippage_bps: float = DEFAULT_SLIPPAGE_BPS,
+        symbol_info: Optional[dict] = None
+    ):
+        self.symbol = symbol
+        self.filters = SymbolFilters(symbol_info or default_symbol_info(symbol))
+        self.taker_fee = taker_fee
+        self.slippage = slippage_bps / 10000
+        self.market_cache = None
+        self.account_state = None
+        self.on_position_change: Optional[Callable[[], None]] = None
+
+        self.mark = 0.0
+        self.time_ms = 0
+        self.wallet = capital
+        self.positions: Dict[str, List[float]] = {"LONG": [0.0, 0.0], "SHORT": [0.0, 0.0]}  # [qty, entry]
+        self.stops: Dict[int, dict] = {}
+        self._order_ids = itertools.count(1)
+
+        self.volume = 0.0
+        self.fees = 0.0
+        self.funding = 0.0  # received (+) / paid (-)
+        self.realized_pnl = 0.0
+        self.fills = 0
+        self.pairs_opened = 0
+        self.stops_triggered = 0
+
+    # --- replay -----------------------------------------------------------
+
+    def set_mark(self, price: float, time_ms: int):
+        self.mark = price
+        self.time_ms = time_ms
+        if self.stops:
+            self._check_stops()
+
+    def settle_funding(self, rate: float):
+        """Longs pay shorts when the rate is positive"""
+        for position_side, (qty, _) in self.positions.items():
+            if qty:
+                signed = qty if position_side == "LONG" else -qty
+                payment = signed * self.mark * rate
+                self.wallet -= payment
+                self.funding -= payment
+
+    def unrealized_pnl(self) -> float:
+        long_qty, long_entry = self.positions["LONG"]
+        short_qty, short_entry = self.positions["SHORT"]
+        return long_qty * (self.mark - long_entry) + short_qty * (short_entry - self.mark)
+
+    def equity(self) -> float:
+        return self.wallet + self.unrealized_pnl()
+
+    def _check_stops(self):
+        for order_id, stop in list(self.stops.items()):
+            position_side = stop["positionSide"]
+            rising = (position_side == "LONG") == (stop["type"] == "TAKE_PROFIT_MARKET")
+            if (self.mark >= stop["stopPrice"]) if rising else (self.mark <= stop["stopPrice"]):
+                del self.stops[order_id]
+                if self.positions[position_side][0]:
+                    self.stops_triggered += 1
+                    self._fill(stop["side"], position_side, self.positions[position_side][0], reduce_only=True)
+                    if self.on_position_change is not None:
+                        self.on_position_change()
+
+    def _fill(self, side: str, position_side: str, quantity: float, reduce_only: bool = False) -> Dict[str, Any]:
+        position = self.positions[position_side]
+        increases = side == PAIR_LEGS[position_side][0]
+        if reduce_only or not increases:
+            quantity = min(quantity, position[0])
+        price = self.mark * (1 + self.slippage if side == "BUY" else 1 - self.slippage)
+        notional = quantity * price
+        fee = notional * self.taker_fee
+
+        realized = 0.0
+        if increases:
+            total = position[0] + quantity
+            position[1] = (position[0] * position[1] + quantity * price) / total if total else 0.0
+            position[0] = total
+        else:
+            direction = 1 if position_side == "LONG" else -1
+            realized = direction * (price - position[1]) * quantity
+            position[0] -= quantity
+            if position[0] <= 1e-12:
+                position[0], position[1] = 0.0, 0.0
+
+        self.wallet += realized - fee
+        self.realized_pnl += realized
+        self.volume += notional
+        self.fees += fee
+        self.fills += 1
+        order_id = next(self._order_ids)
+        return {
+            "orderId": order_id,
+            "clientOrderId": f"bt-{order_id}",
+            "symbol": self.symbol,
+            "side": side,
+            "positionSide": position_side,
+            "type": "MARKET",
+            "status": "FILLED",
+            "origQty": str(quantity),
+            "executedQty": str(quantity),
+            "avgPrice": str(price),
+            "commission": str(fee),
+            "realizedPnl": str(realized),
+            "updateTime": self.time_ms,
+        }
+
+    # --- AsterExchangeClient interface ------------------------------------
+
+    def get_symbol_filters(self, symbol: str) -> SymbolFilters:
+        return self.filters
+
+    def get_mark_price(self, symbol: str) -> float:
+        return self.mark
+
+    def get_position_risk(self, symbol: Optional[str] = None) -> list:
+        return [
+            {
+                "symbol": self.symbol,
+                "positionSide": position_side,
+                "positionAmt": str(qty if position_side == "LONG" else -qty),
+                "entryPrice": str(entry),
+                "markPrice": str(self.mark),
+                "unRealizedProfit": str((qty if position_side == "LONG" else -qty) * (self.mark - entry)),
+                "leverage": "0",
+                "updateTime": self.time_ms,
+            }
+            for position_side, (qty, entry) in self.positions.items()
+        ]
+
+    fetch_position_risk = get_position_risk
+
+    def fetch_account_balance(self) -> list:
+        return [{"asset": "USDT", "balance": str(self.wallet), "crossWalletBalance": str(self.wallet)}]
+
+    get_account_balance = fetch_account_balance
+
+    def get_account_snapshot(self) -> Dict[str, Any]:
+        return {"positions": self.get_position_risk(), "assets": self.fetch_account_balance()}
+
+    def get_all_orders(self, symbol: str, **kwargs) -> list:
+        return []
+
+    def set_leverage(self, symbol: str, leverage: int):
+        return {"symbol": symbol, "leverage": leverage}
+
+    def set_position_mode(self, dual_side_position: bool):
+        return {}
+
+    def place_market_order(
+        self,
+        symbol: str,
+        side: str,
+        quantity: float,
+        position_side: str,
+        reduce_only: bool = False,
+        client_order_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return self._fill(side, position_side, self.filters.quantize_qty(quantity) or float(quantity), reduce_only)
+
+    def close_position(self, symbol: str, position_side: str) -> Dict[str, Any]:
+        qty = self.positions[position_side][0]
+        if not qty:
+            return {}
+        return self._fill(PAIR_LEGS[position_side][1], position_side, qty, reduce_only=True)
+
+    def get_depth(self, symbol: str, limit: int = 100) -> Dict[str, Any]:
+        # Slippage is modelled as flat, so a single unlimited level per side means one slice
+        return {
+            "lastUpdateId": self.time_ms,
+            "bids": [[str(self.mark * (1 - self.slippage)), "1e18"]],
+            "asks": [[str(self.mark * (1 + self.slippage)), "1e18"]],
+        }
+
+    def open_pair(
+        self,
+        symbol: str,
+        quantity: float,
+        client_order_ids: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        quantity = self.filters.quantize_qty(quantity)
+        self.pairs_opened += 1
+        return {
+            position_side: self._fill(PAIR_LEGS[position_side][0], position_side, quantity)
+            for position_side in ("LONG", "SHORT")
+        }
+
+    def close_pair(
+        self,
+        symbol: str,
+        quantity: Optional[float] = None,
+        client_order_ids: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for position_side in ("LONG", "SHORT"):
+            held = self.positions[position_side][0]
+            if held:
+                results[position_side] = self._fill(
+                    PAIR_LEGS[position_side][1], position_side, min(held, quantity or held), reduce_only=True
+                )
+        if not results:
+            logger.warning(f"No open positions to close for {symbol}")
+        return results
+
+    def place_protective_orders(
+        self,
+        symbol: str,
+        entry_prices: Dict[str, float],
+        stop_pct: float,
+        take_profit_pct: float
+    ) -> List[Dict[str, Any]]:
+        results = []
+        for position_side, entry_price in entry_prices.items():
+            direction = 1 if position_side == "LONG" else -1
+            for order_type, trigger in (
+                ("STOP_MARKET", entry_price * (1 - direction * stop_pct / 100)),
+                ("TAKE_PROFIT_MARKET", entry_price * (1 + direction * take_profit_pct / 100)),
+            ):
+                order_id = next(self._order_ids)
+                self.stops[order_id] = {
+                    "type": order_type,
+                    "side": PAIR_LEGS[position_side][1],
+                    "positionSide": position_side,
+                    "stopPrice": self.filters.quantize_price(trigger),
+                }
+                results.append({"orderId": order_id, "type": order_type, "positionSide": position_side})
+        return results
+
+    def cancel_orders(self, symbol: str, order_ids: List[int]) -> List[Dict[str, Any]]:
+        results = []
+        for order_id in order_ids:
+            if self.stops.pop(order_id, None) is not None:
+                results.append({"orderId": order_id, "status": "CANCELED"})
+            else:
+                results.append({"code": -2011, "msg": "Unknown order sent."})
+        return results
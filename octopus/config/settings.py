@@ -7,6 +7,15 @@ class Settings(BaseSettings):
     aster_api_secret: str
     aster_base_url: str = "https://fapi.asterdex.com"
     aster_ws_url: str = "wss://fstream.asterdex.com"
+    market_stream_enabled: bool = True
+    mark_price_max_age_sec: float = 10.0  # fall back to REST when the stream is older
+    user_stream_enabled: bool = True
+    order_book_enabled: bool = True  # local books from @depth (needs the market stream)
+    exchange_info_ttl_sec: int = 3600
+    clock_sync_interval_sec: int = 300
+    request_timeout_sec: float = 5.0
+    order_retries: int = 2  # resends after confirming the order did not land
+    http_pool_size: int = 20  # keep-alive connections shared by all strategy threads
     
     # Wallet
     wallet_address: str
@@ -20,15 +29,41 @@ class Settings(BaseSettings):
     daily_volume_target: float = 15000.0
     max_position_size_pct: float = 1.5
     trading_pairs: List[str] = ["BTCUSDT"]
+    max_concurrent_symbols: int = 8  # strategy cycles run in parallel
+    cycle_interval_sec: int = 600  # fixed-rate strategy cycle
+    risk_check_interval_sec: float = 1.0  # min gap between stream-triggered risk checks
+    execution_slippage_bps: float = 5.0  # slice pair orders so each slice's VWAP stays within this (0 = off)
+    execution_slice_interval_sec: float = 1.0  # pause between slices for the book to refill
+    execution_max_slices: int = 10
     
     # Risk Management
     max_drawdown_pct: float = 5.0
     max_pnl_drift_pct: float = 0.8
     stop_loss_pct: float = 1.0
-    funding_rate_threshold: float = 0.05
+    protective_orders_enabled: bool = False  # exchange-side stop/take-profit for every leg
+    protective_stop_pct: float = 1.0  # price move from entry that triggers the leg's stop
+    protective_take_profit_pct: float = 1.0  # keep equal to the stop so both legs exit together
+    funding_rate_threshold: float = 0.05  # percent per funding period
+    max_margin_ratio: float = 0.8  # maintenance margin / equity
+    hedge_repair_enabled: bool = True  # top up / reduce a leg when LONG and SHORT quantities diverge
+    hedge_repair_delay_sec: float = 2.0  # let the second leg's fill arrive before correcting
     
     # Database
     db_path: str = "octopus.db"
+    checkpoint_interval_sec: int = 60  # strategy state checkpoints for crash recovery (0 = off)
+    journal_enabled: bool = True  # write trades/positions from a background thread
+    journal_queue_size: int = 10000  # submitters block when this many records are waiting
+    journal_batch_size: int = 500  # records per transaction
+    close_orphaned_legs: bool = True  # close unhedged legs found at startup
+    clear_halt_on_start: bool = False  # resume opening pairs after a portfolio halt saved by an earlier run
+    fill_reconcile_enabled: bool = True  # pull fills and funding each cycle for commission, realized PnL and funding
+    
+    # Market data
+    recorder_enabled: bool = False  # record market streams while trading
+    recorder_path: str = "data/market"  # root of the columnar market data store
+    recorder_flush_interval_sec: float = 1.0  # buffered events are appended to disk this often
+    recorder_max_pending_rows: int = 2_000_000  # drop rows beyond this if the disk falls behind
+    download_concurrency: int = 8  # history page requests in flight (still held to the weight budget)
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
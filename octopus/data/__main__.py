@@ -0,0 +1,115 @@
+"""
+Record market data streams without trading, download history, or summarize
+what is stored.
+
+    python -m octopus.data record --symbols BTCUSDT,ETHUSDT
+    python -m octopus.data download --symbols BTCUSDT,ETHUSDT --kinds kline_1m,funding --start 2025-01-01
+    python -m octopus.data info --symbols BTCUSDT
+
+Data goes to settings.recorder_path (RECORDER_PATH) unless --path is given:
+one directory per symbol, kind and UTC day. Recorded kinds are mark, book,
+trade and depth; downloads add kline_<interval>, mark_kline_<interval>,
+index_kline_<interval>, funding and trade (aggTrades). An interrupted
+download picks up where it stopped when run again.
+
+Read it back with ColumnStore(path).read(symbol, kind, start_ms, end_ms), or
+backtest straight from it: python -m octopus.backtest BTCUSDT data/market
+"""
+from datetime import datetime, timezone
+import argparse
+import signal
+import threading
+import time
+
+from octopus.config.settings import settings
+from octopus.data.download import DEFAULT_KINDS, HistoryDownloader
+from octopus.data.recorder import MarketRecorder
+from octopus.data.store import ColumnStore
+
+
+def record(args):
+    from octopus.exchange.market_stream import MarketStream
+
+    symbols = args.symbols.split(",") if args.symbols else settings.trading_pairs
+    recorder = MarketRecorder(ColumnStore(args.path))
+    stream = MarketStream(symbols)
+    recorder.attach(stream.cache)
+    recorder.start()
+    stream.start()
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    deadline = time.monotonic() + args.seconds if args.seconds else None
+    try:
+        while not stopped.wait(1.0):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.stop()
+        recorder.stop()
+
+
+def _time_ms(value: str) -> int:
+    """Milliseconds from a YYYY-MM-DD date (UTC) or a millisecond timestamp"""
+    if value.isdigit():
+        return int(value)
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def download(args):
+    symbols = args.symbols.split(",") if args.symbols else settings.trading_pairs
+    downloader = HistoryDownloader(ColumnStore(args.path), concurrency=args.concurrency)
+    results = downloader.download(
+        symbols, args.kinds.split(","), _time_ms(args.start), _time_ms(args.end) if args.end else None
+    )
+    failed = [r for r in results if r.error]
+    print(f"{sum(r.rows for r in results):,} rows in {sum(r.pages for r in results):,} pages, {len(failed)} incomplete")
+    for r in failed:
+        print(f"  {r.symbol} {r.kind}: {r.error}")
+    if failed:
+        raise SystemExit(1)
+
+
+def info(args):
+    store = ColumnStore(args.path)
+    for symbol in (args.symbols.split(",") if args.symbols else store.symbols()):
+        for kind in store.kinds(symbol):
+            segments = store.segments(symbol, kind)
+            if not segments:
+                continue
+            rows = sum(seg["rows"] for _, seg in segments)
+            print(f"{symbol:<12} {kind:<14} {len(segments):>4} days {rows:>12,} rows  {segments[0][0]} - {segments[-1][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="record the market streams until interrupted")
+    record_parser.add_argument("--symbols", help="comma separated; defaults to settings.trading_pairs")
+    record_parser.add_argument("--seconds", type=float, help="stop after this long")
+    record_parser.set_defaults(func=record)
+
+    download_parser = commands.add_parser("download", help="download history, resuming earlier runs")
+    download_parser.add_argument("--symbols", help="comma separated; defaults to settings.trading_pairs")
+    download_parser.add_argument("--kinds", default=",".join(DEFAULT_KINDS), help="comma separated")
+    download_parser.add_argument("--start", required=True, help="YYYY-MM-DD (UTC) or ms")
+    download_parser.add_argument("--end", help="YYYY-MM-DD (UTC) or ms; defaults to now")
+    download_parser.add_argument("--concurrency", type=int, help="defaults to settings.download_concurrency")
+    download_parser.set_defaults(func=download)
+
+    info_parser = commands.add_parser("info", help="list stored days and row counts")
+    info_parser.add_argument("--symbols", help="comma separated; defaults to every stored symbol")
+    info_parser.set_defaults(func=info)
+
+    for sub in (record_parser, download_parser, info_parser):
+        sub.add_argument("--path", default=settings.recorder_path, help="store root")
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+from loguru import logger
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+import numpy as np
+
+from octopus.config.settings import settings
+from octopus.data.store import ColumnStore, schema_for
+from octopus.exchange.aster.error import ClientError, ServerError
+from octopus.exchange.aster.rate_limiter import RateLimiter
+from octopus.exchange.aster.rest_api import AsyncClient
+from octopus.exchange.retry_policy import Action, classify
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000, "8h": 28_800_000,
+    "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000, "1w": 604_800_000,
+}
+
+# Kline kind prefix -> (client method, REST path, symbol parameter)
+KLINE_ENDPOINTS = {
+    "kline": ("klines", "/fapi/v1/klines", "symbol"),
+    "mark_kline": ("mark_price_klines", "/fapi/v1/markPriceKlines", "symbol"),
+    "index_kline": ("index_price_klines", "/fapi/v1/indexPriceKlines", "pair"),
+}
+KLINE_LIMITS = (99, 499, 1000, 1500)  # page sizes at the steps of the kline weight table
+AGG_TRADE_LIMIT = 1000
+AGG_TRADE_WINDOW_MS = 3_600_000  # aggTrades rejects startTime/endTime spans over an hour
+FUNDING_LIMIT = 1000
+FUNDING_PAGE_MS = FUNDING_LIMIT * 3_600_000  # never more than a page, even at hourly funding
+MAX_RETRIES = 5
+CHECKPOINT_FILE = "download.json"
+DEFAULT_KINDS = ("kline_1m", "mark_kline_1m", "funding")
+
+
+class Page(NamedTuple):
+    start: int  # ms, inclusive
+    end: int    # ms, inclusive
+
+
+class DownloadResult(NamedTuple):
+    symbol: str
+    kind: str
+    rows: int
+    pages: int
+    until: Optional[int]         # ms the stored history now reaches
+    error: Optional[str] = None  # set when the download stopped early; rerun to resume
+
+
+class HistoryDownloader:
+    """
+    Bulk download of historical klines, aggTrades and funding into a ColumnStore.
+
+    Each symbol/kind range is split into page requests up front: windows of
+    one full page for klines and funding, hour windows for aggTrades (walked
+    by fromId when an hour holds more than a page). Pages run concurrently on
+    one aiohttp session, with the shared RateLimiter (loaded from
+    exchangeInfo) holding the whole download to the request-weight budget;
+    kline pages use the limit that returns the most rows per unit of weight.
+
+    Pages are committed in order, so rows repeated across a page boundary are
+    dropped by comparing with the last stored open time (aggregate trade id
+    for aggTrades). After every commit the position is saved to
+    <kind>/download.json, and an interrupted download resumes from there.
+    Streams only grow forward; klines are stored once closed.
+    """
+
+    def __init__(self, store: ColumnStore, concurrency: Optional[int] = None, client=None):
+        self.store = store
+        self.concurrency = concurrency or settings.download_concurrency
+        self.rate_limiter = RateLimiter()
+        self.client = client or AsyncClient(
+            base_url=settings.aster_base_url,
+            timeout=settings.request_timeout_sec,
+            rate_limiter=self.rate_limiter,
+            pool_size=self.concurrency
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def download(
+        self,
+        symbols: Iterable[str],
+        kinds: Iterable[str],
+        start_ms: int,
+        end_ms: Optional[int] = None
+    ) -> List[DownloadResult]:
+        """Download every symbol/kind pair over [start_ms, end_ms] (default: until now)"""
+        return asyncio.run(self.run(list(symbols), list(kinds), start_ms, end_ms))
+
+    async def run(
+        self,
+        symbols: List[str],
+        kinds: List[str],
+        start_ms: int,
+        end_ms: Optional[int] = None
+    ) -> List[DownloadResult]:
+        for kind in kinds:
+            schema_for(kind)  # fail on a typo before any request is sent
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            try:
+                self.rate_limiter.load_exchange_info(await self.client.exchange_info())
+            except (ClientError, ServerError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Could not load exchange info, using default rate limits: {e}")
+            now = int(time.time() * 1000)
+            end_ms = min(end_ms or now, now)
+            return await asyncio.gather(*(
+                self._download(symbol, kind, start_ms, end_ms) for symbol in symbols for kind in kinds
+            ))
+        finally:
+            await self.client.close()
+
+    async def _download(self, symbol: str, kind: str, start_ms: int, end_ms: int) -> DownloadResult:
+        checkpoint = self._load_checkpoint(symbol, kind)
+        if checkpoint:
+            start_ms = max(start_ms, checkpoint["until"] + 1)
+        last_key = checkpoint.get("last_key", -1)
+        until = checkpoint.get("until")
+        pages = self._pages(kind, start_ms, end_ms)
+        if not pages:
+            return DownloadResult(symbol, kind, 0, 0, until)
+
+        started = time.monotonic()
+        key = "agg_id" if kind == "trade" else "time"
+        schema = schema_for(kind)
+        upcoming = iter(pages)
+        in_flight = deque()
+        rows_written = 0
+        done = 0
+
+        def schedule():
+            # Keep a bounded window of requests ahead of the commit point
+            while len(in_flight) < self.concurrency * 2:
+                page = next(upcoming, None)
+                if page is None:
+                    return
+                in_flight.append((page, asyncio.ensure_future(self._fetch(symbol, kind, page))))
+
+        schedule()
+        while in_flight:
+            page, task = in_flight.popleft()
+            try:
+                rows = await task
+            except Exception as e:
+                for _, pending in in_flight:
+                    pending.cancel()
+                logger.error(f"📥 {symbol} {kind} stopped at page {done + 1}/{len(pages)}: {e}")
+                return DownloadResult(symbol, kind, rows_written, done, until, error=str(e))
+            schedule()
+
+            batch = np.array(rows, dtype=schema)
+            batch = batch[batch[key] > last_key]
+            if len(batch):
+                # Sort by key and drop duplicates within the page
+                _, first = np.unique(batch[key], return_index=True)
+                batch = batch[first]
+                self.store.append(symbol, kind, batch)
+                last_key = int(batch[key][-1])
+                rows_written += len(batch)
+            until = page.end
+            done += 1
+            self._save_checkpoint(symbol, kind, {"until": until, "last_key": last_key})
+
+        logger.info(
+            f"📥 {symbol} {kind}: {rows_written:,} rows in {done} pages ({time.monotonic() - started:.1f}s)"
+        )
+        return DownloadResult(symbol, kind, rows_written, done, until)
+
+    def _pages(self, kind: str, start_ms: int, end_ms: int) -> List[Page]:
+        if kind == "trade":
+            step = AGG_TRADE_WINDOW_MS
+        elif kind == "funding":
+            step = FUNDING_PAGE_MS
+        else:
+            interval = INTERVAL_MS[kind.rpartition("_")[2]]
+            # Pages cover kline open times; stop at the last kline closed by end_ms
+            start_ms = -(-start_ms // interval) * interval
+            end_ms = (end_ms + 1) // interval * interval - interval
+            step = self._kline_limit(kind) * interval
+        return [Page(start, min(start + step - 1, end_ms)) for start in range(start_ms, end_ms + 1, step)]
+
+    def _kline_limit(self, kind: str) -> int:
+        """Page size with the most klines per unit of request weight (larger on a tie)"""
+        path = KLINE_ENDPOINTS[kind.rpartition("_")[0]][1]
+        return max(KLINE_LIMITS, key=lambda n: (n / self.rate_limiter.cost("GET", path, {"limit": n})[0], n))
+
+    # --- requests ---------------------------------------------------------
+
+    async def _fetch(self, symbol: str, kind: str, page: Page) -> List[tuple]:
+        if kind == "trade":
+            return await self._fetch_agg_trades(symbol, page)
+        if kind == "funding":
+            data = await self._get(
+                "funding_rate", symbol=symbol, startTime=page.start, endTime=page.end, limit=FUNDING_LIMIT
+            )
+            return [(int(f['fundingTime']), float(f['fundingRate']), float(f.get('markPrice') or 0)) for f in data]
+
+        prefix, _, interval = kind.rpartition("_")
+        method, _, symbol_param = KLINE_ENDPOINTS[prefix]
+        data = await self._get(
+            method,
+            **{symbol_param: symbol},
+            interval=interval,
+            startTime=page.start,
+            endTime=page.end,
+            limit=self._kline_limit(kind)
+        )
+        # Mark and index klines leave the volume fields empty
+        return [
+            (int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5] or 0),
+             int(k[6]), float(k[7] or 0), int(k[8] or 0), float(k[9] or 0))
+            for k in data
+        ]
+
+    async def _fetch_agg_trades(self, symbol: str, page: Page) -> List[tuple]:
+        rows = []
+        data = await self._get("agg_trades", symbol=symbol, startTime=page.start, endTime=page.end, limit=AGG_TRADE_LIMIT)
+        while True:
+            rows += [
+                (int(t['T']), int(t['a']), float(t['p']), float(t['q']), int(bool(t['m'])))
+                for t in data if int(t['T']) <= page.end
+            ]
+            if len(data) < AGG_TRADE_LIMIT or int(data[-1]['T']) > page.end:
+                return rows
+            data = await self._get("agg_trades", symbol=symbol, fromId=int(data[-1]['a']) + 1, limit=AGG_TRADE_LIMIT)
+
+    async def _get(self, method: str, **params) -> Any:
+        """Call a market endpoint, retrying transient failures with exponential backoff"""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    return await getattr(self.client, method)(**params)
+            except (ClientError, ServerError) as e:
+                if classify(e).action is Action.FAIL or attempt == MAX_RETRIES:
+                    raise
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                error = e
+            delay = min(30.0, 0.5 * 2 ** attempt)
+            logger.warning(f"{method} failed, retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s: {error!r}")
+            await asyncio.sleep(delay)
+
+    # --- checkpoints ------------------------------------------------------
+
+    def _checkpoint_path(self, symbol: str, kind: str) -> str:
+        return os.path.join(self.store.root, symbol, kind, CHECKPOINT_FILE)
+
+    def _load_checkpoint(self, symbol: str, kind: str) -> Dict[str, int]:
+        path = self._checkpoint_path(symbol, kind)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, symbol: str, kind: str, checkpoint: Dict[str, int]):
+        path = self._checkpoint_path(symbol, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp, path)
@@ -0,0 +1,114 @@
+from loguru import logger
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import threading
+
+import numpy as np
+
+from octopus.config.settings import settings
+from octopus.data.store import SCHEMAS, ColumnStore
+
+# Raw stream event type -> store kind
+EVENT_KINDS = {
+    "markPriceUpdate": "mark",
+    "bookTicker": "book",
+    "aggTrade": "trade",
+    "depthUpdate": "depth",
+}
+
+BID, ASK = 0, 1
+
+
+class MarketRecorder:
+    """
+    Records market stream events into a ColumnStore.
+
+    Listeners on the MarketDataCache only turn each event into tuples and
+    append them to an in-memory buffer, so the stream thread never touches the
+    disk. A flush thread swaps the buffers out every
+    recorder_flush_interval_sec and appends them as column arrays. If the
+    disk falls behind, rows beyond recorder_max_pending_rows are dropped (and
+    counted) rather than let memory grow without bound.
+    """
+
+    def __init__(self, store: Optional[ColumnStore] = None):
+        self.store = store or ColumnStore(settings.recorder_path)
+        self.recorded = 0
+        self.dropped = 0
+        self._buffers: Dict[Tuple[str, str], List[tuple]] = defaultdict(list)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def attach(self, market_cache):
+        """Subscribe to every recorded event type"""
+        market_cache.add_listener('markPriceUpdate', self._on_mark_price)
+        market_cache.add_listener('bookTicker', self._on_book_ticker)
+        market_cache.add_listener('aggTrade', self._on_agg_trade)
+        market_cache.add_listener('depthUpdate', self._on_depth_update)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="market-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"📼 Recording market data to {self.store.root}")
+
+    def stop(self):
+        """Write out the buffers and stop the flush thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self.store.close()
+        logger.info(f"📼 Market recorder stopped: {self.recorded} rows written, {self.dropped} dropped")
+
+    def flush(self):
+        with self._lock:
+            buffers, self._buffers = self._buffers, defaultdict(list)
+            self._pending = 0
+        for (symbol, kind), rows in buffers.items():
+            try:
+                self.store.append(symbol, kind, np.array(rows, dtype=SCHEMAS[kind]))
+                self.recorded += len(rows)
+            except Exception as e:
+                logger.error(f"Failed to record {len(rows)} {kind} rows for {symbol}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(settings.recorder_flush_interval_sec):
+            self.flush()
+
+    # --- stream listeners (stream thread) ---------------------------------
+
+    def _append(self, symbol: str, kind: str, rows: List[tuple]):
+        with self._lock:
+            if self._pending + len(rows) > settings.recorder_max_pending_rows:
+                self.dropped += len(rows)
+                return
+            self._buffers[(symbol, kind)].extend(rows)
+            self._pending += len(rows)
+
+    def _on_mark_price(self, event: dict):
+        self._append(event['s'], "mark", [(
+            int(event['E']), float(event['p']), float(event.get('i') or 0),
+            float(event.get('r') or 0), int(event.get('T') or 0)
+        )])
+
+    def _on_book_ticker(self, event: dict):
+        self._append(event['s'], "book", [(
+            int(event.get('E') or event.get('T') or 0), int(event['u']),
+            float(event['b']), float(event['B']), float(event['a']), float(event['A'])
+        )])
+
+    def _on_agg_trade(self, event: dict):
+        self._append(event['s'], "trade", [(
+            int(event['T']), int(event['a']), float(event['p']), float(event['q']), int(bool(event['m']))
+        )])
+
+    def _on_depth_update(self, event: dict):
+        head = (int(event['E']), int(event['U']), int(event['u']), int(event.get('pu', -1)))
+        rows = [head + (BID, float(p), float(q)) for p, q in event.get('b', ())]
+        rows += [head + (ASK, float(p), float(q)) for p, q in event.get('a', ())]
+        if rows:
+            self._append(event['s'], "depth", rows)
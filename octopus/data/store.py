@@ -0,0 +1,249 @@
+from loguru import logger
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import json
+import mmap
+import os
+import threading
+
+import numpy as np
+
+DAY_MS = 86_400_000
+
+# Fixed-width columns per stream kind; "time" (ms) is non-decreasing within a stream
+SCHEMAS: Dict[str, np.dtype] = {
+    "mark": np.dtype([
+        ("time", "<i8"), ("price", "<f8"), ("index_price", "<f8"),
+        ("funding_rate", "<f8"), ("next_funding_time", "<i8"),
+    ]),
+    "book": np.dtype([
+        ("time", "<i8"), ("update_id", "<i8"), ("bid_price", "<f8"),
+        ("bid_qty", "<f8"), ("ask_price", "<f8"), ("ask_qty", "<f8"),
+    ]),
+    "trade": np.dtype([
+        ("time", "<i8"), ("agg_id", "<i8"), ("price", "<f8"), ("quantity", "<f8"), ("buyer_maker", "<i1"),
+    ]),
+    # One row per changed level; the update ids repeat for every level of a diff
+    "depth": np.dtype([
+        ("time", "<i8"), ("first_update_id", "<i8"), ("last_update_id", "<i8"),
+        ("prev_update_id", "<i8"), ("side", "<i1"), ("price", "<f8"), ("quantity", "<f8"),
+    ]),
+    # Downloaded history; kline kinds carry their interval ("kline_1m", "mark_kline_1h", ...)
+    "kline": np.dtype([
+        ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+        ("volume", "<f8"), ("close_time", "<i8"), ("quote_volume", "<f8"), ("trades", "<i8"),
+        ("taker_buy_volume", "<f8"),
+    ]),
+    "funding": np.dtype([("time", "<i8"), ("funding_rate", "<f8"), ("mark_price", "<f8")]),
+}
+KLINE_KINDS = ("kline", "mark_kline", "index_kline")
+
+
+def schema_for(kind: str) -> np.dtype:
+    """Column layout of a stream kind; interval-suffixed kline kinds share SCHEMAS["kline"]"""
+    if kind in SCHEMAS:
+        return SCHEMAS[kind]
+    prefix = kind.rpartition("_")[0]
+    if prefix in KLINE_KINDS:
+        return SCHEMAS["kline"]
+    raise ValueError(f"Unknown market data kind: {kind}")
+
+
+def day_of(time_ms: int) -> str:
+    return datetime.fromtimestamp(time_ms // DAY_MS * 86400, tz=timezone.utc).strftime("%Y%m%d")
+
+
+class ColumnStore:
+    """
+    Append-only columnar files for market data.
+
+    Layout: <root>/<SYMBOL>/<kind>/<YYYYMMDD>/<column>.bin, one raw
+    little-endian array per column and UTC day, plus <kind>/index.json with
+    each segment's time range and row count. Columns are appended separately,
+    so a crash can leave them at different lengths; readers use the shortest
+    and the next append first cuts them back to the row count in the index.
+    Reads memory-map the files and return NumPy views without copying.
+    Within a day rows only move forward in time; rows older than what the
+    segment already holds are dropped.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._files: Dict[Tuple[str, str, str], Dict[str, object]] = {}
+        self._indexes: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    # --- writing ----------------------------------------------------------
+
+    def append(self, symbol: str, kind: str, rows: np.ndarray):
+        """Append a structured array of schema_for(kind) rows, splitting it by UTC day"""
+        if not len(rows):
+            return
+        with self._lock:
+            days = rows["time"] // DAY_MS
+            bounds = np.flatnonzero(np.diff(days)) + 1
+            for chunk in np.split(rows, bounds):
+                self._append_day(symbol, kind, day_of(int(chunk["time"][0])), chunk)
+            self._save_index(symbol, kind)
+
+    def _append_day(self, symbol: str, kind: str, day: str, rows: np.ndarray):
+        segment = self._index(symbol, kind)["segments"].get(day)
+        if segment is not None and rows["time"][0] < segment["end"]:
+            rows = rows[rows["time"] >= segment["end"]]
+            logger.warning(f"{symbol} {kind} {day}: dropped rows older than the stored segment")
+            if not len(rows):
+                return
+        files = self._files.get((symbol, kind, day))
+        if files is None:
+            # Only one day per stream is written at a time
+            for key in [k for k in self._files if k[:2] == (symbol, kind)]:
+                for f in self._files.pop(key).values():
+                    f.close()
+            path = self._segment_path(symbol, kind, day)
+            os.makedirs(path, exist_ok=True)
+            files = {name: open(os.path.join(path, f"{name}.bin"), "ab") for name in rows.dtype.names}
+            self._files[(symbol, kind, day)] = files
+        self._align_columns(symbol, kind, day, files, rows.dtype, segment)
+        for name, f in files.items():
+            f.write(np.ascontiguousarray(rows[name]).tobytes())
+            f.flush()
+
+        segments = self._index(symbol, kind)["segments"]
+        segment = segments.setdefault(day, {"start": int(rows["time"][0]), "end": 0, "rows": 0})
+        segment["start"] = min(segment["start"], int(rows["time"][0]))
+        segment["end"] = max(segment["end"], int(rows["time"][-1]))
+        segment["rows"] += len(rows)
+
+    def _align_columns(self, symbol: str, kind: str, day: str, files: Dict[str, object], schema: np.dtype,
+                       segment: Optional[dict]):
+        """Cut every column back to the rows the index records, so a torn append can't shift later rows"""
+        expected = segment["rows"] if segment is not None else 0
+        sizes = {name: os.fstat(f.fileno()).st_size for name, f in files.items()}
+        rows = min([expected] + [sizes[name] // schema[name].itemsize for name in files])
+        if rows == expected and all(sizes[name] == rows * schema[name].itemsize for name in files):
+            return
+        logger.warning(f"{symbol} {kind} {day}: torn append, truncating columns to {rows} rows")
+        for name, f in files.items():
+            f.truncate(rows * schema[name].itemsize)
+        if segment is not None:
+            segment["rows"] = rows
+
+    def _save_index(self, symbol: str, kind: str):
+        path = os.path.join(self.root, symbol, kind, "index.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._indexes[(symbol, kind)], f)
+        os.replace(tmp, path)
+
+    def close(self):
+        with self._lock:
+            for files in self._files.values():
+                for f in files.values():
+                    f.close()
+            self._files.clear()
+
+    # --- reading ----------------------------------------------------------
+
+    def symbols(self) -> List[str]:
+        return self._subdirs(self.root)
+
+    def kinds(self, symbol: str) -> List[str]:
+        return self._subdirs(os.path.join(self.root, symbol))
+
+    def segments(
+        self,
+        symbol: str,
+        kind: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None
+    ) -> List[Tuple[str, dict]]:
+        """(day, {"start", "end", "rows"}) of the segments overlapping [start_ms, end_ms], oldest first"""
+        segments = self._load_index(symbol, kind).get("segments", {})
+        return [
+            (day, seg) for day, seg in sorted(segments.items())
+            if (start_ms is None or seg["end"] >= start_ms) and (end_ms is None or seg["start"] <= end_ms)
+        ]
+
+    def read_segments(
+        self,
+        symbol: str,
+        kind: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None
+    ) -> List[Dict[str, np.ndarray]]:
+        """Per-segment {column: array} views straight onto the mapped files (no copy)"""
+        result = []
+        for day, _ in self.segments(symbol, kind, start_ms, end_ms):
+            columns = self._map_segment(symbol, kind, day)
+            times = columns["time"]
+            lo = 0 if start_ms is None else int(np.searchsorted(times, start_ms, side="left"))
+            hi = len(times) if end_ms is None else int(np.searchsorted(times, end_ms, side="right"))
+            if hi > lo:
+                result.append({name: values[lo:hi] for name, values in columns.items()})
+        return result
+
+    def read(
+        self,
+        symbol: str,
+        kind: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """{column: array} for a time range; a single segment is returned as views, several are concatenated"""
+        parts = self.read_segments(symbol, kind, start_ms, end_ms)
+        if len(parts) == 1:
+            return parts[0]
+        schema = schema_for(kind)
+        return {
+            name: np.concatenate([p[name] for p in parts]) if parts else np.empty(0, dtype=schema[name])
+            for name in schema.names
+        }
+
+    def _map_segment(self, symbol: str, kind: str, day: str) -> Dict[str, np.ndarray]:
+        schema = schema_for(kind)
+        path = self._segment_path(symbol, kind, day)
+        buffers = {}
+        for name in schema.names:
+            file_path = os.path.join(path, f"{name}.bin")
+            size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            if size == 0:
+                buffers[name] = None
+                continue
+            with open(file_path, "rb") as f:
+                buffers[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        rows = min(
+            (len(buf) // schema[name].itemsize if buf is not None else 0) for name, buf in buffers.items()
+        )
+        return {
+            name: np.frombuffer(buf, dtype=schema[name], count=rows) if rows else np.empty(0, dtype=schema[name])
+            for name, buf in buffers.items()
+        }
+
+    # --- paths and index --------------------------------------------------
+
+    @staticmethod
+    def _subdirs(path: str) -> List[str]:
+        if not os.path.isdir(path):
+            return []
+        return sorted(d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d)))
+
+    def _segment_path(self, symbol: str, kind: str, day: str) -> str:
+        return os.path.join(self.root, symbol, kind, day)
+
+    def _index(self, symbol: str, kind: str) -> dict:
+        index = self._indexes.get((symbol, kind))
+        if index is None:
+            index = self._indexes[(symbol, kind)] = self._load_index(symbol, kind)
+            index.setdefault("segments", {})
+        return index
+
+    def _load_index(self, symbol: str, kind: str) -> dict:
+        path = os.path.join(self.root, symbol, kind, "index.json")
+        if not os.path.exists(path):
+            return {"segments": {}}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except ValueError as e:
+            logger.warning(f"Unreadable index {path}: {e}")
+            return {"segments": {}}
@@ -1,29 +1,141 @@
-from sqlalchemy import create_engine
+from sqlalchemy import Float, Numeric, create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
 from octopus.config.settings import settings
-from octopus.database.models import Base
+from octopus.database.models import Base, Fixed
+from octopus.utils.fixed_point import FIXED_SCALE
 from contextlib import contextmanager
 from loguru import logger
+import threading
 
-engine = create_engine(f"sqlite:///{settings.db_path}", echo=False)
+# WAL lets readers run alongside the journal writer; with synchronous=NORMAL a
+# commit is an append to the WAL and fsyncs only happen at checkpoints
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # KiB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def _create_engine(url: str):
+    new_engine = create_engine(url, echo=False)
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+engine = _create_engine(f"sqlite:///{settings.db_path}")
 SessionLocal = sessionmaker(bind=engine)
 
+# Column types of databases from before prices and amounts were stored in fixed point
+# (Float is not a Numeric subclass in every SQLAlchemy version)
+FLOAT_TYPES = (Float, Numeric)
+
+# SQLite allows a single writer; strategies running in parallel threads go
+# through this lock instead of failing with "database is locked"
+_writer_lock = threading.RLock()
+
+def configure_db(url: str):
+    """Point all sessions at another database (backtests use a throwaway one per run)"""
+    global engine
+    engine = _create_engine(url)
+    SessionLocal.configure(bind=engine)
+
 def init_db():
     """Initialize database tables"""
+    from octopus.database.stats import rebuild_daily_stats
+    
     Base.metadata.create_all(bind=engine)
+    migrate_db()
+    rebuild_daily_stats()
     logger.info(f"Database initialized: {settings.db_path}")
 
+def migrate_db():
+    """
+    Add columns that were introduced after a table was first created.
+    
+    create_all() only creates missing tables, so older databases are brought up
+    to date with ALTER TABLE ... ADD COLUMN (SQLite cannot add UNIQUE columns;
+    uniqueness of those is enforced with a separate unique index) and get the
+    indexes declared on their models. Tables that still store fixed-point
+    columns as floats are rebuilt with integer columns.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            columns = {c['name']: c['type'] for c in inspector.get_columns(table.name)}
+            if any(
+                isinstance(column.type, Fixed) and isinstance(columns.get(column.name), FLOAT_TYPES)
+                for column in table.columns
+            ):
+                _convert_to_fixed(conn, table, columns)
+                continue
+            existing = set(columns)
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                if column.unique:
+                    conn.execute(text(
+                        f'CREATE UNIQUE INDEX IF NOT EXISTS ux_{table.name}_{column.name} '
+                        f'ON {table.name} ({column.name})'
+                    ))
+                logger.info(f"Migrated {table.name}: added column {column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def _convert_to_fixed(conn, table, old_columns):
+    """
+    Rebuild `table` with its Fixed columns as INTEGER 1e-8 units.
+
+    SQLite can't change a column's type, so the old table is renamed, the new
+    one created from the model and the rows copied over, float columns scaled
+    and rounded on the way. Columns the old table lacked are left to their
+    defaults.
+    """
+    old_name = f"{table.name}_float"
+    conn.execute(text(f'ALTER TABLE {table.name} RENAME TO {old_name}'))
+    # The renamed table keeps its index names; free them for the new table
+    for (index_name,) in conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"
+    ), {"name": old_name}).fetchall():
+        conn.execute(text(f'DROP INDEX {index_name}'))
+    table.create(conn)
+    names, values = [], []
+    for column in table.columns:
+        if column.name not in old_columns:
+            continue
+        names.append(column.name)
+        if isinstance(column.type, Fixed) and isinstance(old_columns[column.name], FLOAT_TYPES):
+            values.append(f'CAST(ROUND({column.name} * {FIXED_SCALE}) AS INTEGER)')
+        else:
+            values.append(column.name)
+    conn.execute(text(
+        f'INSERT INTO {table.name} ({", ".join(names)}) SELECT {", ".join(values)} FROM {old_name}'
+    ))
+    conn.execute(text(f'DROP TABLE {old_name}'))
+    logger.info(f"Migrated {table.name}: fixed-point columns converted to integer units")
+
 @contextmanager
 def get_db() -> Session:
-    """Context manager for database sessions"""
-    db = SessionLocal()
-    try:
-        yield db
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Database error: {e}")
-        raise
-    finally:
-        db.close()
+    """Context manager for database sessions (one at a time across threads)"""
+    with _writer_lock:
+        db = SessionLocal()
+        try:
+            yield db
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            db.close()
 
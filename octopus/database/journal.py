@@ -0,0 +1,220 @@
+from loguru import logger
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Union
+import atexit
+import queue
+import threading
+
+from sqlalchemy import insert
+
+from octopus.config.settings import settings
+from octopus.database.db import get_db
+from octopus.database.models import HedgeImbalance, Position, StrategyCheckpoint, Trade
+from octopus.database.stats import add_closed_position, add_trade, apply_deltas, new_deltas
+
+
+class TradeRecord(NamedTuple):
+    """Prices, quantities and amounts here and below are fixed-point ints (see octopus.utils.fixed_point)"""
+    timestamp: datetime
+    symbol: str
+    side: str
+    position_side: str
+    quantity: int
+    price: int
+    notional: int
+    order_id: str
+    client_order_id: Optional[str] = None
+    realized_pnl: int = 0
+    commission: int = 0
+    order_type: str = "MARKET"
+    status: str = "FILLED"
+
+
+class PositionOpened(NamedTuple):
+    opened_at: datetime
+    symbol: str
+    position_side: str
+    entry_price: int
+    quantity: int
+    leverage: int
+    notional: int
+    is_active: bool = True
+
+
+class PositionClosed(NamedTuple):
+    """Closes the symbol's active Position row for one side (or the row `position_id`)"""
+    closed_at: datetime
+    symbol: str
+    position_side: str
+    exit_price: Optional[int]  # None when the leg went flat unobserved
+    realized_pnl: Optional[int] = None  # None keeps the row's value
+    position_id: Optional[int] = None
+
+
+class HedgeWindow(NamedTuple):
+    symbol: str
+    started_at: datetime
+    ended_at: datetime
+    duration_sec: float
+    max_imbalance: int
+    correction: Optional[str] = None
+
+
+class CheckpointSaved(NamedTuple):
+    symbol: str
+    updated_at: datetime
+    state: str  # JSON
+
+
+JournalEvent = Union[TradeRecord, PositionOpened, PositionClosed, HedgeWindow, CheckpointSaved]
+
+# Events that are plain row inserts, by the model they insert into
+INSERTS = {TradeRecord: Trade, PositionOpened: Position, HedgeWindow: HedgeImbalance}
+
+
+def apply_events(db, events: List[JournalEvent]):
+    """
+    Write `events` in order within one session; runs of inserts go out as bulk
+    INSERTs and DailyStats are updated in the same transaction.
+    """
+    pending: List[JournalEvent] = []
+    deltas = new_deltas()
+
+    def flush_inserts():
+        while pending:
+            model = INSERTS[type(pending[0])]
+            run = 1
+            while run < len(pending) and type(pending[run]) is type(pending[0]):
+                run += 1
+            db.execute(insert(model), [e._asdict() for e in pending[:run]])
+            del pending[:run]
+
+    for event in events:
+        if isinstance(event, TradeRecord):
+            add_trade(deltas, event.symbol, event.timestamp, event.notional, event.realized_pnl, event.commission)
+        if type(event) in INSERTS:
+            pending.append(event)
+            continue
+        flush_inserts()
+        if isinstance(event, PositionClosed):
+            _close_position(db, event, deltas)
+        elif isinstance(event, CheckpointSaved):
+            db.merge(StrategyCheckpoint(symbol=event.symbol, updated_at=event.updated_at, state=event.state))
+    flush_inserts()
+    apply_deltas(db, deltas)
+
+
+def _close_position(db, event: PositionClosed, deltas):
+    query = db.query(Position).filter(Position.is_active.is_(True))
+    if event.position_id is not None:
+        query = query.filter(Position.id == event.position_id)
+    else:
+        query = query.filter(Position.symbol == event.symbol, Position.position_side == event.position_side)
+    position = query.order_by(Position.opened_at.desc()).first()
+    if position is None:
+        return
+    position.is_active = False
+    position.closed_at = event.closed_at
+    position.exit_price = event.exit_price
+    position.hold_time_minutes = int((event.closed_at - position.opened_at).total_seconds() / 60)
+    if event.realized_pnl is not None:
+        position.realized_pnl = event.realized_pnl
+    add_closed_position(deltas, event.symbol, event.closed_at, position.hold_time_minutes)
+
+
+class Journal:
+    """
+    Write-behind persistence for trade, position and checkpoint records.
+
+    The trading path only builds an immutable event and puts it on a bounded
+    queue; a writer thread drains the queue and commits each batch as a single
+    transaction, so order-to-order latency never includes an fsync. When the
+    queue is full `submit()` blocks rather than drop records, and `close()`
+    (also run at exit) writes out everything still queued. With
+    journal_enabled off, or once the journal is closed, events are written
+    synchronously by the caller.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, batch_size: Optional[int] = None):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def submit(self, *events: JournalEvent):
+        """Queue events for writing, in order"""
+        if settings.journal_enabled:
+            # Under the lock, so close() can't put its sentinel between these events
+            with self._lock:
+                if not self._closed:
+                    if self._thread is None:
+                        self._start()
+                    for event in events:
+                        self._queue.put(event)
+                    return
+            # Closed: write after whatever the writer still has queued
+            self.flush()
+        with get_db() as db:
+            apply_events(db, list(events))
+
+    def flush(self):
+        """Block until every queued event has been committed (or given up on)"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write out the queue and stop the writer thread; later events are written synchronously"""
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join()
+        logger.info("Journal flushed and closed")
+
+    def _start(self):
+        """Start the writer thread (lock held)"""
+        self._queue = queue.Queue(maxsize=self.maxsize or settings.journal_queue_size)
+        self._thread = threading.Thread(target=self._run, name="db-journal", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        batch_size = self.batch_size or settings.journal_batch_size
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = any(e is None for e in batch)
+            events = [e for e in batch if e is not None]
+            try:
+                if events:
+                    self._write(events)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, events: List[JournalEvent]):
+        try:
+            with get_db() as db:
+                apply_events(db, events)
+            return
+        except Exception as e:
+            logger.warning(f"Journal batch of {len(events)} failed ({e}), writing events one by one")
+        # One bad record (e.g. a duplicate order id) must not cost the rest of the batch
+        for event in events:
+            try:
+                with get_db() as db:
+                    apply_events(db, [event])
+            except Exception as e:
+                logger.error(f"Dropped journal event {event!r}: {e}")
+
+
+journal = Journal()
+atexit.register(journal.close)
@@ -1,9 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 
+from octopus.utils.fixed_point import from_fixed
+
 Base = declarative_base()
 
+
+class Fixed(TypeDecorator):
+    """Price, quantity or USDT amount as an INTEGER count of 1e-8 units (octopus.utils.fixed_point)"""
+    impl = Integer
+    cache_ok = True
+
+
 class Trade(Base):
     __tablename__ = 'trades'
     
@@ -13,16 +23,22 @@ class Trade(Base):
     side = Column(String, nullable=False)  # BUY/SELL
     position_side = Column(String, nullable=False)  # LONG/SHORT
     order_type = Column(String, default="MARKET")
-    quantity = Column(Float, nullable=False)
-    price = Column(Float, nullable=False)
-    notional = Column(Float, nullable=False)  # qty * price
+    quantity = Column(Fixed, nullable=False)
+    price = Column(Fixed, nullable=False)
+    notional = Column(Fixed, nullable=False)  # qty * price
     order_id = Column(String, unique=True)
-    realized_pnl = Column(Float, default=0.0)
-    commission = Column(Float, default=0.0)
+    client_order_id = Column(String, unique=True, nullable=True)  # newClientOrderId we sent
+    realized_pnl = Column(Fixed, default=0)
+    commission = Column(Fixed, default=0)
     status = Column(String, default="FILLED")
     
+    __table_args__ = (
+        Index('ix_trades_timestamp', 'timestamp'),
+        Index('ix_trades_symbol_timestamp', 'symbol', 'timestamp'),
+    )
+    
     def __repr__(self):
-        return f"<Trade {self.symbol} {self.side} {self.quantity} @ {self.price}>"
+        return f"<Trade {self.symbol} {self.side} {from_fixed(self.quantity)} @ {from_fixed(self.price)}>"
 
 class Position(Base):
     __tablename__ = 'positions'
@@ -32,26 +48,76 @@ class Position(Base):
     closed_at = Column(DateTime, nullable=True)
     symbol = Column(String, nullable=False)
     position_side = Column(String, nullable=False)
-    entry_price = Column(Float, nullable=False)
-    exit_price = Column(Float, nullable=True)
-    quantity = Column(Float, nullable=False)
+    entry_price = Column(Fixed, nullable=False)
+    exit_price = Column(Fixed, nullable=True)
+    quantity = Column(Fixed, nullable=False)
     leverage = Column(Integer, nullable=False)
-    notional = Column(Float, nullable=False)
+    notional = Column(Fixed, nullable=False)
     hold_time_minutes = Column(Integer, default=0)
-    realized_pnl = Column(Float, default=0.0)
+    realized_pnl = Column(Fixed, default=0)
+    funding_fee = Column(Fixed, default=0)  # funding income while open; a pair's payments are split between its legs
     is_active = Column(Boolean, default=True)
     
+    __table_args__ = (
+        Index('ix_positions_symbol_side_active', 'symbol', 'position_side', 'is_active'),
+    )
+    
     def __repr__(self):
-        return f"<Position {self.symbol} {self.position_side} {self.quantity}>"
+        return f"<Position {self.symbol} {self.position_side} {from_fixed(self.quantity)}>"
 
 class DailyStats(Base):
     __tablename__ = 'daily_stats'
     
     id = Column(Integer, primary_key=True)
-    date = Column(DateTime, default=datetime.utcnow)
-    total_volume = Column(Float, default=0.0)
+    symbol = Column(String, nullable=True)
+    date = Column(DateTime, default=datetime.utcnow)  # UTC day start; ALL_TIME for the running total
+    total_volume = Column(Fixed, default=0)
     num_trades = Column(Integer, default=0)
-    realized_pnl = Column(Float, default=0.0)
-    fees_paid = Column(Float, default=0.0)
+    realized_pnl = Column(Fixed, default=0)
+    fees_paid = Column(Fixed, default=0)
+    positions_closed = Column(Integer, default=0)
+    hold_minutes = Column(Float, default=0.0)  # summed over positions_closed
+    funding_fees = Column(Fixed, default=0)  # funding income (negative when paid)
     rh_points_estimated = Column(Float, default=0.0)
+    
+    __table_args__ = (
+        Index('ux_daily_stats_symbol_date', 'symbol', 'date', unique=True),
+    )
+
+
+class StrategyCheckpoint(Base):
+    __tablename__ = 'strategy_checkpoints'
+    
+    symbol = Column(String, primary_key=True)  # one row per strategy, overwritten in place
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    state = Column(String, nullable=False)  # JSON: active legs, protective order ids, halted flag
+    
+    def __repr__(self):
+        return f"<StrategyCheckpoint {self.symbol} @ {self.updated_at}>"
 
+
+class HedgeImbalance(Base):
+    __tablename__ = 'hedge_imbalances'
+    
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    ended_at = Column(DateTime, nullable=True)
+    duration_sec = Column(Float, nullable=False)  # until LONG and SHORT quantities matched again
+    max_imbalance = Column(Fixed, default=0)  # largest LONG/SHORT quantity gap seen
+    correction = Column(String, nullable=True)  # e.g. "TOP_UP SHORT 0.002"; None if the legs caught up
+    
+    def __repr__(self):
+        return f"<HedgeImbalance {self.symbol} {self.duration_sec:.2f}s>"
+
+
+class SyncCursor(Base):
+    __tablename__ = 'sync_cursors'
+    
+    name = Column(String, primary_key=True)  # e.g. "userTrades:BTCUSDT", "income:FUNDING_FEE:BTCUSDT"
+    last_id = Column(Integer, default=0)  # last trade id / income tranId read
+    last_time = Column(Integer, default=0)  # its exchange time, ms
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SyncCursor {self.name} {self.last_id}>"
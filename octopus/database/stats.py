@@ -0,0 +1,182 @@
+from loguru import logger
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+from octopus.database.db import get_db
+from octopus.database.models import DailyStats, Position, Trade
+from octopus.utils.fixed_point import from_fixed
+
+# Date of each symbol's running all-time row
+ALL_TIME = datetime(1970, 1, 1)
+
+STATS_COLUMNS = (
+    "total_volume", "num_trades", "realized_pnl", "fees_paid", "positions_closed", "hold_minutes", "funding_fees"
+)
+
+# Volume, PnL, fee and funding deltas are fixed-point ints (1e-8 USDT), like their columns
+StatsDeltas = Dict[Tuple[str, datetime], Dict[str, float]]
+
+
+class TradingStats(NamedTuple):
+    volume: float = 0.0
+    realized_pnl: float = 0.0
+    fees: float = 0.0
+    num_trades: int = 0
+    positions_closed: int = 0
+    hold_minutes: float = 0.0
+    funding: float = 0.0
+
+    @property
+    def avg_hold_minutes(self) -> float:
+        return self.hold_minutes / self.positions_closed if self.positions_closed else 0.0
+
+
+def day_start(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def new_deltas() -> StatsDeltas:
+    return defaultdict(lambda: dict.fromkeys(STATS_COLUMNS, 0))
+
+
+def add_trade(deltas: StatsDeltas, symbol: str, ts: datetime, notional: int, realized_pnl: int, commission: int):
+    delta = deltas[(symbol, day_start(ts))]
+    delta["total_volume"] += notional
+    delta["num_trades"] += 1
+    delta["realized_pnl"] += realized_pnl
+    delta["fees_paid"] += commission
+
+
+def add_fill_costs(deltas: StatsDeltas, symbol: str, ts: datetime, realized_pnl: int, commission: int):
+    """PnL and commission of fills reconciled onto an already counted trade"""
+    delta = deltas[(symbol, day_start(ts))]
+    delta["realized_pnl"] += realized_pnl
+    delta["fees_paid"] += commission
+
+
+def add_closed_position(deltas: StatsDeltas, symbol: str, ts: datetime, hold_minutes: float):
+    # Realized PnL is counted from the fills (trades), not again per position
+    delta = deltas[(symbol, day_start(ts))]
+    delta["positions_closed"] += 1
+    delta["hold_minutes"] += hold_minutes
+
+
+def add_funding(deltas: StatsDeltas, symbol: str, ts: datetime, amount: int):
+    deltas[(symbol, day_start(ts))]["funding_fees"] += amount
+
+
+def apply_deltas(db, deltas: StatsDeltas):
+    """
+    Add `deltas` to the day rows and the all-time rows in one upsert.
+
+    Runs in the caller's session, so the stats commit together with the
+    trades and positions they describe.
+    """
+    if not deltas:
+        return
+    merged = new_deltas()
+    for (symbol, day), delta in deltas.items():
+        for key in ((symbol, day), (symbol, ALL_TIME)):
+            for column, value in delta.items():
+                merged[key][column] += value
+    stmt = insert(DailyStats).values([
+        {"symbol": symbol, "date": day, **delta} for (symbol, day), delta in merged.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol", "date"],
+        # Rows from before a column was added hold NULL there
+        set_={column: func.coalesce(getattr(DailyStats, column), 0) + stmt.excluded[column] for column in STATS_COLUMNS}
+    )
+    db.execute(stmt)
+
+
+def get_stats(symbol: Optional[str] = None, now: Optional[datetime] = None) -> Dict[str, TradingStats]:
+    """
+    Today, the last 7 days and all time for a symbol (or every symbol).
+
+    Reads at most 8 DailyStats rows per symbol, however long the history.
+    Amounts are summed in fixed point and returned as floats.
+    """
+    today = day_start(now or datetime.utcnow())
+    week_start = today - timedelta(days=6)
+    with get_db() as db:
+        query = db.query(DailyStats).filter(
+            (DailyStats.date >= week_start) | (DailyStats.date == ALL_TIME)
+        )
+        if symbol is not None:
+            query = query.filter(DailyStats.symbol == symbol)
+        else:
+            query = query.filter(DailyStats.symbol.isnot(None))
+        totals = {period: dict.fromkeys(STATS_COLUMNS, 0) for period in ("today", "week", "all_time")}
+        for row in query:
+            if row.date == ALL_TIME:
+                periods = ("all_time",)
+            elif row.date == today:
+                periods = ("today", "week")
+            elif row.date <= today:
+                periods = ("week",)
+            else:
+                continue
+            for period in periods:
+                for column in STATS_COLUMNS:
+                    totals[period][column] += getattr(row, column) or 0
+    return {
+        period: TradingStats(
+            volume=from_fixed(t["total_volume"]),
+            realized_pnl=from_fixed(t["realized_pnl"]),
+            fees=from_fixed(t["fees_paid"]),
+            num_trades=t["num_trades"],
+            positions_closed=t["positions_closed"],
+            hold_minutes=t["hold_minutes"],
+            funding=from_fixed(t["funding_fees"])
+        )
+        for period, t in totals.items()
+    }
+
+
+def rebuild_daily_stats(force: bool = False):
+    """
+    Recompute DailyStats from the trades and positions tables.
+
+    Runs once for databases that predate incremental stats (trades but no
+    stats rows); afterwards every write keeps them current. Positions keep
+    their funding as one total, so it is counted on the day they closed (or
+    opened, while still open) rather than per settlement, and funding paid
+    while no leg was open isn't recorded anywhere to rebuild from.
+    """
+    with get_db() as db:
+        has_stats = db.query(DailyStats.id).filter(DailyStats.symbol.isnot(None)).first() is not None
+        if has_stats and not force:
+            return
+        if db.query(Trade.id).first() is None and db.query(Position.id).first() is None:
+            return
+        db.query(DailyStats).filter(DailyStats.symbol.isnot(None)).delete()
+        deltas = new_deltas()
+        day = func.date(Trade.timestamp)
+        for symbol, date, volume, count, pnl, fees in db.query(
+            Trade.symbol, day, func.sum(Trade.notional), func.count(Trade.id),
+            func.sum(Trade.realized_pnl), func.sum(Trade.commission)
+        ).group_by(Trade.symbol, day):
+            delta = deltas[(symbol, datetime.strptime(date, "%Y-%m-%d"))]
+            delta["total_volume"] += volume or 0
+            delta["num_trades"] += count
+            delta["realized_pnl"] += pnl or 0
+            delta["fees_paid"] += fees or 0
+        day = func.date(Position.closed_at)
+        for symbol, date, count, hold in db.query(
+            Position.symbol, day, func.count(Position.id), func.sum(Position.hold_time_minutes)
+        ).filter(Position.closed_at.isnot(None)).group_by(Position.symbol, day):
+            delta = deltas[(symbol, datetime.strptime(date, "%Y-%m-%d"))]
+            delta["positions_closed"] += count
+            delta["hold_minutes"] += hold or 0.0
+        day = func.date(func.coalesce(Position.closed_at, Position.opened_at))
+        for symbol, date, funding in db.query(
+            Position.symbol, day, func.sum(Position.funding_fee)
+        ).filter(Position.funding_fee != 0).group_by(Position.symbol, day):
+            deltas[(symbol, datetime.strptime(date, "%Y-%m-%d"))]["funding_fees"] += funding or 0
+        apply_deltas(db, deltas)
+    logger.info(f"Rebuilt daily stats for {len(deltas)} symbol-days")
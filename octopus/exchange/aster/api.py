@@ -24,6 +24,9 @@ class API(object):
         proxies=None,
         show_limit_usage=False,
         show_header=False,
+        rate_limiter=None,
+        clock=None,
+        pool_size=10,
     ):
         self.key = key
         self.secret = secret
@@ -31,7 +34,13 @@ class API(object):
         self.show_limit_usage = False
         self.show_header = False
         self.proxies = None
+        self.rate_limiter = rate_limiter
+        self.clock = clock
         self.session = requests.Session()
+        # Size the keep-alive pool for the number of threads sharing this client
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.session.headers.update(
             {
                 "Content-Type": "application/json;charset=utf-8",
@@ -66,7 +75,7 @@ class API(object):
     def sign_request(self, http_method, url_path, payload=None, special=False):
         if payload is None:
             payload = {}
-        payload["timestamp"] = get_timestamp()
+        self._stamp(payload)
         query_string = self._prepare_params(payload, special)
         signature = self._get_sign(query_string)
         url_path = url_path + "?" + query_string + "&signature=" + signature
@@ -83,7 +92,7 @@ class API(object):
         """
         if payload is None:
             payload = {}
-        payload["timestamp"] = get_timestamp()
+        self._stamp(payload)
         query_string = self._prepare_params(payload)
         signature = self._get_sign(query_string)
         url_path = url_path + "?" + query_string + "&signature=" + signature
@@ -102,8 +111,12 @@ class API(object):
                 "proxies": self.proxies,
             }
         )
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(http_method, url_path, payload)
         response = self._dispatch_request(http_method)(**params)
         logging.debug("raw response from server:" + response.text)
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(response.headers)
         self._handle_exception(response)
 
         try:
@@ -133,6 +146,15 @@ class API(object):
 
         return data
 
+    def _stamp(self, payload):
+        """Set timestamp (and recvWindow) from the synced clock when one is attached"""
+        if self.clock is None:
+            payload["timestamp"] = get_timestamp()
+            return
+        payload["timestamp"] = self.clock.timestamp()
+        if payload.get("recvWindow") is None:
+            payload["recvWindow"] = self.clock.recv_window
+
     def _prepare_params(self, params, special=False):
         return encoded_string(cleanNoneValue(params),special)
 
@@ -152,6 +174,8 @@ class API(object):
         status_code = response.status_code
         if status_code < 400:
             return
+        if status_code in (418, 429) and self.rate_limiter is not None:
+            self.rate_limiter.on_rate_limited(status_code, response.headers)
         if 400 <= status_code < 500:
             try:
                 err = json.loads(response.text)
@@ -0,0 +1,205 @@
+import hmac
+import asyncio
+import json
+import logging
+import hashlib
+from json import JSONDecodeError
+
+import aiohttp
+from yarl import URL
+
+from .error import ClientError, ServerError
+from .lib.utils import get_timestamp
+from .lib.utils import cleanNoneValue
+from .lib.utils import encoded_string
+from .lib.utils import check_required_parameter
+
+
+class AsyncAPI(object):
+    """asyncio counterpart of ``API``.
+
+    Requests are sent through one pooled ``aiohttp.ClientSession`` so that
+    independent calls can be awaited concurrently with ``asyncio.gather``.
+    Signing, parameter encoding and error mapping are identical to ``API``.
+    """
+
+    def __init__(
+        self,
+        key=None,
+        secret=None,
+        base_url=None,
+        timeout=None,
+        proxy=None,
+        show_limit_usage=False,
+        show_header=False,
+        pool_size=100,
+        session=None,
+        rate_limiter=None,
+        clock=None,
+    ):
+        self.key = key
+        self.secret = secret
+        self.timeout = timeout
+        self.show_limit_usage = False
+        self.show_header = False
+        self.proxy = None
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.clock = clock
+        self.headers = cleanNoneValue(
+            {
+                "Content-Type": "application/json;charset=utf-8",
+                "User-Agent": "aster-connector/1.0.0",
+                "X-MBX-APIKEY": key,
+            }
+        )
+        self._session = session
+
+        if base_url:
+            self.base_url = base_url
+
+        if show_limit_usage is True:
+            self.show_limit_usage = True
+
+        if show_header is True:
+            self.show_header = True
+
+        if type(proxy) is str:
+            self.proxy = proxy
+
+        return
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def query(self, url_path, payload=None):
+        return await self.send_request("GET", url_path, payload=payload)
+
+    async def limit_request(self, http_method, url_path, payload=None):
+        """limit request is for those endpoints require API key in the header"""
+
+        check_required_parameter(self.key, "apiKey")
+        return await self.send_request(http_method, url_path, payload=payload)
+
+    async def sign_request(self, http_method, url_path, payload=None, special=False):
+        if payload is None:
+            payload = {}
+        self._stamp(payload)
+        query_string = self._prepare_params(payload, special)
+        signature = self._get_sign(query_string)
+        url_path = url_path + "?" + query_string + "&signature=" + signature
+        return await self.send_request(http_method, url_path)
+
+    async def limited_encoded_sign_request(self, http_method, url_path, payload=None):
+        """See ``API.limited_encoded_sign_request``."""
+        if payload is None:
+            payload = {}
+        self._stamp(payload)
+        query_string = self._prepare_params(payload)
+        signature = self._get_sign(query_string)
+        url_path = url_path + "?" + query_string + "&signature=" + signature
+        return await self.send_request(http_method, url_path)
+
+    async def send_request(self, http_method, url_path, payload=None, special=False):
+        if payload is None:
+            payload = {}
+        url = self.base_url + url_path
+        query_string = self._prepare_params(payload, special)
+        if query_string:
+            url = url + ("&" if "?" in url else "?") + query_string
+        logging.debug("url: " + url)
+
+        if self.rate_limiter is not None:
+            await self._acquire(http_method, url_path, payload)
+        session = self._get_session()
+        # The query string is already encoded (and signed), so it must not be
+        # re-quoted by yarl or the signature would no longer match.
+        async with session.request(
+            http_method, URL(url, encoded=True), proxy=self.proxy
+        ) as response:
+            text = await response.text()
+            logging.debug("raw response from server:" + text)
+            if self.rate_limiter is not None:
+                self.rate_limiter.update(response.headers)
+            self._handle_exception(response.status, text, response.headers)
+
+            try:
+                data = json.loads(text)
+            except ValueError:
+                data = text
+            result = {}
+
+            if self.show_limit_usage:
+                limit_usage = {}
+                for key in response.headers.keys():
+                    key = key.lower()
+                    if (
+                        key.startswith("x-mbx-used-weight")
+                        or key.startswith("x-mbx-order-count")
+                        or key.startswith("x-sapi-used")
+                    ):
+                        limit_usage[key] = response.headers[key]
+                result["limit_usage"] = limit_usage
+
+            if self.show_header:
+                result["header"] = response.headers
+
+        if len(result) != 0:
+            result["data"] = data
+            return result
+
+        return data
+
+    async def _acquire(self, http_method, url_path, payload):
+        while True:
+            delay = self.rate_limiter.reserve(http_method, url_path, payload)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _stamp(self, payload):
+        """Set timestamp (and recvWindow) from the synced clock when one is attached"""
+        if self.clock is None:
+            payload["timestamp"] = get_timestamp()
+            return
+        payload["timestamp"] = self.clock.timestamp()
+        if payload.get("recvWindow") is None:
+            payload["recvWindow"] = self.clock.recv_window
+
+    def _prepare_params(self, params, special=False):
+        return encoded_string(cleanNoneValue(params), special)
+
+    def _get_sign(self, data):
+        m = hmac.new(self.secret.encode("utf-8"), data.encode("utf-8"), hashlib.sha256)
+        return m.hexdigest()
+
+    def _handle_exception(self, status_code, text, headers):
+        if status_code < 400:
+            return
+        if status_code in (418, 429) and self.rate_limiter is not None:
+            self.rate_limiter.on_rate_limited(status_code, headers)
+        if 400 <= status_code < 500:
+            try:
+                err = json.loads(text)
+            except JSONDecodeError:
+                raise ClientError(status_code, None, text, headers)
+            raise ClientError(status_code, err["code"], err["msg"], headers)
+        raise ServerError(status_code, text)
@@ -0,0 +1,271 @@
+import time
+import logging
+import threading
+from urllib.parse import parse_qsl
+
+
+INTERVAL_MS = {
+    "SECOND": 1000,
+    "MINUTE": 60 * 1000,
+    "HOUR": 60 * 60 * 1000,
+    "DAY": 24 * 60 * 60 * 1000,
+}
+
+# header suffix letter used by X-MBX-USED-WEIGHT-(intervalNum)(intervalLetter)
+INTERVAL_LETTER = {"SECOND": "s", "MINUTE": "m", "HOUR": "h", "DAY": "d"}
+
+# Used until exchange_info() has been loaded.
+DEFAULT_RATE_LIMITS = [
+    {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": 2400},
+    {"rateLimitType": "ORDERS", "interval": "MINUTE", "intervalNum": 1, "limit": 1200},
+]
+
+
+def _limit_weight(limit, table):
+    limit = int(limit) if limit is not None else None
+    for upper, weight in table:
+        if limit is None or limit <= upper:
+            return weight
+    return table[-1][1]
+
+
+def _depth_weight(params):
+    return _limit_weight(params.get("limit", 500), [(50, 2), (100, 5), (500, 10), (1000, 20)])
+
+
+def _klines_weight(params):
+    return _limit_weight(params.get("limit", 500), [(99, 1), (499, 2), (1000, 5), (1500, 10)])
+
+
+def _symbol_weight(with_symbol, without_symbol):
+    return lambda params: with_symbol if params.get("symbol") else without_symbol
+
+
+def _batch_size(params):
+    orders = params.get("batchOrders")
+    if isinstance(orders, (list, tuple)):
+        return len(orders)
+    return str(orders).count("{") or 1
+
+
+# Weights from the "Weight:" section of each endpoint in the futures API docs.
+# Anything not listed counts as 1.
+ENDPOINT_WEIGHTS = {
+    ("GET", "/fapi/v1/depth"): _depth_weight,
+    ("GET", "/fapi/v1/historicalTrades"): 20,
+    ("GET", "/fapi/v1/aggTrades"): 20,
+    ("GET", "/fapi/v1/klines"): _klines_weight,
+    ("GET", "/fapi/v1/indexPriceKlines"): _klines_weight,
+    ("GET", "/fapi/v1/markPriceKlines"): _klines_weight,
+    ("GET", "/fapi/v1/ticker/24hr"): _symbol_weight(1, 40),
+    ("GET", "/fapi/v1/ticker/price"): _symbol_weight(1, 2),
+    ("GET", "/fapi/v1/ticker/bookTicker"): _symbol_weight(1, 2),
+    ("GET", "/fapi/v1/positionSide/dual"): 30,
+    ("GET", "/fapi/v1/multiAssetsMargin"): 30,
+    ("POST", "/fapi/v1/batchOrders"): 5,
+    ("POST", "/fapi/v1/countdownCancelAll"): 10,
+    ("GET", "/fapi/v1/openOrders"): _symbol_weight(1, 40),
+    ("GET", "/fapi/v1/allOrders"): 5,
+    ("GET", "/fapi/v2/balance"): 5,
+    ("GET", "/fapi/v2/account"): 5,
+    ("GET", "/fapi/v2/positionRisk"): 5,
+    ("GET", "/fapi/v1/userTrades"): 5,
+    ("GET", "/fapi/v1/income"): 30,
+    ("GET", "/fapi/v1/adlQuantile"): 5,
+    ("GET", "/fapi/v1/forceOrders"): _symbol_weight(20, 50),
+    ("GET", "/fapi/v1/commissionRate"): 20,
+}
+
+# Endpoints counted against the ORDERS limiters, with the number of orders sent.
+ORDER_ENDPOINTS = {
+    ("POST", "/fapi/v1/order"): 1,
+    ("POST", "/fapi/v1/batchOrders"): _batch_size,
+}
+
+
+class _Window(object):
+    """Fixed window counter for one entry of the ``rateLimits`` array."""
+
+    def __init__(self, rate_limit_type, interval, interval_num, limit):
+        self.rate_limit_type = rate_limit_type
+        self.interval_ms = INTERVAL_MS[interval] * interval_num
+        self.limit = limit
+        self.header = "{}-{}{}".format(
+            "x-mbx-used-weight" if rate_limit_type == "REQUEST_WEIGHT" else "x-mbx-order-count",
+            interval_num,
+            INTERVAL_LETTER[interval],
+        )
+        self.window_id = 0
+        self.used = 0
+
+    def roll(self, now_ms):
+        window_id = now_ms // self.interval_ms
+        if window_id != self.window_id:
+            self.window_id = window_id
+            self.used = 0
+
+    def wait_ms(self, now_ms, cost, budget):
+        """Milliseconds until ``cost`` more units fit in this window."""
+        self.roll(now_ms)
+        if self.used + cost <= budget:
+            return 0
+        return (self.window_id + 1) * self.interval_ms - now_ms
+
+
+class RateLimiter(object):
+    """Client side request-weight and order-count limiter.
+
+    Usage is counted locally as requests are sent and corrected from the
+    ``X-MBX-USED-WEIGHT-*`` / ``X-MBX-ORDER-COUNT-*`` response headers, which
+    also account for other processes sharing the IP or account. Requests that
+    would push a window above ``safety_margin`` of its limit are delayed until
+    the window rolls over. A 429/418 response blocks all requests until its
+    ``Retry-After`` has elapsed.
+    """
+
+    def __init__(self, rate_limits=None, safety_margin=0.9, clock=None):
+        self.safety_margin = safety_margin
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self._blocked_until_ms = 0
+        self.weight_windows = []
+        self.order_windows = []
+        self.load_rate_limits(rate_limits or DEFAULT_RATE_LIMITS)
+
+    def load_exchange_info(self, exchange_info):
+        """Replace the limiters with the ``rateLimits`` array of ``exchange_info()``."""
+        rate_limits = exchange_info.get("rateLimits") if isinstance(exchange_info, dict) else None
+        if rate_limits:
+            self.load_rate_limits(rate_limits)
+
+    def load_rate_limits(self, rate_limits):
+        weight_windows, order_windows = [], []
+        for item in rate_limits:
+            window = _Window(
+                item["rateLimitType"], item["interval"], int(item["intervalNum"]), int(item["limit"])
+            )
+            if window.rate_limit_type == "ORDERS":
+                order_windows.append(window)
+            else:
+                weight_windows.append(window)
+        with self._lock:
+            self.weight_windows = weight_windows
+            self.order_windows = order_windows
+
+    def cost(self, http_method, url_path, payload=None):
+        """Return ``(weight, orders)`` a request will consume."""
+        path, params = _split_path(url_path, payload)
+        key = (http_method, path)
+        weight = ENDPOINT_WEIGHTS.get(key, 1)
+        if callable(weight):
+            weight = weight(params)
+        orders = ORDER_ENDPOINTS.get(key, 0)
+        if callable(orders):
+            orders = orders(params)
+        return weight, orders
+
+    def reserve(self, http_method, url_path, payload=None):
+        """Try to reserve capacity for a request.
+
+        Returns 0 and records the usage when the request may be sent now,
+        otherwise the number of seconds to wait before trying again.
+        """
+        weight, orders = self.cost(http_method, url_path, payload)
+        now_ms = self._now_ms()
+        with self._lock:
+            wait_ms = max(0, self._blocked_until_ms - now_ms)
+            for window in self.weight_windows:
+                wait_ms = max(wait_ms, window.wait_ms(now_ms, weight, self._budget(window)))
+            if orders:
+                for window in self.order_windows:
+                    wait_ms = max(wait_ms, window.wait_ms(now_ms, orders, self._budget(window)))
+            if wait_ms > 0:
+                return wait_ms / 1000.0
+            for window in self.weight_windows:
+                window.used += weight
+            if orders:
+                for window in self.order_windows:
+                    window.used += orders
+        return 0
+
+    def acquire(self, http_method, url_path, payload=None):
+        """Block until the request fits within every window."""
+        while True:
+            delay = self.reserve(http_method, url_path, payload)
+            if delay <= 0:
+                return
+            if delay > 1:
+                logging.warning("rate limit reached, delaying %s %s by %.1fs", http_method, url_path, delay)
+            time.sleep(delay)
+
+    def update(self, headers):
+        """Sync local usage with the usage reported by the server."""
+        if not headers:
+            return
+        lowered = {key.lower(): value for key, value in headers.items()}
+        now_ms = self._now_ms()
+        with self._lock:
+            for window in self.weight_windows + self.order_windows:
+                value = lowered.get(window.header)
+                if value is None:
+                    continue
+                window.roll(now_ms)
+                try:
+                    window.used = max(window.used, int(value))
+                except ValueError:
+                    continue
+
+    def on_rate_limited(self, status_code, headers):
+        """Record a 429/418 so no further request is sent before ``Retry-After``."""
+        retry_after = None
+        if headers:
+            retry_after = {key.lower(): value for key, value in headers.items()}.get("retry-after")
+        now_ms = self._now_ms()
+        with self._lock:
+            if retry_after is not None:
+                try:
+                    blocked_until = now_ms + int(float(retry_after) * 1000)
+                except ValueError:
+                    blocked_until = now_ms
+            else:
+                # No hint from the server: wait for the shortest window to roll over.
+                windows = self.weight_windows + self.order_windows
+                blocked_until = min(
+                    ((now_ms // w.interval_ms) + 1) * w.interval_ms for w in windows
+                ) if windows else now_ms + 1000
+            self._blocked_until_ms = max(self._blocked_until_ms, blocked_until)
+        logging.warning(
+            "HTTP %s received, requests blocked for %.1fs",
+            status_code,
+            (self._blocked_until_ms - now_ms) / 1000.0,
+        )
+
+    @property
+    def blocked_for(self):
+        """Seconds left on the current 429/418 back-off."""
+        return max(0, self._blocked_until_ms - self._now_ms()) / 1000.0
+
+    def usage(self):
+        """Current usage per header name, for logging."""
+        now_ms = self._now_ms()
+        with self._lock:
+            result = {}
+            for window in self.weight_windows + self.order_windows:
+                window.roll(now_ms)
+                result[window.header] = (window.used, window.limit)
+            return result
+
+    def _budget(self, window):
+        return max(1, int(window.limit * self.safety_margin))
+
+    def _now_ms(self):
+        return int(self._clock() * 1000)
+
+
+def _split_path(url_path, payload):
+    params = dict(payload or {})
+    if "?" in url_path:
+        url_path, query_string = url_path.split("?", 1)
+        for key, value in parse_qsl(query_string, keep_blank_values=True):
+            params.setdefault(key, value)
+    return url_path, params
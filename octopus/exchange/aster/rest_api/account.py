@@ -1,5 +1,6 @@
 from ..lib.utils import check_required_parameter
 from ..lib.utils import check_required_parameters
+from ..lib.utils import convert_list_to_json_array
 
 
 def change_position_mode(self, dualSidePosition: str, **kwargs):
@@ -113,7 +114,7 @@ def query_order(self, symbol: str, orderId: int = None, origClientOrderId: str =
     """
 
     check_required_parameter(symbol, "symbol")
-    params = {"symbol": symbol, **kwargs}
+    params = {"symbol": symbol, "orderId": orderId, "origClientOrderId": origClientOrderId, **kwargs}
     url_path = "/fapi/v1/order"
     return self.sign_request("GET", url_path, params)
 
@@ -131,7 +132,7 @@ def cancel_order(self, symbol: str, orderId: int = None, origClientOrderId: str
     """
 
     check_required_parameter(symbol, "symbol")
-    params = {"symbol": symbol, **kwargs}
+    params = {"symbol": symbol, "orderId": orderId, "origClientOrderId": origClientOrderId, **kwargs}
     url_path = "/fapi/v1/order"
     return self.sign_request("DELETE", url_path, params)
 
@@ -152,7 +153,7 @@ def cancel_open_orders(self, symbol: str, **kwargs):
     return self.sign_request("DELETE", url_path, params)
 
 
-def cancel_batch_order(self, symbol: str, orderIdList: list, origClientOrderIdList: list, **kwargs):
+def cancel_batch_order(self, symbol: str, orderIdList: list = None, origClientOrderIdList: list = None, **kwargs):
     """
     |
     | **Cancel Multiple Orders (TRADE)**
@@ -164,7 +165,12 @@ def cancel_batch_order(self, symbol: str, orderIdList: list, origClientOrderIdLi
     """
     
     check_required_parameter(symbol, "symbol")
-    params = {"symbol": symbol, **kwargs}
+    params = {
+        "symbol": symbol,
+        "orderIdList": convert_list_to_json_array(orderIdList),
+        "origClientOrderIdList": convert_list_to_json_array(origClientOrderIdList),
+        **kwargs,
+    }
     url_path = "/fapi/v1/batchOrders"
     return self.sign_request("DELETE", url_path, params)
 
@@ -198,7 +204,7 @@ def get_open_orders(self, symbol: str, orderId: int = None, origClientOrderId: s
     """
 
     check_required_parameter(symbol, "symbol")
-    params = {"symbol": symbol, **kwargs}
+    params = {"symbol": symbol, "orderId": orderId, "origClientOrderId": origClientOrderId, **kwargs}
     url_path = "/fapi/v1/openOrder"
     return self.sign_request("GET", url_path, params)
 
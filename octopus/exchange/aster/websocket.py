@@ -0,0 +1,245 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+
+import aiohttp
+
+
+MAX_STREAMS_PER_CONNECTION = 200
+# The server disconnects above 10 incoming messages per second; stay below it.
+MAX_MESSAGES_PER_SECOND = 5
+# Connections are dropped at the 24 hour mark, so roll over well before that.
+MAX_CONNECTION_LIFETIME = 23 * 60 * 60
+
+
+class StreamConnection(object):
+    """A single combined-stream websocket connection.
+
+    Streams given at construction time are passed in the connection URL;
+    streams added later are sent as throttled ``SUBSCRIBE`` messages. Server
+    pings are answered by aiohttp (``autoping``) and we send our own pings
+    through ``heartbeat`` so dead connections are noticed quickly. The
+    connection is replaced before ``max_lifetime`` elapses: the new socket is
+    opened first and the old one closed afterwards, so no message is missed.
+    ``on_connect`` is awaited after every (re)connect, before messages are read.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        streams,
+        callback,
+        path="/stream",
+        max_lifetime=MAX_CONNECTION_LIFETIME,
+        heartbeat=60,
+        reconnect_delay=1,
+        max_reconnect_delay=60,
+        on_connect=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.path = path
+        self.streams = list(streams)
+        self.callback = callback
+        self.max_lifetime = max_lifetime
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.on_connect = on_connect
+        self.connected_at = None
+        self._ws = None
+        self._session = None
+        self._stopped = False
+        self._request_id = 0
+        self._sent = []
+
+    @property
+    def url(self):
+        if self.path == "/stream":
+            return "{}/stream?streams={}".format(self.base_url, "/".join(self.streams))
+        return self.base_url + self.path
+
+    async def run(self):
+        delay = self.reconnect_delay
+        self._session = aiohttp.ClientSession()
+        try:
+            while not self._stopped:
+                try:
+                    ws = await self._connect()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logging.warning("websocket connect to %s failed: %s", self.base_url, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    continue
+                delay = self.reconnect_delay
+                self._ws = ws
+                await self._read_until_rollover(ws)
+        finally:
+            if self._ws is not None and not self._ws.closed:
+                await self._ws.close()
+            await self._session.close()
+
+    async def subscribe(self, streams):
+        streams = [s for s in streams if s not in self.streams]
+        if not streams:
+            return
+        self.streams.extend(streams)
+        if self._ws is not None and not self._ws.closed:
+            await self._send({"method": "SUBSCRIBE", "params": streams})
+
+    async def unsubscribe(self, streams):
+        streams = [s for s in streams if s in self.streams]
+        if not streams:
+            return
+        self.streams = [s for s in self.streams if s not in streams]
+        if self._ws is not None and not self._ws.closed:
+            await self._send({"method": "UNSUBSCRIBE", "params": streams})
+
+    async def send(self, message):
+        """Send a raw JSON message, respecting the incoming message limit.
+
+        Messages sent while disconnected are dropped; streams are part of the
+        URL used on reconnect anyway.
+        """
+        if self._ws is not None and not self._ws.closed:
+            await self._send(message)
+
+    async def stop(self):
+        self._stopped = True
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close()
+
+    async def _connect(self):
+        ws = await self._session.ws_connect(self.url, autoping=True, heartbeat=self.heartbeat)
+        self.connected_at = time.monotonic()
+        logging.info("websocket connected: %s (%d streams)", self.base_url, len(self.streams))
+        if self.on_connect is not None:
+            try:
+                await self.on_connect()
+            except Exception:
+                logging.exception("websocket on_connect callback failed")
+        return ws
+
+    async def reconnect(self):
+        """Drop the current socket; ``run`` reconnects using the current ``url``."""
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close()
+
+    async def _read_until_rollover(self, ws):
+        while not self._stopped:
+            remaining = self.max_lifetime - (time.monotonic() - self.connected_at)
+            if remaining <= 0:
+                ws = await self._rollover(ws)
+                continue
+            try:
+                msg = await asyncio.wait_for(ws.receive(), timeout=remaining)
+            except asyncio.TimeoutError:
+                continue
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                self._dispatch(msg.data)
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                logging.warning("websocket closed: %s (%s)", self.base_url, ws.exception() or msg.extra)
+                return
+
+    async def _rollover(self, old_ws):
+        try:
+            new_ws = await self._connect()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning("websocket rollover failed, keeping old connection: %s", e)
+            self.connected_at = time.monotonic() - self.max_lifetime + self.reconnect_delay
+            return old_ws
+        self._ws = new_ws
+        # Drain what the old socket already has buffered, then drop it.
+        while True:
+            try:
+                msg = await asyncio.wait_for(old_ws.receive(), timeout=0.5)
+            except asyncio.TimeoutError:
+                break
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            self._dispatch(msg.data)
+        await old_ws.close()
+        return new_ws
+
+    async def _send(self, message):
+        now = time.monotonic()
+        self._sent = [t for t in self._sent if now - t < 1]
+        if len(self._sent) >= MAX_MESSAGES_PER_SECOND:
+            await asyncio.sleep(1 - (now - self._sent[0]))
+        self._request_id += 1
+        message = dict(message, id=self._request_id)
+        self._sent.append(time.monotonic())
+        await self._ws.send_str(json.dumps(message))
+
+    def _dispatch(self, raw):
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            return
+        if isinstance(payload, dict) and "result" in payload and "id" in payload:
+            return
+        try:
+            self.callback(payload)
+        except Exception:
+            logging.exception("websocket callback failed")
+
+
+class StreamThread(object):
+    """Runs a set of ``StreamConnection`` on an event loop in a daemon thread."""
+
+    def __init__(self, name="aster-ws"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._connections = []
+        self._tasks = []
+        self._ready = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def add(self, connection):
+        self._connections.append(connection)
+        if self.loop is not None:
+            self.call(self._spawn(connection))
+        return connection
+
+    def call(self, coro):
+        """Schedule a coroutine on the stream loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout=5):
+        if self.loop is None:
+            return
+        for connection in self._connections:
+            try:
+                self.call(connection.stop()).result(timeout)
+            except Exception as e:
+                logging.warning("websocket stop failed: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self.loop = None
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        for connection in self._connections:
+            self._tasks.append(loop.create_task(connection.run()))
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*self._tasks, return_exceptions=True))
+            loop.close()
+
+    async def _spawn(self, connection):
+        self._tasks.append(asyncio.get_running_loop().create_task(connection.run()))
@@ -1,72 +1,277 @@
 from loguru import logger
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+import itertools
+import time
 from octopus.config.settings import settings
 from octopus.exchange.aster.rest_api import Client as AsterClient
 from octopus.exchange.aster.error import ClientError, ServerError
+from octopus.exchange.aster.rate_limiter import RateLimiter
+from octopus.exchange.clock_sync import ClockSync
+from octopus.exchange.market_stream import MarketDataCache
+from octopus.exchange.retry_policy import ENDPOINT_POLICIES, RetryPolicy, classify
+from octopus.exchange.symbol_info import FILTER_ERROR_CODES, SymbolFilters, SymbolInfoCache
+
+# Every order we send carries a client order id with this prefix, so our orders
+# can be told apart from manual ones when reconciling
+CLIENT_ORDER_ID_PREFIX = "oc-"
+NO_SUCH_ORDER = -2013
+
+# Everything a REST call can raise; classify() tells which of these leave the
+# outcome unknown (the request may or may not have reached the matching engine)
+REQUEST_ERRORS = (Timeout, RequestsConnectionError, ClientError, ServerError)
+
+_order_seq = itertools.count()
+
+
+def new_client_order_id(tag: str = "") -> str:
+    """
+    Unique newClientOrderId (max 36 chars of [.A-Z:/a-z0-9_-]).
+    
+    Generated once per logical order and reused on every retry of it, which is
+    what makes a resend idempotent.
+    """
+    millis = int(time.time() * 1000)
+    return f"{CLIENT_ORDER_ID_PREFIX}{_base36(millis)}-{_base36(next(_order_seq))}{'-' + tag if tag else ''}"[:36]
+
+
+def _base36(n: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+        if n == 0:
+            return out
+
+
+# Leg definitions for a hedge-mode pair: position side -> (open side, close side)
+PAIR_LEGS = {"LONG": ("BUY", "SELL"), "SHORT": ("SELL", "BUY")}
+
+
+class PairOrderError(Exception):
+    """A pair open/close left the legs in a state that could not be repaired"""
+    
+    def __init__(self, message: str, results: Dict[str, Dict[str, Any]]):
+        super().__init__(message)
+        self.results = results
+
 
 class AsterExchangeClient:
     """High-level wrapper around Aster's official Python SDK"""
     
-    def __init__(self):
+    def __init__(self, market_cache: Optional[MarketDataCache] = None):
+        self.market_cache = market_cache
+        self.account_state = None  # AccountState, set when the user data stream runs
+        self.rate_limiter = RateLimiter()
         self.client = AsterClient(
             key=settings.aster_api_key,
             secret=settings.aster_api_secret,
             base_url=settings.aster_base_url,
-            timeout=10
+            timeout=settings.request_timeout_sec,
+            rate_limiter=self.rate_limiter,
+            pool_size=settings.http_pool_size
+        )
+        
+        # Signed requests use the exchange clock and an adaptive recvWindow. Until a sync
+        # succeeds the offset is 0 (the local clock); a -1021 resyncs through the refresher
+        self.clock_sync = ClockSync(self.client, interval_sec=settings.clock_sync_interval_sec)
+        self.client.clock = self.clock_sync
+        try:
+            self.clock_sync.start()
+        except Exception as e:
+            logger.warning(f"Clock sync unavailable, signing with the local clock until it succeeds: {e}")
+        # One exchangeInfo fetch feeds both the symbol filters and the rate limits
+        self.symbol_info = SymbolInfoCache(
+            self.client,
+            ttl=settings.exchange_info_ttl_sec,
+            on_load=self.rate_limiter.load_exchange_info
+        )
+        try:
+            self.symbol_info.refresh()
+        except (ClientError, ServerError) as e:
+            logger.warning(f"Could not load exchange info, using default rate limits: {e}")
+        
+        # Transient errors are retried in-process; stale clock/filters are refreshed first
+        self.retry_policy = RetryPolicy()
+        self.retry_policy.policies["new_order"] = ENDPOINT_POLICIES["new_order"]._replace(
+            max_retries=settings.order_retries
         )
+        self.retry_policy.register_refresher("clock", self.clock_sync.on_timestamp_error)
+        self.retry_policy.register_refresher("symbol_info", self._refresh_symbol_info)
         logger.info("Aster client initialized")
     
+    def get_symbol_filters(self, symbol: str) -> SymbolFilters:
+        """Cached LOT_SIZE/PRICE_FILTER/MIN_NOTIONAL/... rules for a symbol"""
+        return self.symbol_info.get(symbol)
+    
     def get_account_balance(self) -> Dict[str, Any]:
-        """Get account balance"""
+        """Get account balance (from the user data stream when synced)"""
+        if self.account_state is not None and self.account_state.is_synced:
+            return self.account_state.balance()
+        return self.fetch_account_balance()
+    
+    def fetch_account_balance(self) -> Dict[str, Any]:
+        """Get account balance from REST"""
         try:
-            return self.client.balance()
+            return self._call("balance")
         except (ClientError, ServerError) as e:
             logger.error(f"Failed to get balance: {e}")
             raise
     
     def get_position_risk(self, symbol: Optional[str] = None) -> list:
-        """Get current positions"""
+        """Get current positions (from the user data stream when synced)"""
+        if self.account_state is not None and self.account_state.is_synced:
+            return self.account_state.position_risk(symbol)
+        return self.fetch_position_risk(symbol)
+    
+    def fetch_position_risk(self, symbol: Optional[str] = None) -> list:
+        """Get current positions from REST"""
         try:
-            return self.client.get_position_risk(symbol=symbol)
+            return self._call("get_position_risk", symbol=symbol)
         except (ClientError, ServerError) as e:
             logger.error(f"Failed to get positions: {e}")
             raise
     
+    def get_depth(self, symbol: str, limit: int = 100) -> Dict[str, Any]:
+        """REST order book snapshot ({"lastUpdateId", "bids", "asks"})"""
+        try:
+            return self._call("depth", symbol=symbol, limit=limit)
+        except (ClientError, ServerError) as e:
+            logger.error(f"Failed to get depth: {e}")
+            raise
+    
+    def get_account_snapshot(self) -> Dict[str, Any]:
+        """/fapi/v2/account: balances and every position in one request"""
+        try:
+            return self._call("account")
+        except (ClientError, ServerError) as e:
+            logger.error(f"Failed to get account snapshot: {e}")
+            raise
+    
+    def new_listen_key(self) -> str:
+        """Start a user data stream and return its listenKey"""
+        return self._call("new_listen_key")['listenKey']
+    
+    def renew_listen_key(self, listen_key: str):
+        """Extend a listenKey's validity by 60 minutes"""
+        return self._call("renew_listen_key", listen_key)
+    
+    def close_listen_key(self, listen_key: str):
+        """Close a user data stream"""
+        return self._call("close_listen_key", listen_key)
+    
     def place_market_order(
         self,
         symbol: str,
         side: str,  # "BUY" or "SELL"
-        quantity: float,
+        quantity: Union[float, str],  # a decimal string is sent as is (snapped to the lot step)
         position_side: str,  # "LONG" or "SHORT" (hedge mode)
-        reduce_only: bool = False
+        reduce_only: bool = False,
+        client_order_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Place a market order (taker for 2x points)"""
-        try:
-            # Only include reduceOnly parameter if it's True
-            order_params = {
-                "symbol": symbol,
-                "side": side,
-                "type": "MARKET",
-                "quantity": quantity,
-                "positionSide": position_side,
-                "newOrderRespType": "RESULT"
-            }
-            
-            # Only add reduceOnly if it's True
-            if reduce_only:
-                order_params["reduceOnly"] = reduce_only
-                
-            order = self.client.new_order(**order_params)
+        """
+        Place a market order (taker for 2x points)
+        
+        The order carries a client order id; if the request times out or the
+        exchange answers with an unknown status, the order is looked up by that
+        id before it is ever sent again, so a retry can't double the position.
+        """
+        # Only include reduceOnly parameter if it's True
+        order_params = {
+            "symbol": symbol,
+            "side": side,
+            "type": "MARKET",
+            "quantity": quantity,
+            "positionSide": position_side,
+            "newClientOrderId": client_order_id or new_client_order_id(position_side[0] + side[0]),
+            "newOrderRespType": "RESULT"
+        }
+        
+        # Only add reduceOnly if it's True; hedge mode rejects it (-1106), the position side already only reduces
+        if reduce_only and position_side == "BOTH":
+            order_params["reduceOnly"] = reduce_only
+        
+        try:
+            order = self._submit_order(order_params)
             logger.info(f"Order placed: {symbol} {side} {quantity} {position_side} | OrderID: {order['orderId']}")
             return order
         except ClientError as e:
+            # Filter rejections have already refreshed the filters and been retried once
             logger.error(f"Order failed: {e.error_code} - {e.error_message}")
             raise
     
+    def _submit_order(self, order_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Send an order, retrying only after confirming the previous attempt didn't land"""
+        symbol = order_params["symbol"]
+        client_order_id = order_params["newClientOrderId"]
+        
+        def send():
+            # Format on every attempt: a filter rejection refreshes the filters before the retry
+            quantity = self.get_symbol_filters(symbol).format_qty(order_params["quantity"])
+            return self.client.new_order(**{**order_params, "quantity": quantity})
+        
+        try:
+            return self.retry_policy.call(
+                "new_order", send, resolve_unknown=lambda: self.find_order(symbol, client_order_id)
+            )
+        except REQUEST_ERRORS as e:
+            if not classify(e).unknown_outcome:
+                raise
+            existing = self.find_order(symbol, client_order_id)
+            if existing is not None:
+                return existing
+            raise
+    
+    def find_order(self, symbol: str, client_order_id: str) -> Optional[Dict[str, Any]]:
+        """Look up an order by client order id; None if the exchange never received it"""
+        try:
+            return self._call("query_order", symbol=symbol, origClientOrderId=client_order_id)
+        except ClientError as e:
+            if e.error_code == NO_SUCH_ORDER:
+                return None
+            raise
+    
+    def get_all_orders(self, symbol: str, **kwargs) -> List[Dict[str, Any]]:
+        """All orders of a symbol (active, canceled or filled)"""
+        try:
+            return self._call("get_all_orders", symbol=symbol, **kwargs)
+        except (ClientError, ServerError) as e:
+            logger.error(f"Failed to get orders: {e}")
+            raise
+    
+    def get_account_trades(self, symbol: str, **kwargs) -> List[Dict[str, Any]]:
+        """Our fills (userTrades) with their commission and realized PnL, oldest first"""
+        try:
+            return self._call("get_account_trades", symbol=symbol, **kwargs)
+        except (ClientError, ServerError) as e:
+            logger.error(f"Failed to get account trades: {e}")
+            raise
+    
+    def get_income_history(self, **kwargs) -> List[Dict[str, Any]]:
+        """Income entries (REALIZED_PNL, COMMISSION, FUNDING_FEE, ...), oldest first"""
+        try:
+            return self._call("get_income_history", **kwargs)
+        except (ClientError, ServerError) as e:
+            logger.error(f"Failed to get income history: {e}")
+            raise
+    
+    def _refresh_symbol_info(self):
+        """Reload filters after a filter rejection; they may have changed"""
+        try:
+            self.symbol_info.refresh()
+        except (ClientError, ServerError) as e:
+            logger.warning(f"Exchange info refresh failed: {e}")
+    
     def get_mark_price(self, symbol: str) -> float:
-        """Get current mark price"""
+        """Get current mark price (from the market stream cache when fresh)"""
+        if self.market_cache is not None:
+            price = self.market_cache.get_mark_price(symbol, max_age=settings.mark_price_max_age_sec)
+            if price is not None:
+                return price
+        
         try:
-            data = self.client.mark_price(symbol=symbol)
+            data = self._call("mark_price", symbol=symbol)
             # Handle both single object and list responses
             if isinstance(data, list):
                 for item in data:
@@ -82,7 +287,8 @@ class AsterExchangeClient:
     def set_leverage(self, symbol: str, leverage: int):
         """Set leverage for a symbol"""
         try:
-            result = self.client.change_leverage(
+            result = self._call(
+                "change_leverage",
                 symbol=symbol,
                 leverage=leverage
             )
@@ -97,7 +303,8 @@ class AsterExchangeClient:
     def set_position_mode(self, dual_side_position: bool):
         """Set position mode (hedge mode or one-way mode)"""
         try:
-            result = self.client.change_position_mode(
+            result = self._call(
+                "change_position_mode",
                 dualSidePosition="true" if dual_side_position else "false"
             )
             mode = "hedge" if dual_side_position else "one-way"
@@ -123,4 +330,243 @@ class AsterExchangeClient:
                 )
         logger.warning(f"No open position found for {symbol} {position_side}")
         return {}
-
+    
+    def place_batch_orders(self, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Submit up to 5 orders in one signed request.
+        
+        Returns one entry per order in the same order: the order response, or
+        an error dict ({"code": ..., "msg": ...}) for legs the exchange rejected.
+        """
+        batch = [{k: str(v) for k, v in order.items()} for order in orders]
+        for order in batch:
+            order.setdefault("newClientOrderId", new_client_order_id(order["positionSide"][0] + order["side"][0]))
+        try:
+            results = self._call("new_batch_order", batch)
+        except REQUEST_ERRORS as e:
+            if not classify(e).unknown_outcome:
+                if isinstance(e, ClientError):
+                    logger.error(f"Batch order failed: {e.error_code} - {e.error_message}")
+                raise
+            # -1000/-1007 and the like included: find out leg by leg what the exchange accepted
+            logger.warning(f"Batch order outcome unknown, querying legs: {e}")
+            results = []
+            for order in batch:
+                existing = self.find_order(order["symbol"], order["newClientOrderId"])
+                results.append(existing or {"code": NO_SUCH_ORDER, "msg": "Order not received by exchange"})
+        for order, result in zip(batch, results):
+            if 'code' in result and 'orderId' not in result:
+                logger.error(
+                    f"Batch leg rejected: {order['symbol']} {order['side']} {order['positionSide']} | "
+                    f"{result['code']} - {result.get('msg')}"
+                )
+                if result['code'] in FILTER_ERROR_CODES:
+                    self._refresh_symbol_info()
+            else:
+                logger.info(
+                    f"Order placed: {order['symbol']} {order['side']} {order['type']} "
+                    f"{order.get('quantity', order.get('stopPrice'))} "
+                    f"{order['positionSide']} | OrderID: {result['orderId']}"
+                )
+        return results
+    
+    def open_pair(
+        self,
+        symbol: str,
+        quantity: float,
+        client_order_ids: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Open equal LONG and SHORT market legs in a single batch request.
+        
+        A rejected leg is retried on its own; if it still fails the filled leg is
+        closed again so we are never left with a naked position. Unequal fills are
+        evened out by topping up the smaller leg. Returns {"LONG": order, "SHORT": order}.
+        """
+        qty = self.get_symbol_filters(symbol).format_qty(quantity)
+        client_order_ids = client_order_ids or {}
+        orders = {
+            position_side: self._market_leg(
+                symbol, PAIR_LEGS[position_side][0], qty, position_side,
+                client_order_id=client_order_ids.get(position_side)
+            )
+            for position_side in ("LONG", "SHORT")
+        }
+        results = dict(zip(orders.keys(), self.place_batch_orders(list(orders.values()))))
+        
+        failed = [side for side, result in results.items() if not self._leg_ok(result)]
+        for position_side in failed:
+            try:
+                results[position_side] = self.place_market_order(
+                    symbol=symbol,
+                    side=PAIR_LEGS[position_side][0],
+                    quantity=qty,
+                    position_side=position_side,
+                    client_order_id=orders[position_side]["newClientOrderId"]
+                )
+            except (ClientError, ServerError) as e:
+                logger.error(f"Retry of {position_side} leg failed: {e}")
+        
+        failed = [side for side, result in results.items() if not self._leg_ok(result)]
+        if failed:
+            # Unwind whatever did fill rather than hold an unhedged position
+            for position_side, result in results.items():
+                if self._leg_ok(result) and float(result.get('executedQty', 0)) > 0:
+                    logger.warning(f"Unwinding {position_side} leg after failed pair open")
+                    self.place_market_order(
+                        symbol=symbol,
+                        side=PAIR_LEGS[position_side][1],
+                        quantity=result['executedQty'],
+                        position_side=position_side,
+                        reduce_only=True
+                    )
+            raise PairOrderError(f"Could not open {symbol} pair: {', '.join(failed)} leg failed", results)
+        
+        self._even_out_pair(symbol, results)
+        return results
+    
+    def close_pair(
+        self,
+        symbol: str,
+        quantity: Optional[float] = None,
+        client_order_ids: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Close both legs of a symbol's pair in a single batch request.
+        
+        Uses one position lookup for both sides. With `quantity` each leg is only
+        reduced by up to that much. Legs rejected in the batch are retried
+        individually. Returns {position_side: order} for closed legs.
+        """
+        client_order_ids = client_order_ids or {}
+        orders = {}
+        for pos in self.get_position_risk(symbol=symbol):
+            amount = abs(float(pos['positionAmt']))
+            position_side = pos['positionSide']
+            if amount == 0 or position_side not in PAIR_LEGS:
+                continue
+            orders[position_side] = self._market_leg(
+                symbol, PAIR_LEGS[position_side][1], min(amount, quantity or amount), position_side,
+                reduce_only=True, client_order_id=client_order_ids.get(position_side)
+            )
+        if not orders:
+            logger.warning(f"No open positions to close for {symbol}")
+            return {}
+        
+        results = dict(zip(orders.keys(), self.place_batch_orders(list(orders.values()))))
+        for position_side, result in list(results.items()):
+            if self._leg_ok(result):
+                continue
+            order = orders[position_side]
+            try:
+                results[position_side] = self.place_market_order(
+                    symbol=symbol,
+                    side=order['side'],
+                    quantity=order['quantity'],
+                    position_side=position_side,
+                    reduce_only=True,
+                    client_order_id=order['newClientOrderId']
+                )
+            except (ClientError, ServerError) as e:
+                raise PairOrderError(f"Could not close {symbol} {position_side} leg: {e}", results)
+        return results
+    
+    def _even_out_pair(self, symbol: str, results: Dict[str, Dict[str, Any]]):
+        """Top up the smaller leg when the two legs filled different quantities"""
+        filters = self.get_symbol_filters(symbol)
+        lot = filters.market_lot
+        long_qty = lot.to_units(results["LONG"].get('executedQty', '0'))
+        short_qty = lot.to_units(results["SHORT"].get('executedQty', '0'))
+        diff = filters.quantize_qty_units(abs(long_qty - short_qty))
+        if not diff:
+            return
+        position_side = "LONG" if long_qty < short_qty else "SHORT"
+        logger.warning(
+            f"Pair fill mismatch on {symbol}: LONG {lot.format_units(long_qty)} / "
+            f"SHORT {lot.format_units(short_qty)}, topping up {position_side}"
+        )
+        top_up = self.place_market_order(
+            symbol=symbol,
+            side=PAIR_LEGS[position_side][0],
+            quantity=lot.format_units(diff),
+            position_side=position_side
+        )
+        results[f"{position_side}_TOP_UP"] = top_up
+    
+    def place_protective_orders(
+        self,
+        symbol: str,
+        entry_prices: Dict[str, float],
+        stop_pct: float,
+        take_profit_pct: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Place exchange-side STOP_MARKET and TAKE_PROFIT_MARKET orders for each leg.
+        
+        Orders use closePosition with MARK_PRICE triggers, so they close whatever
+        the leg holds when triggered. With equal percentages the LONG take-profit
+        and SHORT stop (and vice versa) share a trigger price, so both legs of
+        the pair exit together. Returns the batch results (one per order).
+        """
+        filters = self.get_symbol_filters(symbol)
+        orders = []
+        for position_side, entry_price in entry_prices.items():
+            direction = 1 if position_side == "LONG" else -1
+            stop_price = entry_price * (1 - direction * stop_pct / 100)
+            take_profit_price = entry_price * (1 + direction * take_profit_pct / 100)
+            for order_type, trigger_price in (("STOP_MARKET", stop_price), ("TAKE_PROFIT_MARKET", take_profit_price)):
+                orders.append({
+                    "symbol": symbol,
+                    "side": PAIR_LEGS[position_side][1],
+                    "type": order_type,
+                    "stopPrice": filters.format_price(trigger_price),
+                    "closePosition": "true",
+                    "workingType": "MARK_PRICE",
+                    "positionSide": position_side,
+                    "newClientOrderId": new_client_order_id(position_side[0] + order_type[0])
+                })
+        return self.place_batch_orders(orders)
+    
+    def cancel_orders(self, symbol: str, order_ids: List[int]) -> List[Dict[str, Any]]:
+        """Cancel up to 10 orders in one request; already-finished orders come back as error entries"""
+        try:
+            results = self._call("cancel_batch_order", symbol=symbol, orderIdList=list(order_ids))
+        except ClientError as e:
+            logger.error(f"Batch cancel failed: {e.error_code} - {e.error_message}")
+            raise
+        for order_id, result in zip(order_ids, results):
+            if 'code' in result and 'orderId' not in result:
+                logger.debug(f"Order {order_id} not canceled: {result['code']} - {result.get('msg')}")
+            else:
+                logger.info(f"Order canceled: {symbol} {result.get('type')} {result.get('positionSide')} | OrderID: {order_id}")
+        return results
+    
+    def _market_leg(
+        self,
+        symbol: str,
+        side: str,
+        quantity,
+        position_side: str,
+        reduce_only: bool = False,
+        client_order_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        order = {
+            "symbol": symbol,
+            "side": side,
+            "type": "MARKET",
+            "quantity": self.get_symbol_filters(symbol).format_qty(quantity),
+            "positionSide": position_side,
+            "newClientOrderId": client_order_id or new_client_order_id(position_side[0] + side[0]),
+            "newOrderRespType": "RESULT"
+        }
+        if reduce_only and position_side == "BOTH":
+            order["reduceOnly"] = "true"
+        return order
+    
+    def _call(self, endpoint: str, *args, **kwargs):
+        """Call an SDK endpoint method under the retry policy"""
+        return self.retry_policy.call(endpoint, getattr(self.client, endpoint), *args, **kwargs)
+    
+    @staticmethod
+    def _leg_ok(result: Dict[str, Any]) -> bool:
+        return bool(result) and 'orderId' in result
@@ -0,0 +1,119 @@
+from loguru import logger
+from collections import deque
+from statistics import median, pstdev
+from typing import Deque, NamedTuple, Optional
+import threading
+import time
+
+from octopus.exchange.aster.error import ClientError, ServerError
+
+DEFAULT_RECV_WINDOW_MS = 5000
+MIN_RECV_WINDOW_MS = 1000
+MAX_RECV_WINDOW_MS = 10000
+
+
+class ClockSample(NamedTuple):
+    offset_ms: float  # server time - local time
+    rtt_ms: float
+    taken_at: float
+
+
+class ClockSync:
+    """
+    Estimates the offset between the local clock and the exchange clock.
+
+    Each sample brackets a GET /fapi/v1/time call with local timestamps and
+    assumes the server stamped its time at the RTT midpoint. Only the samples
+    with the lowest RTT are trusted (queueing delay is what makes the midpoint
+    assumption wrong), and the offset is their median. recvWindow is sized from
+    the observed RTT distribution instead of the fixed 5000 ms default.
+    """
+
+    def __init__(
+        self,
+        client,
+        samples_per_sync: int = 5,
+        interval_sec: float = 300,
+        history: int = 50,
+        clock=time.time
+    ):
+        self.client = client
+        self.samples_per_sync = samples_per_sync
+        self.interval_sec = interval_sec
+        self.clock = clock
+        self.samples: Deque[ClockSample] = deque(maxlen=history)
+        self.offset_ms = 0.0
+        self.recv_window = DEFAULT_RECV_WINDOW_MS
+        self.last_sync: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def timestamp(self) -> int:
+        """Current exchange time in milliseconds, for signed requests"""
+        return int(self.clock() * 1000 + self.offset_ms)
+
+    def sample(self) -> ClockSample:
+        """Take one offset/RTT measurement"""
+        t0 = self.clock() * 1000
+        server_time = self.client.time()['serverTime']
+        t1 = self.clock() * 1000
+        sample = ClockSample(offset_ms=server_time - (t0 + t1) / 2, rtt_ms=t1 - t0, taken_at=t1 / 1000)
+        self.samples.append(sample)
+        return sample
+
+    def sync(self):
+        """Take a burst of samples and update the offset estimate and recvWindow"""
+        for _ in range(self.samples_per_sync):
+            try:
+                self.sample()
+            except (ClientError, ServerError) as e:
+                logger.warning(f"Clock sample failed: {e}")
+        if not self.samples:
+            return
+
+        with self._lock:
+            samples = list(self.samples)
+            # Trust the fastest half: their midpoint estimate has the least queueing error
+            fastest = sorted(samples, key=lambda s: s.rtt_ms)[:max(1, len(samples) // 2)]
+            self.offset_ms = median(s.offset_ms for s in fastest)
+
+            rtts = [s.rtt_ms for s in samples]
+            rtt_p50 = median(rtts)
+            rtt_std = pstdev(rtts) if len(rtts) > 1 else 0.0
+            # One-way latency plus jitter, with room for the offset estimate's own error
+            window = rtt_p50 + 4 * rtt_std + max(s.rtt_ms for s in fastest) / 2 + 500
+            self.recv_window = int(min(MAX_RECV_WINDOW_MS, max(MIN_RECV_WINDOW_MS, window)))
+            self.last_sync = self.clock()
+
+        logger.debug(
+            f"Clock synced: offset={self.offset_ms:.1f}ms rtt_p50={rtt_p50:.1f}ms "
+            f"rtt_std={rtt_std:.1f}ms recvWindow={self.recv_window}ms"
+        )
+
+    def on_timestamp_error(self):
+        """Resync right away after a -1021 (timestamp outside recvWindow)"""
+        logger.warning("Timestamp rejected by exchange, resyncing clock")
+        self.samples.clear()
+        self.sync()
+
+    def start(self):
+        """Sync now and then every `interval_sec` in a background thread, which keeps going if this sync fails"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="clock-sync", daemon=True)
+            self._thread.start()
+        self.sync()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Clock sync failed: {e}")
@@ -0,0 +1,221 @@
+from loguru import logger
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import math
+import time
+
+from octopus.config.settings import settings
+from octopus.exchange.aster_client import PAIR_LEGS, new_client_order_id
+from octopus.utils.fixed_point import FIXED_DECIMALS, fixed_div, fixed_mul, format_units, to_fixed
+
+DEPTH_LEVELS = 100  # REST /depth limit when the local book isn't synced
+SLICE_SEPARATOR = "."
+
+
+def slice_client_order_id(parent: str, index: int) -> str:
+    """Client order id of the `index`th child of a sliced order"""
+    return f"{parent}{SLICE_SEPARATOR}{index}"
+
+
+def parent_client_order_id(client_order_id: str) -> str:
+    """Client order id of the logical order a child slice belongs to (itself if not sliced)"""
+    parent, _, index = client_order_id.rpartition(SLICE_SEPARATOR)
+    return parent if parent and index.isdigit() else client_order_id
+
+
+def max_quantity_within(levels: Sequence[Tuple[float, float]], budget_bps: float) -> float:
+    """
+    Largest quantity a market order can take from `levels` (best first) while its
+    VWAP stays within `budget_bps` of the best price. Capped at the visible depth.
+    """
+    if not levels:
+        return 0.0
+    best = levels[0][0]
+    budget = best * budget_bps / 10000
+    quantity = 0.0
+    cost = 0.0  # sum of quantity * distance from the best price
+    for price, qty in levels:
+        distance = abs(price - best)
+        if cost + qty * distance > budget * (quantity + qty):
+            # Take only the part of this level that brings the average distance up to the budget
+            return quantity + (budget * quantity - cost) / (distance - budget)
+        quantity += qty
+        cost += qty * distance
+    return quantity
+
+
+class SlicedExecutor:
+    """
+    Works a pair open or close as a sequence of smaller pair batches.
+
+    Each slice is sized from fresh depth (the local order book when synced,
+    REST /depth otherwise) so both legs' VWAP stays within
+    execution_slippage_bps, then sent through the client's open_pair/close_pair
+    so the legs stay hedged slice by slice. Slices are spaced
+    execution_slice_interval_sec apart to let the book refill; the last of
+    execution_max_slices takes whatever is left. Fills are aggregated into one
+    order per leg (parent client order id, summed quantity, VWAP avgPrice), so
+    callers record a single logical trade.
+    """
+
+    def __init__(self, client, order_books=None, sleep: Callable[[float], None] = time.sleep):
+        self.client = client
+        self.order_books = order_books
+        self.sleep = sleep
+
+    def open_pair(self, symbol: str, quantity: float) -> Dict[str, Dict[str, Any]]:
+        filters = self.client.get_symbol_filters(symbol)
+        size = self._slice_quantity(symbol, quantity, settings.execution_max_slices, filters)
+        if size >= quantity:
+            return self.client.open_pair(symbol, quantity)
+
+        parents = self._parent_ids("O")
+        slices: List[Dict[str, Dict[str, Any]]] = []
+        lot = filters.market_lot
+        # Counted down in lot units so the slices add up to exactly `quantity`
+        total = lot.to_units(quantity)
+        remaining = total
+        for i in range(settings.execution_max_slices):
+            if i:
+                self.sleep(settings.execution_slice_interval_sec)
+                size = self._slice_quantity(symbol, remaining / lot.scale, settings.execution_max_slices - i, filters)
+            try:
+                orders = self.client.open_pair(symbol, size, self._child_ids(parents, i))
+            except Exception as e:
+                if not slices:
+                    raise
+                # Every completed slice is a hedged pair, so a partial open is still delta-neutral
+                logger.error(
+                    f"{symbol} open slice {i + 1} failed, keeping "
+                    f"{lot.format_units(total - remaining)} of {lot.format_units(total)}: {e}"
+                )
+                break
+            slices.append(orders)
+            remaining -= lot.to_units(size)
+            if remaining <= 0:
+                break
+        logger.info(f"Opened {symbol} pair of {lot.format_units(total - remaining)} in {len(slices)} slices")
+        return aggregate_slices(slices, parents)
+
+    def close_pair(self, symbol: str) -> Dict[str, Dict[str, Any]]:
+        quantity = max(
+            (abs(float(p['positionAmt'])) for p in self.client.get_position_risk(symbol=symbol)
+             if p['positionSide'] in PAIR_LEGS),
+            default=0.0
+        )
+        filters = self.client.get_symbol_filters(symbol)
+        size = self._slice_quantity(symbol, quantity, settings.execution_max_slices, filters) if quantity else 0.0
+        if size >= quantity:
+            return self.client.close_pair(symbol)
+
+        parents = self._parent_ids("C")
+        slices: List[Dict[str, Dict[str, Any]]] = []
+        lot = filters.market_lot
+        remaining = lot.to_units(quantity)
+        for i in range(settings.execution_max_slices):
+            if i:
+                self.sleep(settings.execution_slice_interval_sec)
+                size = self._slice_quantity(symbol, remaining / lot.scale, settings.execution_max_slices - i, filters)
+            # The final slice closes whatever the legs still hold
+            orders = self.client.close_pair(
+                symbol, size if lot.to_units(size) < remaining else None, self._child_ids(parents, i)
+            )
+            if not orders:
+                break
+            slices.append(orders)
+            remaining -= lot.to_units(size)
+            if remaining <= 0:
+                break
+        logger.info(f"Closed {symbol} pair of {quantity} in {len(slices)} slices")
+        return aggregate_slices(slices, parents)
+
+    def _slice_quantity(self, symbol: str, remaining: float, slices_left: int, filters) -> float:
+        """Size of the next slice; `remaining` when slicing is off or not worth it"""
+        if settings.execution_slippage_bps <= 0 or slices_left <= 1:
+            return remaining
+        depth = self._depth(symbol)
+        if depth is None:
+            return remaining
+        size = min(max_quantity_within(levels, settings.execution_slippage_bps) for levels in depth.values())
+        # Spread what the budget can't absorb over the slices left rather than overrun the limit
+        size = filters.quantize_qty(max(size, remaining / slices_left))
+        lot = filters.market_lot
+        floor_qty = max(filters.market_min_qty, filters.min_notional / depth["BUY"][0][0])
+        min_size = math.ceil(floor_qty * lot.scale / lot.step_units) * lot.step_units / lot.scale
+        size = max(size, min_size)
+        if remaining - size < min_size:
+            return remaining
+        return size
+
+    def _depth(self, symbol: str) -> Optional[Dict[str, List[Tuple[float, float]]]]:
+        """Levels a BUY and a SELL market order would take, best first"""
+        book = self.order_books.get(symbol) if self.order_books else None
+        if book is not None:
+            asks, bids = book.levels("BUY", DEPTH_LEVELS), book.levels("SELL", DEPTH_LEVELS)
+            if asks and bids:
+                return {"BUY": asks, "SELL": bids}
+        try:
+            snapshot = self.client.get_depth(symbol, limit=DEPTH_LEVELS)
+        except Exception as e:
+            logger.warning(f"No depth for {symbol}, executing in one batch: {e}")
+            return None
+        asks = [(float(p), float(q)) for p, q in snapshot['asks']]
+        bids = [(float(p), float(q)) for p, q in snapshot['bids']]
+        if not asks or not bids:
+            return None
+        return {"BUY": asks, "SELL": bids}
+
+    @staticmethod
+    def _parent_ids(tag: str) -> Dict[str, str]:
+        # Leave room for the slice suffix within the 36 character limit
+        return {side: new_client_order_id(side[0] + tag)[:32] for side in PAIR_LEGS}
+
+    @staticmethod
+    def _child_ids(parents: Dict[str, str], index: int) -> Dict[str, str]:
+        return {side: slice_client_order_id(parent, index) for side, parent in parents.items()}
+
+
+def aggregate_slices(
+    slices: List[Dict[str, Dict[str, Any]]],
+    parents: Dict[str, str]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge per-slice {position_side: order} results into one order per leg.
+
+    The merged order keeps the first child's orderId, takes the parent client
+    order id, sums executedQty/cumQuote/commission/realizedPnl in fixed point
+    and uses the VWAP as avgPrice; like the exchange's, they are decimal
+    strings. Top-up orders from uneven fills are passed through as they are.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for i, orders in enumerate(slices):
+        for key, order in orders.items():
+            if key not in parents:
+                merged[f"{key}_{i}"] = order
+                continue
+            executed_qty = to_fixed(order.get('executedQty', 0))
+            leg = merged.get(key)
+            if leg is None:
+                leg = merged[key] = {
+                    **order,
+                    "clientOrderId": parents[key],
+                    "executedQty": 0,
+                    "cumQuote": 0,
+                    "commission": 0,
+                    "realizedPnl": 0,
+                    "slices": 0,
+                }
+            leg["executedQty"] += executed_qty
+            if order.get('cumQuote'):
+                leg["cumQuote"] += to_fixed(order['cumQuote'])
+            else:
+                leg["cumQuote"] += fixed_mul(executed_qty, to_fixed(order.get('avgPrice') or 0))
+            leg["commission"] += to_fixed(order.get('commission', 0))
+            leg["realizedPnl"] += to_fixed(order.get('realizedPnl', 0))
+            leg["slices"] += 1
+    for key in parents:
+        leg = merged.get(key)
+        if leg is not None:
+            leg["avgPrice"] = fixed_div(leg["cumQuote"], leg["executedQty"])
+            for field in ("executedQty", "cumQuote", "commission", "realizedPnl", "avgPrice"):
+                leg[field] = format_units(leg[field], FIXED_DECIMALS)
+    return merged
@@ -0,0 +1,187 @@
+from loguru import logger
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+import time
+
+from octopus.config.settings import settings
+from octopus.exchange.aster.websocket import (
+    MAX_STREAMS_PER_CONNECTION,
+    StreamConnection,
+    StreamThread,
+)
+
+DEFAULT_CHANNELS = ("markPrice", "bookTicker", "aggTrade", "depth")
+
+
+class MarkPrice(NamedTuple):
+    price: float
+    index_price: float
+    funding_rate: float
+    next_funding_time: int
+    event_time: int
+    received_at: float
+
+
+class BookTicker(NamedTuple):
+    bid_price: float
+    bid_qty: float
+    ask_price: float
+    ask_qty: float
+    update_id: int
+    event_time: int
+    received_at: float
+
+
+class AggTrade(NamedTuple):
+    price: float
+    quantity: float
+    is_buyer_maker: bool
+    trade_time: int
+    received_at: float
+
+
+class MarketDataCache:
+    """
+    Latest market values per symbol, fed by the websocket streams.
+
+    Reads are plain dict lookups of immutable tuples, so the strategy thread can
+    read while the stream thread writes without locking.
+    """
+
+    def __init__(self):
+        self.mark_prices: Dict[str, MarkPrice] = {}
+        self.book_tickers: Dict[str, BookTicker] = {}
+        self.last_trades: Dict[str, AggTrade] = {}
+        self._listeners: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+
+    def add_listener(self, event_type: str, callback: Callable[[dict], None]):
+        """Call `callback(event)` for every raw event of `event_type` (e.g. 'depthUpdate')"""
+        self._listeners[event_type].append(callback)
+
+    def on_message(self, message: dict):
+        """Entry point for combined stream payloads ({"stream": ..., "data": ...})"""
+        data = message.get('data', message) if isinstance(message, dict) else message
+        events = data if isinstance(data, list) else [data]
+        received_at = time.time()
+
+        for event in events:
+            event_type = event.get('e')
+            symbol = event.get('s')
+
+            if event_type == 'markPriceUpdate':
+                self.mark_prices[symbol] = MarkPrice(
+                    price=float(event['p']),
+                    index_price=float(event.get('i') or 0),
+                    funding_rate=float(event.get('r') or 0),
+                    next_funding_time=int(event.get('T') or 0),
+                    event_time=int(event['E']),
+                    received_at=received_at
+                )
+            elif event_type == 'bookTicker':
+                self.book_tickers[symbol] = BookTicker(
+                    bid_price=float(event['b']),
+                    bid_qty=float(event['B']),
+                    ask_price=float(event['a']),
+                    ask_qty=float(event['A']),
+                    update_id=int(event['u']),
+                    event_time=int(event.get('E') or 0),
+                    received_at=received_at
+                )
+            elif event_type == 'aggTrade':
+                self.last_trades[symbol] = AggTrade(
+                    price=float(event['p']),
+                    quantity=float(event['q']),
+                    is_buyer_maker=bool(event['m']),
+                    trade_time=int(event['T']),
+                    received_at=received_at
+                )
+
+            for callback in self._listeners.get(event_type, ()):
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.error(f"Market data listener failed on {event_type}: {e}")
+
+    def get_mark_price(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        """Latest mark price, or None if missing or older than `max_age` seconds"""
+        mark = self.mark_prices.get(symbol)
+        if mark is None or (max_age is not None and time.time() - mark.received_at > max_age):
+            return None
+        return mark.price
+
+    def get_book_ticker(self, symbol: str, max_age: Optional[float] = None) -> Optional[BookTicker]:
+        """Latest best bid/ask, or None if missing or stale"""
+        ticker = self.book_tickers.get(symbol)
+        if ticker is None or (max_age is not None and time.time() - ticker.received_at > max_age):
+            return None
+        return ticker
+
+    def get_last_trade(self, symbol: str) -> Optional[AggTrade]:
+        """Latest aggregate trade"""
+        return self.last_trades.get(symbol)
+
+
+class MarketStream:
+    """
+    Combined market streams for a set of symbols.
+
+    Streams are sharded across connections of at most 200 streams each; all
+    connections run on one background event loop and feed the same cache.
+    """
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        channels: Iterable[str] = DEFAULT_CHANNELS,
+        cache: Optional[MarketDataCache] = None,
+        ws_url: Optional[str] = None
+    ):
+        self.symbols = list(symbols)
+        self.channels = tuple(channels)
+        self.cache = cache or MarketDataCache()
+        self.ws_url = ws_url or settings.aster_ws_url
+        self._thread = StreamThread(name="market-stream")
+        self.connections: List[StreamConnection] = []
+        self._add_streams(self._stream_names(self.symbols))
+
+    def start(self):
+        """Open the connections in a background thread"""
+        self._thread.start()
+        logger.info(
+            f"Market stream started: {len(self.symbols)} symbols, "
+            f"{sum(len(c.streams) for c in self.connections)} streams, {len(self.connections)} connections"
+        )
+
+    def stop(self):
+        """Close all connections"""
+        self._thread.stop()
+        logger.info("Market stream stopped")
+
+    def add_symbols(self, symbols: Iterable[str]):
+        """Subscribe additional symbols on the running connections"""
+        new_symbols = [s for s in symbols if s not in self.symbols]
+        self.symbols.extend(new_symbols)
+        self._add_streams(self._stream_names(new_symbols))
+
+    def _stream_names(self, symbols: Iterable[str]) -> List[str]:
+        return [f"{symbol.lower()}@{channel}" for symbol in symbols for channel in self.channels]
+
+    def _add_streams(self, streams: List[str]):
+        # Fill up existing connections first, then open new shards
+        for connection in self.connections:
+            free = MAX_STREAMS_PER_CONNECTION - len(connection.streams)
+            if free <= 0 or not streams:
+                continue
+            batch, streams = streams[:free], streams[free:]
+            connection.streams.extend(batch)
+            if self._thread.loop is not None:
+                self._thread.call(connection.send({"method": "SUBSCRIBE", "params": batch}))
+
+        for i in range(0, len(streams), MAX_STREAMS_PER_CONNECTION):
+            connection = StreamConnection(
+                self.ws_url,
+                streams[i:i + MAX_STREAMS_PER_CONNECTION],
+                self.cache.on_message
+            )
+            self.connections.append(connection)
+            self._thread.add(connection)
@@ -0,0 +1,275 @@
+from loguru import logger
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import threading
+
+from octopus.exchange.aster.error import ClientError, ServerError
+
+SNAPSHOT_LIMIT = 1000
+MAX_BUFFERED_EVENTS = 1000
+HEAP_SLACK = 64  # stale heap entries tolerated beyond one per live level before a rebuild
+
+
+class BookSide:
+    """
+    One side of a book: quantities in a dict, the best level from a heap.
+
+    Keys sort best first: asks use the price, bids the negated price. A diff
+    is a dict write plus a heap push for a new level (O(log n)); removed
+    levels are dropped from the heap lazily when they reach the top, and the
+    heap is rebuilt once stale entries outnumber live ones. Walks in price
+    order (levels, vwap, qty_until) only happen when sizing an order.
+    """
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self.qtys: Dict[float, float] = {}
+        self._heap: List[float] = []
+
+    def __len__(self):
+        return len(self.qtys)
+
+    def clear(self):
+        self.qtys = {}
+        self._heap = []
+
+    def set(self, price: float, qty: float):
+        """Set the absolute quantity at a price; 0 removes the level"""
+        key = -price if self.is_bid else price
+        if qty == 0:
+            self.qtys.pop(key, None)
+            return
+        if key not in self.qtys:
+            heapq.heappush(self._heap, key)
+        self.qtys[key] = qty
+        if len(self._heap) > 2 * len(self.qtys) + HEAP_SLACK:
+            self._heap = list(self.qtys)
+            heapq.heapify(self._heap)
+
+    def _price(self, key: float) -> float:
+        return -key if self.is_bid else key
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        heap = self._heap
+        while heap and heap[0] not in self.qtys:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return self._price(heap[0]), self.qtys[heap[0]]
+
+    def levels(self, n: int) -> List[Tuple[float, float]]:
+        return [(self._price(key), self.qtys[key]) for key in heapq.nsmallest(n, self.qtys)]
+
+    def qty_until(self, limit_price: float) -> float:
+        """Total quantity on levels at or better than `limit_price`"""
+        limit = -limit_price if self.is_bid else limit_price
+        return sum(qty for key, qty in self.qtys.items() if key <= limit)
+
+    def vwap(self, quantity: float) -> Optional[float]:
+        """Average price to fill `quantity` by walking the levels, None if not enough depth"""
+        remaining = quantity
+        notional = 0.0
+        for key in sorted(self.qtys):
+            take = min(remaining, self.qtys[key])
+            notional += take * self._price(key)
+            remaining -= take
+            if remaining <= 0:
+                return notional / quantity
+        return None
+
+
+class LocalOrderBook:
+    """
+    Local order book for one symbol kept in sync from `<symbol>@depth` diffs.
+
+    Implements the documented algorithm: buffer diffs, load a REST snapshot,
+    drop diffs with `u` < lastUpdateId, require the first applied diff to
+    straddle lastUpdateId, then require every diff's `pu` to equal the
+    previous `u`. Any gap marks the book out of sync and triggers a resync.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.last_update_id = 0
+        self.is_synced = False
+        self.needs_snapshot = True
+        self._awaiting_first = True
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()
+
+    def on_depth_event(self, event: dict) -> bool:
+        """Apply or buffer a depthUpdate event. Returns False when a snapshot is required."""
+        with self._lock:
+            if self.needs_snapshot:
+                self._buffer.append(event)
+                if len(self._buffer) > MAX_BUFFERED_EVENTS:
+                    del self._buffer[0]
+                return False
+            last_update_id = self.last_update_id
+            if not self._accept(event):
+                return True
+            if not self.is_synced:
+                logger.warning(
+                    f"Order book gap on {self.symbol}: U={event['U']} pu={event['pu']} "
+                    f"last={last_update_id}, resyncing"
+                )
+                self._buffer.append(event)
+                return False
+            self._apply(event)
+            return True
+
+    def load_snapshot(self, snapshot: dict):
+        """Load a /fapi/v1/depth snapshot and replay buffered diffs on top of it"""
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            for price, qty in snapshot['bids']:
+                self.bids.set(float(price), float(qty))
+            for price, qty in snapshot['asks']:
+                self.asks.set(float(price), float(qty))
+            self.last_update_id = snapshot['lastUpdateId']
+            self.needs_snapshot = False
+            self.is_synced = True
+            self._awaiting_first = True
+
+            buffered, self._buffer = self._buffer, []
+            for i, event in enumerate(buffered):
+                if not self._accept(event):
+                    continue
+                if not self.is_synced:
+                    logger.warning(f"Order book snapshot for {self.symbol} does not line up with diffs, resyncing")
+                    self._buffer = buffered[i:]
+                    return
+                self._apply(event)
+
+    def _accept(self, event: dict) -> bool:
+        """
+        Decide whether `event` continues the book. Returns False for events to
+        drop; otherwise the book is reset (is_synced False) when it does not line up.
+        """
+        if event['u'] < self.last_update_id:
+            return False
+        if self._awaiting_first:
+            lines_up = event['U'] <= self.last_update_id <= event['u']
+        else:
+            lines_up = event['pu'] == self.last_update_id
+        if not lines_up:
+            self._reset()
+        return True
+
+    def _apply(self, event: dict):
+        for price, qty in event['b']:
+            self.bids.set(float(price), float(qty))
+        for price, qty in event['a']:
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = event['u']
+        self._awaiting_first = False
+
+    def _reset(self):
+        self.is_synced = False
+        self.needs_snapshot = True
+        self.last_update_id = 0
+        self.bids.clear()
+        self.asks.clear()
+
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            return self.bids.best() if self.is_synced else None
+
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            return self.asks.best() if self.is_synced else None
+
+    def mid_price(self) -> Optional[float]:
+        with self._lock:
+            if not self.is_synced or not self.bids or not self.asks:
+                return None
+            return (self.bids.best()[0] + self.asks.best()[0]) / 2
+
+    def depth_within_bps(self, bps: float) -> Tuple[float, float]:
+        """(bid qty, ask qty) resting within `bps` basis points of the mid price"""
+        with self._lock:
+            if not self.is_synced or not self.bids or not self.asks:
+                return 0.0, 0.0
+            mid = (self.bids.best()[0] + self.asks.best()[0]) / 2
+            offset = mid * bps / 10000
+            return self.bids.qty_until(mid - offset), self.asks.qty_until(mid + offset)
+
+    def levels(self, side: str, n: int) -> List[Tuple[float, float]]:
+        """Top `n` (price, qty) levels a `side` order would take, empty when not synced"""
+        with self._lock:
+            if not self.is_synced:
+                return []
+            book_side = self.asks if side == "BUY" else self.bids
+            return book_side.levels(n)
+
+    def vwap(self, side: str, quantity: float) -> Optional[float]:
+        """Average fill price of a market order of `quantity` ("BUY" walks asks, "SELL" walks bids)"""
+        with self._lock:
+            if not self.is_synced:
+                return None
+            book_side = self.asks if side == "BUY" else self.bids
+            return book_side.vwap(quantity)
+
+    def estimate_slippage_bps(self, side: str, quantity: float) -> Optional[float]:
+        """Expected slippage of a market order versus the best price, in basis points"""
+        with self._lock:
+            if not self.is_synced:
+                return None
+            book_side = self.asks if side == "BUY" else self.bids
+            if not book_side:
+                return None
+            best = book_side.best()[0]
+            vwap = book_side.vwap(quantity)
+        if vwap is None:
+            return None
+        return abs(vwap - best) / best * 10000
+
+
+class OrderBookManager:
+    """
+    Maintains a LocalOrderBook per symbol from the market stream's depth events.
+
+    Snapshots are fetched on a worker thread so the stream loop never blocks on REST.
+    """
+
+    def __init__(self, exchange, market_cache, symbols: Iterable[str]):
+        self.exchange = exchange
+        self.books: Dict[str, LocalOrderBook] = {s: LocalOrderBook(s) for s in symbols}
+        self._pending: set = set()
+        self._pending_lock = threading.Lock()
+        market_cache.add_listener('depthUpdate', self._on_depth_event)
+
+    def get(self, symbol: str) -> Optional[LocalOrderBook]:
+        """Book for a symbol, or None if it is not tracked"""
+        return self.books.get(symbol)
+
+    def _on_depth_event(self, event: dict):
+        book = self.books.get(event['s'])
+        if book is None:
+            return
+        if not book.on_depth_event(event) or book.needs_snapshot:
+            self._request_snapshot(book)
+
+    def _request_snapshot(self, book: LocalOrderBook):
+        with self._pending_lock:
+            if book.symbol in self._pending:
+                return
+            self._pending.add(book.symbol)
+        threading.Thread(
+            target=self._load_snapshot, args=(book,), name=f"depth-snapshot-{book.symbol}", daemon=True
+        ).start()
+
+    def _load_snapshot(self, book: LocalOrderBook):
+        try:
+            snapshot = self.exchange.client.depth(symbol=book.symbol, limit=SNAPSHOT_LIMIT)
+            book.load_snapshot(snapshot)
+            if book.is_synced:
+                logger.info(f"Order book synced: {book.symbol} @ {book.last_update_id}")
+        except (ClientError, ServerError) as e:
+            logger.error(f"Failed to load depth snapshot for {book.symbol}: {e}")
+        finally:
+            with self._pending_lock:
+                self._pending.discard(book.symbol)
@@ -0,0 +1,224 @@
+from loguru import logger
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+import random
+import threading
+import time
+
+from octopus.exchange.aster.error import ClientError, ServerError
+from octopus.exchange.symbol_info import FILTER_ERROR_CODES
+
+
+class Action(str, Enum):
+    FAIL = "fail"          # retrying can't help (bad request, insufficient margin, ...)
+    RETRY = "retry"        # transient, retry right away
+    BACKOFF = "backoff"    # transient, retry after an exponential, jittered delay
+    REFRESH = "refresh"    # a local cache is stale; refresh it, then retry
+
+
+class ErrorClass(NamedTuple):
+    action: Action
+    refresh: Optional[str] = None   # cache to refresh for Action.REFRESH ("clock", "symbol_info")
+    unknown_outcome: bool = False   # the request may have been executed anyway
+    reason: str = ""
+
+
+# Classification of documented error codes. 10xx are server/network issues,
+# 11xx malformed requests, 20xx processing rejections and 40xx filter/parameter
+# rejections. Codes not listed fall back to their family (see classify()).
+ERROR_CODES: Dict[int, ErrorClass] = {
+    -1000: ErrorClass(Action.BACKOFF, unknown_outcome=True, reason="UNKNOWN"),
+    -1001: ErrorClass(Action.RETRY, reason="DISCONNECTED"),
+    -1003: ErrorClass(Action.BACKOFF, reason="TOO_MANY_REQUESTS"),
+    -1006: ErrorClass(Action.BACKOFF, unknown_outcome=True, reason="UNEXPECTED_RESP"),
+    -1007: ErrorClass(Action.BACKOFF, unknown_outcome=True, reason="TIMEOUT"),
+    -1008: ErrorClass(Action.BACKOFF, reason="SERVER_BUSY"),
+    -1015: ErrorClass(Action.BACKOFF, reason="TOO_MANY_ORDERS"),
+    -1016: ErrorClass(Action.BACKOFF, reason="SERVICE_SHUTTING_DOWN"),
+    -1021: ErrorClass(Action.REFRESH, refresh="clock", reason="INVALID_TIMESTAMP"),
+    -1022: ErrorClass(Action.FAIL, reason="INVALID_SIGNATURE"),
+    -2010: ErrorClass(Action.FAIL, reason="NEW_ORDER_REJECTED"),
+    -2011: ErrorClass(Action.FAIL, reason="CANCEL_REJECTED"),
+    -2013: ErrorClass(Action.FAIL, reason="NO_SUCH_ORDER"),
+    -2014: ErrorClass(Action.FAIL, reason="BAD_API_KEY_FMT"),
+    -2015: ErrorClass(Action.FAIL, reason="REJECTED_MBX_KEY"),
+    -2019: ErrorClass(Action.FAIL, reason="MARGIN_NOT_SUFFICIEN"),
+    -2021: ErrorClass(Action.FAIL, reason="ORDER_WOULD_IMMEDIATELY_TRIGGER"),
+    -2022: ErrorClass(Action.FAIL, reason="REDUCE_ONLY_REJECT"),
+    **{code: ErrorClass(Action.REFRESH, refresh="symbol_info", reason="FILTER") for code in FILTER_ERROR_CODES},
+}
+
+UNKNOWN_OUTCOME = ErrorClass(Action.BACKOFF, unknown_outcome=True, reason="NO_RESPONSE")
+RATE_LIMITED = ErrorClass(Action.BACKOFF, reason="RATE_LIMITED")
+NOT_RETRYABLE = ErrorClass(Action.FAIL, reason="NOT_RETRYABLE")
+
+
+def classify(error: Exception) -> ErrorClass:
+    """Decide how to handle an exception raised by a REST call"""
+    if isinstance(error, (Timeout, RequestsConnectionError)):
+        return UNKNOWN_OUTCOME
+    if isinstance(error, ServerError):
+        # 5xx: the request reached the exchange but its fate is unknown
+        return ErrorClass(Action.BACKOFF, unknown_outcome=True, reason=f"HTTP_{error.status_code}")
+    if isinstance(error, ClientError):
+        if error.status_code in (418, 429):
+            return RATE_LIMITED
+        known = ERROR_CODES.get(error.error_code)
+        if known is not None:
+            return known
+        if isinstance(error.error_code, int) and -1099 <= error.error_code <= -1000:
+            return ErrorClass(Action.BACKOFF, reason="SERVER")
+        return NOT_RETRYABLE
+    return NOT_RETRYABLE
+
+
+def is_transient(error: Exception) -> bool:
+    """True when the error is expected to clear up on its own"""
+    return classify(error).action is not Action.FAIL
+
+
+class EndpointPolicy(NamedTuple):
+    max_retries: int = 3          # retries of a single call
+    budget: int = 20              # retries allowed per endpoint per budget window
+    idempotent: bool = True       # safe to resend when the outcome is unknown
+
+
+# Order placement is not idempotent on its own: an unknown outcome is only
+# retried when the caller can check whether the first attempt landed.
+ENDPOINT_POLICIES: Dict[str, EndpointPolicy] = {
+    "new_order": EndpointPolicy(max_retries=2, budget=10, idempotent=False),
+    "new_batch_order": EndpointPolicy(max_retries=1, budget=5, idempotent=False),
+    "cancel_order": EndpointPolicy(max_retries=2, budget=10),
+    "cancel_batch_order": EndpointPolicy(max_retries=2, budget=10),
+    "change_leverage": EndpointPolicy(max_retries=1, budget=5),
+    "change_position_mode": EndpointPolicy(max_retries=1, budget=5),
+    "new_listen_key": EndpointPolicy(max_retries=3, budget=10),
+    "get_all_orders": EndpointPolicy(max_retries=2, budget=10),
+}
+DEFAULT_POLICY = EndpointPolicy()
+
+
+class RetryPolicy:
+    """
+    Runs REST calls under the error classification.
+
+    Transient failures are retried in-process (immediately, or after a short
+    exponential backoff with full jitter), stale caches are refreshed through
+    registered refreshers before the retry, and everything else fails fast.
+    Each endpoint has a per-call retry limit and a rolling retry budget so a
+    persistent outage can't turn into a retry storm.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, EndpointPolicy]] = None,
+        base_delay: float = 0.1,
+        max_delay: float = 5.0,
+        budget_window: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.policies = dict(ENDPOINT_POLICIES if policies is None else policies)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_window = budget_window
+        self.sleep = sleep
+        self.clock = clock
+        self.refreshers: Dict[str, Callable[[], Any]] = {}
+        self._retries: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def register_refresher(self, name: str, refresh: Callable[[], Any]):
+        """Callable run before retrying an error classified as Action.REFRESH with `refresh=name`"""
+        self.refreshers[name] = refresh
+
+    def policy(self, endpoint: str) -> EndpointPolicy:
+        return self.policies.get(endpoint, DEFAULT_POLICY)
+
+    def call(
+        self,
+        endpoint: str,
+        fn: Callable[..., Any],
+        *args,
+        resolve_unknown: Optional[Callable[[], Any]] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Call `fn(*args, **kwargs)`, retrying according to the endpoint's policy.
+
+        `resolve_unknown` is consulted before resending after an unknown
+        outcome; if it returns something other than None, that is taken as the
+        result of the earlier attempt and nothing is resent.
+        """
+        policy = self.policy(endpoint)
+        refreshed = set()
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+                error_class = classify(error)
+                if not self._should_retry(endpoint, policy, error_class, attempt, refreshed, resolve_unknown):
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"{endpoint} failed ({error_class.reason}), retry {attempt}/{policy.max_retries}: {error}"
+                )
+
+            if error_class.action is Action.REFRESH:
+                refreshed.add(error_class.refresh)
+                self.refreshers[error_class.refresh]()
+            elif error_class.action is Action.BACKOFF:
+                self.sleep(self._delay(attempt, error))
+
+            if error_class.unknown_outcome and resolve_unknown is not None:
+                result = resolve_unknown()
+                if result is not None:
+                    logger.info(f"{endpoint}: earlier attempt went through, not resending")
+                    return result
+
+    def _should_retry(
+        self,
+        endpoint: str,
+        policy: EndpointPolicy,
+        error_class: ErrorClass,
+        attempt: int,
+        refreshed: set,
+        resolve_unknown: Optional[Callable[[], Any]]
+    ) -> bool:
+        if error_class.action is Action.FAIL or attempt >= policy.max_retries:
+            return False
+        if error_class.unknown_outcome and not policy.idempotent and resolve_unknown is None:
+            return False
+        if error_class.action is Action.REFRESH:
+            # Refresh each cache once per call; if it didn't help, the request itself is wrong
+            if error_class.refresh in refreshed or error_class.refresh not in self.refreshers:
+                return False
+        return self._take_budget(endpoint, policy)
+
+    def _take_budget(self, endpoint: str, policy: EndpointPolicy) -> bool:
+        now = self.clock()
+        with self._lock:
+            spent = self._retries.setdefault(endpoint, deque())
+            while spent and now - spent[0] > self.budget_window:
+                spent.popleft()
+            if len(spent) >= policy.budget:
+                logger.error(f"Retry budget for {endpoint} exhausted ({policy.budget}/{self.budget_window:.0f}s)")
+                return False
+            spent.append(now)
+            return True
+
+    def _delay(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        if isinstance(error, ClientError) and error.header:
+            retry_after = error.header.get('Retry-After')
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        # Full jitter: uniform in [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
@@ -0,0 +1,214 @@
+from loguru import logger
+from typing import Callable, Dict, Optional
+import threading
+import time
+
+from octopus.exchange.aster.error import ClientError, ServerError
+from octopus.utils.fixed_point import Number, format_units, parse_units
+
+# Order rejections caused by symbol filters; the cached filters may be stale
+FILTER_ERROR_CODES = {
+    -1111,  # BAD_PRECISION
+    -4002,  # PRICE_GREATER_THAN_MAX_PRICE
+    -4003,  # QTY_LESS_THAN_ZERO
+    -4004,  # QTY_LESS_THAN_MIN_QTY
+    -4005,  # QTY_GREATER_THAN_MAX_QTY
+    -4013,  # PRICE_LESS_THAN_MIN_PRICE
+    -4014,  # PRICE_NOT_INCREASED_BY_TICK_SIZE
+    -4016,  # PRICE_HIGHTER_THAN_MULTIPLIER_UP
+    -4023,  # QTY_NOT_INCREASED_BY_STEP_SIZE
+    -4024,  # PRICE_LOWER_THAN_MULTIPLIER_DOWN
+    -4164,  # MIN_NOTIONAL
+}
+
+
+def _decimals(step: str) -> int:
+    step = step.rstrip('0')
+    return len(step.split('.')[1]) if '.' in step else 0
+
+
+class Quantizer:
+    """
+    Snaps values to a step size ("0.001", "0.10", "1") using integer arithmetic.
+
+    Values are scaled to integer units of 10^-decimals once (API strings
+    exactly, floats to the nearest unit), then snapped with an integer modulo,
+    so results are exact multiples of the step and format back to strings
+    without float noise (no 0.30000000000000004 in an order).
+    """
+
+    __slots__ = ('step', 'decimals', 'scale', 'step_units')
+
+    def __init__(self, step: str):
+        self.step = step
+        self.decimals = _decimals(step)
+        self.scale = 10 ** self.decimals
+        self.step_units = parse_units(step, self.decimals) or 1
+
+    def to_units(self, value: Number) -> int:
+        """Value in integer units of 10^-decimals (nearest, tolerant of float error)"""
+        return parse_units(value, self.decimals)
+
+    def floor_units(self, value: Number) -> int:
+        """Largest multiple of the step <= value, in integer units"""
+        return self.snap_units(parse_units(value, self.decimals, truncate=True))
+
+    def snap_units(self, units: int) -> int:
+        """Largest multiple of the step <= units"""
+        return units - units % self.step_units
+
+    def round_units(self, value: Number) -> int:
+        """Nearest multiple of the step, in integer units"""
+        units = self.to_units(value)
+        return (units + self.step_units // 2) // self.step_units * self.step_units
+
+    def floor(self, value: Number) -> float:
+        return self.floor_units(value) / self.scale
+
+    def round(self, value: Number) -> float:
+        return self.round_units(value) / self.scale
+
+    def format_units(self, units: int) -> str:
+        """Exact decimal string for a value in integer units"""
+        return format_units(units, self.decimals)
+
+    def format(self, value: Number) -> str:
+        """Exact decimal string of `value` snapped down to the step"""
+        return self.format_units(self.floor_units(value))
+
+
+class SymbolFilters:
+    """
+    Trading rules of one symbol from exchangeInfo, with precompiled quantizers.
+
+    Quantity limits are also kept in integer units of the lot quantizer and
+    MIN_NOTIONAL in quantity units times price units, so sizing and minimum
+    checks are integer comparisons.
+    """
+
+    def __init__(self, symbol_info: dict):
+        self.symbol = symbol_info['symbol']
+        self.status = symbol_info.get('status', 'TRADING')
+        filters = {f['filterType']: f for f in symbol_info.get('filters', [])}
+
+        price_filter = filters.get('PRICE_FILTER', {})
+        self.price = Quantizer(price_filter.get('tickSize', '0.01'))
+        self.min_price = float(price_filter.get('minPrice', 0))
+        self.max_price = float(price_filter.get('maxPrice', 0))
+
+        lot = filters.get('LOT_SIZE', {})
+        self.lot = Quantizer(lot.get('stepSize', '0.001'))
+        self.min_qty = float(lot.get('minQty', 0))
+        self.max_qty = float(lot.get('maxQty', 0))
+
+        market_lot = filters.get('MARKET_LOT_SIZE', lot)
+        self.market_lot = Quantizer(market_lot.get('stepSize', self.lot.step))
+        self.market_min_qty = float(market_lot.get('minQty', self.min_qty))
+        self.market_max_qty = float(market_lot.get('maxQty', self.max_qty))
+
+        self.min_notional = float(filters.get('MIN_NOTIONAL', {}).get('notional', 0))
+
+        percent = filters.get('PERCENT_PRICE', {})
+        self.multiplier_up = float(percent.get('multiplierUp', 0))
+        self.multiplier_down = float(percent.get('multiplierDown', 0))
+
+        # (min, max) quantity in lot units, for limit and market orders
+        self._qty_limits = {
+            False: (self.lot.to_units(lot.get('minQty', '0')), self.lot.to_units(lot.get('maxQty', '0'))),
+            True: (
+                self.market_lot.to_units(market_lot.get('minQty', lot.get('minQty', '0'))),
+                self.market_lot.to_units(market_lot.get('maxQty', lot.get('maxQty', '0')))
+            ),
+        }
+        self.min_notional_units = parse_units(
+            filters.get('MIN_NOTIONAL', {}).get('notional', '0'), self.market_lot.decimals + self.price.decimals
+        )
+
+    def quantize_qty_units(self, units: int, market: bool = True) -> int:
+        """
+        Snap a quantity in lot units down to the (market) lot step and clamp to
+        maxQty. Returns 0 when the result is below minQty.
+        """
+        quantizer = self.market_lot if market else self.lot
+        min_units, max_units = self._qty_limits[market]
+        if max_units:
+            units = min(units, max_units)
+        units = quantizer.snap_units(units)
+        return units if units >= min_units else 0
+
+    def quantize_qty(self, quantity: Number, market: bool = True) -> float:
+        """
+        Snap a quantity down to the (market) lot step and clamp to maxQty.
+        Returns 0.0 when the result is below minQty.
+        """
+        quantizer = self.market_lot if market else self.lot
+        units = parse_units(quantity, quantizer.decimals, truncate=True)
+        return self.quantize_qty_units(units, market) / quantizer.scale
+
+    def format_qty(self, quantity: Number, market: bool = True) -> str:
+        """Order-ready quantity string"""
+        quantizer = self.market_lot if market else self.lot
+        return quantizer.format(quantity)
+
+    def quantize_price(self, price: Number) -> float:
+        """Snap a price to the nearest tick"""
+        return self.price.round(price)
+
+    def format_price(self, price: Number) -> str:
+        """Order-ready price string"""
+        return self.price.format_units(self.price.round_units(price))
+
+    def meets_min_notional_units(self, qty_units: int, price_units: int) -> bool:
+        """MIN_NOTIONAL check in integer units (market_lot quantity, price)"""
+        return qty_units * price_units >= self.min_notional_units
+
+    def meets_min_notional(self, quantity: Number, price: Number) -> bool:
+        return self.meets_min_notional_units(self.market_lot.to_units(quantity), self.price.to_units(price))
+
+    def price_bounds(self, mark_price: float):
+        """(lowest, highest) price PERCENT_PRICE accepts around `mark_price`"""
+        if not self.multiplier_up:
+            return 0.0, float('inf')
+        return mark_price * self.multiplier_down, mark_price * self.multiplier_up
+
+
+class SymbolInfoCache:
+    """
+    exchangeInfo loaded once and indexed by symbol.
+
+    Refreshed when older than `ttl` seconds or on demand (e.g. after an order is
+    rejected by a filter). `on_load` receives the raw payload so other consumers
+    (the rate limiter) don't fetch it again.
+    """
+
+    def __init__(self, client, ttl: float = 3600, on_load: Optional[Callable[[dict], None]] = None):
+        self.client = client
+        self.ttl = ttl
+        self.on_load = on_load
+        self.symbols: Dict[str, SymbolFilters] = {}
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Fetch exchangeInfo and rebuild the index"""
+        with self._lock:
+            info = self.client.exchange_info()
+            self.symbols = {s['symbol']: SymbolFilters(s) for s in info.get('symbols', [])}
+            self.loaded_at = time.time()
+        logger.info(f"Exchange info loaded: {len(self.symbols)} symbols")
+        if self.on_load is not None:
+            self.on_load(info)
+
+    def get(self, symbol: str) -> SymbolFilters:
+        """Filters for a symbol, refreshing the cache when expired"""
+        if not self.symbols or time.time() - self.loaded_at > self.ttl:
+            try:
+                self.refresh()
+            except (ClientError, ServerError) as e:
+                if not self.symbols:
+                    raise
+                logger.warning(f"Exchange info refresh failed, using cached filters: {e}")
+        filters = self.symbols.get(symbol)
+        if filters is None:
+            raise ValueError(f"Symbol {symbol} not found in exchange info")
+        return filters
@@ -0,0 +1,334 @@
+from loguru import logger
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import threading
+
+from octopus.config.settings import settings
+from octopus.exchange.aster.error import ClientError, ServerError
+from octopus.exchange.aster.websocket import StreamConnection, StreamThread
+from octopus.exchange.market_stream import MarketDataCache
+
+# listenKeys are valid for 60 minutes; renew well inside that
+LISTEN_KEY_KEEPALIVE_SEC = 30 * 60
+# Finished orders stay readable through get_order() this long after their last update
+TERMINAL_ORDER_TTL_SEC = 10 * 60
+TERMINAL_ORDER_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "REJECTED")
+MARGIN_CALL_HISTORY = 100
+
+
+class PositionState(NamedTuple):
+    symbol: str
+    position_side: str
+    amount: float
+    entry_price: float
+    unrealized_pnl: float
+    margin_type: str
+    isolated_wallet: float
+    update_time: int
+
+
+class BalanceState(NamedTuple):
+    asset: str
+    wallet_balance: float
+    cross_wallet_balance: float
+    update_time: int
+
+
+class OrderState(NamedTuple):
+    symbol: str
+    order_id: int
+    client_order_id: str
+    side: str
+    position_side: str
+    order_type: str
+    status: str
+    orig_qty: float
+    executed_qty: float
+    avg_price: float
+    last_filled_qty: float
+    last_filled_price: float
+    commission: float
+    realized_pnl: float
+    reduce_only: bool
+    update_time: int
+
+
+class AccountState:
+    """
+    Local copy of positions, balances and orders maintained from the user data stream.
+
+    Seeded from one REST snapshot and then updated by ACCOUNT_UPDATE and
+    ORDER_TRADE_UPDATE events. Events can arrive out of order, so each entry
+    keeps the event time it was last updated at and older events are ignored.
+    Finished orders are dropped TERMINAL_ORDER_TTL_SEC after they finish and
+    only the last MARGIN_CALL_HISTORY margin calls are kept.
+    """
+
+    def __init__(self, market_cache: Optional[MarketDataCache] = None):
+        self.market_cache = market_cache
+        self.positions: Dict[Tuple[str, str], PositionState] = {}
+        self.balances: Dict[str, BalanceState] = {}
+        self.orders: Dict[int, OrderState] = {}
+        self.margin_calls: Deque[dict] = deque(maxlen=MARGIN_CALL_HISTORY)
+        self._finished_orders: Deque[Tuple[int, int]] = deque()  # (event time, order id), oldest first
+        self.is_synced = False
+        self._lock = threading.Lock()
+        self._listeners: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+    
+    def add_listener(self, event_type: str, callback: Callable[[dict], None]):
+        """Call `callback(event)` after every event of `event_type` (e.g. 'ACCOUNT_UPDATE') is applied"""
+        self._listeners[event_type].append(callback)
+
+    def load_snapshot(self, positions: list, balances: list):
+        """Replace local state with REST positionRisk + balance responses"""
+        with self._lock:
+            self.positions = {}
+            for pos in positions:
+                state = PositionState(
+                    symbol=pos['symbol'],
+                    position_side=pos['positionSide'],
+                    amount=float(pos['positionAmt']),
+                    entry_price=float(pos['entryPrice']),
+                    unrealized_pnl=float(pos.get('unRealizedProfit', 0)),
+                    margin_type=pos.get('marginType', ''),
+                    isolated_wallet=float(pos.get('isolatedWallet') or pos.get('isolatedMargin') or 0),
+                    update_time=int(pos.get('updateTime', 0))
+                )
+                self.positions[(state.symbol, state.position_side)] = state
+
+            self.balances = {}
+            for bal in balances:
+                self.balances[bal['asset']] = BalanceState(
+                    asset=bal['asset'],
+                    wallet_balance=float(bal['balance']),
+                    cross_wallet_balance=float(bal.get('crossWalletBalance', 0)),
+                    update_time=int(bal.get('updateTime', 0))
+                )
+            self.is_synced = True
+        logger.info(f"Account state synced: {len(self.positions)} positions, {len(self.balances)} balances")
+
+    def on_event(self, event: dict):
+        """Apply one user data stream event"""
+        event_type = event.get('e')
+        if event_type == 'ACCOUNT_UPDATE':
+            self._on_account_update(event)
+        elif event_type == 'ORDER_TRADE_UPDATE':
+            self._on_order_update(event)
+        elif event_type == 'MARGIN_CALL':
+            self.margin_calls.append(event)
+            for pos in event.get('p', []):
+                logger.warning(
+                    f"⚠️ Margin call: {pos['s']} {pos['ps']} amount={pos['pa']} "
+                    f"mark={pos['mp']} uPnL={pos['up']} maint={pos['mm']}"
+                )
+        
+        for callback in self._listeners.get(event_type, ()):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Account state listener failed on {event_type}: {e}")
+
+    def _on_account_update(self, event: dict):
+        event_time = int(event['E'])
+        data = event.get('a', {})
+        with self._lock:
+            for bal in data.get('B', []):
+                current = self.balances.get(bal['a'])
+                if current is not None and current.update_time > event_time:
+                    continue
+                self.balances[bal['a']] = BalanceState(
+                    asset=bal['a'],
+                    wallet_balance=float(bal['wb']),
+                    cross_wallet_balance=float(bal['cw']),
+                    update_time=event_time
+                )
+            for pos in data.get('P', []):
+                key = (pos['s'], pos['ps'])
+                current = self.positions.get(key)
+                if current is not None and current.update_time > event_time:
+                    continue
+                self.positions[key] = PositionState(
+                    symbol=pos['s'],
+                    position_side=pos['ps'],
+                    amount=float(pos['pa']),
+                    entry_price=float(pos['ep']),
+                    unrealized_pnl=float(pos['up']),
+                    margin_type=pos.get('mt', ''),
+                    isolated_wallet=float(pos.get('iw') or 0),
+                    update_time=event_time
+                )
+
+    def _on_order_update(self, event: dict):
+        event_time = int(event['E'])
+        o = event['o']
+        order_id = int(o['i'])
+        with self._lock:
+            current = self.orders.get(order_id)
+            if current is not None and current.update_time > event_time:
+                return
+            self.orders[order_id] = OrderState(
+                symbol=o['s'],
+                order_id=order_id,
+                client_order_id=o.get('c', ''),
+                side=o['S'],
+                position_side=o.get('ps', 'BOTH'),
+                order_type=o.get('ot') or o['o'],
+                status=o['X'],
+                orig_qty=float(o['q']),
+                executed_qty=float(o['z']),
+                avg_price=float(o.get('ap') or 0),
+                last_filled_qty=float(o.get('l') or 0),
+                last_filled_price=float(o.get('L') or 0),
+                commission=(current.commission if current else 0.0) + float(o.get('n') or 0),
+                realized_pnl=(current.realized_pnl if current else 0.0) + float(o.get('rp') or 0),
+                reduce_only=bool(o.get('R', False)),
+                update_time=event_time
+            )
+            if o['X'] in TERMINAL_ORDER_STATUSES:
+                self._finished_orders.append((event_time, order_id))
+            self._prune_orders(event_time)
+
+    def _prune_orders(self, now_ms: int):
+        """Drop orders that finished more than TERMINAL_ORDER_TTL_SEC ago (lock held)"""
+        cutoff = now_ms - TERMINAL_ORDER_TTL_SEC * 1000
+        while self._finished_orders and self._finished_orders[0][0] < cutoff:
+            _, order_id = self._finished_orders.popleft()
+            order = self.orders.get(order_id)
+            # A later update may have superseded the one queued
+            if order is not None and order.status in TERMINAL_ORDER_STATUSES and order.update_time < cutoff:
+                del self.orders[order_id]
+
+    def get_position(self, symbol: str, position_side: str) -> Optional[PositionState]:
+        """Current position for one side"""
+        return self.positions.get((symbol, position_side))
+
+    def get_order(self, order_id: int) -> Optional[OrderState]:
+        """Last known state of an order"""
+        return self.orders.get(order_id)
+
+    def position_risk(self, symbol: Optional[str] = None) -> List[Dict]:
+        """
+        Positions in the shape of a /fapi/v2/positionRisk response, so callers
+        can switch between REST and local state transparently.
+        """
+        result = []
+        for state in list(self.positions.values()):
+            if symbol is not None and state.symbol != symbol:
+                continue
+            mark_price = None
+            if self.market_cache is not None:
+                mark_price = self.market_cache.get_mark_price(state.symbol)
+            unrealized = state.unrealized_pnl
+            if mark_price is not None and state.amount != 0:
+                unrealized = state.amount * (mark_price - state.entry_price)
+            result.append({
+                "symbol": state.symbol,
+                "positionSide": state.position_side,
+                "positionAmt": str(state.amount),
+                "entryPrice": str(state.entry_price),
+                "markPrice": str(mark_price if mark_price is not None else 0),
+                "unRealizedProfit": str(unrealized),
+                "marginType": state.margin_type,
+                "isolatedWallet": str(state.isolated_wallet),
+                "updateTime": state.update_time
+            })
+        return result
+
+    def balance(self) -> List[Dict]:
+        """Balances in the shape of a /fapi/v2/balance response"""
+        return [
+            {
+                "asset": b.asset,
+                "balance": str(b.wallet_balance),
+                "crossWalletBalance": str(b.cross_wallet_balance),
+                "updateTime": b.update_time
+            }
+            for b in list(self.balances.values())
+        ]
+
+
+class UserStream:
+    """
+    User data stream listener.
+
+    Creates a listenKey, keeps it alive, recreates it when it expires and
+    resynchronises `AccountState` from REST on every (re)connect so no event
+    gap can leave local state stale.
+    """
+
+    def __init__(self, exchange, state: Optional[AccountState] = None, ws_url: Optional[str] = None):
+        self.exchange = exchange
+        self.state = state or AccountState(market_cache=exchange.market_cache)
+        self.ws_url = ws_url or settings.aster_ws_url
+        self.listen_key: Optional[str] = None
+        self._thread = StreamThread(name="user-stream")
+        self._connection: Optional[StreamConnection] = None
+        self._keepalive_future = None
+
+    def start(self):
+        """Create the listenKey and start listening in a background thread"""
+        self.listen_key = self.exchange.new_listen_key()
+        self._connection = StreamConnection(
+            self.ws_url,
+            [],
+            self._on_message,
+            path=f"/ws/{self.listen_key}",
+            on_connect=self._resync
+        )
+        self._thread.add(self._connection)
+        self._thread.start()
+        self._keepalive_future = self._thread.call(self._keepalive_loop())
+        logger.info("User data stream started")
+
+    def stop(self):
+        """Stop listening and close the listenKey"""
+        if self._keepalive_future is not None:
+            self._keepalive_future.cancel()
+        self._thread.stop()
+        if self.listen_key:
+            try:
+                self.exchange.close_listen_key(self.listen_key)
+            except (ClientError, ServerError) as e:
+                logger.warning(f"Failed to close listenKey: {e}")
+        self.state.is_synced = False
+        logger.info("User data stream stopped")
+
+    def _on_message(self, event: dict):
+        if event.get('e') == 'listenKeyExpired':
+            logger.warning("listenKey expired, creating a new one")
+            self.state.is_synced = False
+            self._thread.call(self._renew_connection())
+            return
+        self.state.on_event(event)
+
+    async def _resync(self):
+        """Reload the REST snapshot; called after every (re)connect"""
+        self.state.is_synced = False
+        loop = asyncio.get_running_loop()
+        positions, balances = await asyncio.gather(
+            loop.run_in_executor(None, self.exchange.fetch_position_risk),
+            loop.run_in_executor(None, self.exchange.fetch_account_balance)
+        )
+        self.state.load_snapshot(positions, balances)
+
+    async def _renew_connection(self):
+        loop = asyncio.get_running_loop()
+        self.listen_key = await loop.run_in_executor(None, self.exchange.new_listen_key)
+        self._connection.path = f"/ws/{self.listen_key}"
+        await self._connection.reconnect()
+
+    async def _keepalive_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(LISTEN_KEY_KEEPALIVE_SEC)
+            try:
+                await loop.run_in_executor(None, self.exchange.renew_listen_key, self.listen_key)
+                logger.debug("listenKey renewed")
+            except ClientError as e:
+                # -1125: listenKey does not exist
+                logger.warning(f"listenKey keepalive failed ({e.error_code}), recreating")
+                self.state.is_synced = False
+                await self._renew_connection()
+            except ServerError as e:
+                logger.warning(f"listenKey keepalive failed: {e.message}")
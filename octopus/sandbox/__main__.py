@@ -0,0 +1,71 @@
+"""
+Run a local Aster-compatible exchange for offline load and latency testing.
+
+    python -m octopus.sandbox --port 8700 --symbols BTCUSDT,ETHUSDT --latency-ms 20 --error-rate 0.01
+
+Point the bot at it with ASTER_BASE_URL=http://127.0.0.1:8700 and
+ASTER_WS_URL=ws://127.0.0.1:8700. Credentials default to ASTER_API_KEY /
+ASTER_API_SECRET from the environment or .env, so the bot signs requests
+exactly as it would in production. Stats: GET /sandbox/stats.
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from octopus.sandbox.exchange import SandboxExchange
+from octopus.sandbox.market import DEFAULT_MARKETS, SandboxMarket
+from octopus.sandbox.server import SandboxServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--symbols", default=",".join(DEFAULT_MARKETS), help="comma separated; see DEFAULT_MARKETS")
+    parser.add_argument("--api-key", help="defaults to settings.aster_api_key")
+    parser.add_argument("--api-secret", help="defaults to settings.aster_api_secret")
+    parser.add_argument("--balance", type=float, default=10000.0, help="starting USDT wallet balance")
+    parser.add_argument("--tick-ms", type=float, default=100, help="market step interval")
+    parser.add_argument("--volatility", type=float, default=0.0002, help="stdev of the log price change per step")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added before every REST response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of REST requests that fail")
+    parser.add_argument("--weight-limit", type=int, default=2400, help="request weight per minute")
+    parser.add_argument("--order-limit", type=int, default=1200, help="orders per minute")
+    parser.add_argument("--clock-offset-ms", type=int, default=0, help="skew the server clock")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    api_key, api_secret = args.api_key, args.api_secret
+    if api_key is None or api_secret is None:
+        from octopus.config.settings import settings
+        api_key = api_key or settings.aster_api_key
+        api_secret = api_secret or settings.aster_api_secret
+
+    rng = random.Random(args.seed)
+    markets = {}
+    for symbol in args.symbols.split(","):
+        price, tick_size, step_size = DEFAULT_MARKETS.get(symbol, (100.0, "0.01", "0.01"))
+        markets[symbol] = SandboxMarket(symbol, price, tick_size, step_size, volatility=args.volatility, rng=rng)
+    exchange = SandboxExchange(markets, balance=args.balance, clock_offset_ms=args.clock_offset_ms)
+    server = SandboxServer(
+        exchange,
+        api_key,
+        api_secret,
+        tick_interval=args.tick_ms / 1000,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        weight_limit=args.weight_limit,
+        order_limit=args.order_limit,
+        seed=args.seed
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
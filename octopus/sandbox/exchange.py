@@ -0,0 +1,792 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import itertools
+import json
+import time
+
+from octopus.sandbox.market import SandboxMarket
+
+FUNDING_INTERVAL_MS = 8 * 60 * 60 * 1000
+MAINT_MARGIN_RATE = 0.004
+MAX_BATCH_ORDERS = 5
+TRIGGER_TYPES = ("STOP_MARKET", "TAKE_PROFIT_MARKET")
+ORDER_TYPES = ("MARKET", "LIMIT") + TRIGGER_TYPES
+
+
+class SandboxError(Exception):
+    """A rejection returned to the client as {"code": ..., "msg": ...}"""
+
+    def __init__(self, code: int, msg: str, status: int = 400, headers: Optional[Dict[str, str]] = None):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+        self.status = status
+        self.headers = headers
+
+
+def _require(params: Dict[str, str], *names: str):
+    for name in names:
+        if params.get(name) in (None, ""):
+            raise SandboxError(-1102, f"Mandatory parameter '{name}' was not sent, was empty/null, or malformed.")
+
+
+def _num(value: float) -> str:
+    return f"{value:.8f}".rstrip("0").rstrip(".") or "0"
+
+
+def _flag(value: Any) -> bool:
+    return str(value).lower() == "true"
+
+
+class SandboxOrder:
+    """One order as the exchange tracks it"""
+
+    def __init__(self, order_id: int, client_order_id: str, params: Dict[str, str], position_side: str, now_ms: int):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.symbol = params["symbol"]
+        self.side = params["side"]
+        self.type = params["type"]
+        self.position_side = position_side
+        self.quantity = float(params.get("quantity") or 0)
+        self.price = float(params.get("price") or 0)
+        self.stop_price = float(params.get("stopPrice") or 0)
+        self.time_in_force = params.get("timeInForce", "GTC")
+        self.reduce_only = _flag(params.get("reduceOnly"))
+        self.close_position = _flag(params.get("closePosition"))
+        self.working_type = params.get("workingType", "CONTRACT_PRICE")
+        self.status = "NEW"
+        self.executed_qty = 0.0
+        self.cum_quote = 0.0
+        self.time = now_ms
+        self.update_time = now_ms
+
+    @property
+    def avg_price(self) -> float:
+        return self.cum_quote / self.executed_qty if self.executed_qty else 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.status in ("NEW", "PARTIALLY_FILLED")
+
+    def to_dict(self, market: SandboxMarket) -> Dict[str, Any]:
+        return {
+            "orderId": self.order_id,
+            "symbol": self.symbol,
+            "status": self.status,
+            "clientOrderId": self.client_order_id,
+            "price": _num(self.price),
+            "avgPrice": _num(self.avg_price),
+            "origQty": market.format_qty(self.quantity),
+            "executedQty": market.format_qty(self.executed_qty),
+            "cumQty": market.format_qty(self.executed_qty),
+            "cumQuote": _num(self.cum_quote),
+            "timeInForce": self.time_in_force,
+            "type": self.type,
+            "origType": self.type,
+            "reduceOnly": self.reduce_only,
+            "closePosition": self.close_position,
+            "side": self.side,
+            "positionSide": self.position_side,
+            "stopPrice": _num(self.stop_price),
+            "workingType": self.working_type,
+            "priceProtect": False,
+            "time": self.time,
+            "updateTime": self.update_time,
+        }
+
+
+class SandboxExchange:
+    """
+    Matching engine and single account behind the sandbox server.
+
+    Orders are validated against the listed symbol filters and position mode,
+    market and marketable limit orders walk the synthetic book, resting
+    limits and STOP_MARKET/TAKE_PROFIT_MARKET orders are checked on every
+    market step, and funding settles every FUNDING_INTERVAL_MS. Every change
+    is reported through `listeners` as user data stream events
+    (ORDER_TRADE_UPDATE, ACCOUNT_UPDATE). Not thread-safe: the server calls it
+    from its event loop only.
+    """
+
+    def __init__(
+        self,
+        markets: Dict[str, SandboxMarket],
+        balance: float = 10000.0,
+        taker_fee: float = 0.00035,
+        maker_fee: float = 0.0001,
+        clock_offset_ms: int = 0,
+        funding_interval_ms: int = FUNDING_INTERVAL_MS
+    ):
+        self.markets = markets
+        self.wallet = balance
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.clock_offset_ms = clock_offset_ms
+        self.funding_interval_ms = funding_interval_ms
+        self.next_funding_time = (self.now_ms() // funding_interval_ms + 1) * funding_interval_ms
+
+        self.dual_side = False
+        self.leverage: Dict[str, int] = {symbol: 20 for symbol in markets}
+        self.margin_type: Dict[str, str] = {symbol: "CROSSED" for symbol in markets}
+        self.positions: Dict[Tuple[str, str], List[float]] = {}  # (symbol, positionSide) -> [signed amount, entry]
+        self.position_times: Dict[Tuple[str, str], int] = {}
+        self.orders: Dict[int, SandboxOrder] = {}
+        self.client_order_ids: Dict[Tuple[str, str], int] = {}
+        self.trades: List[Dict[str, Any]] = []
+        self.income: List[Dict[str, Any]] = []
+        self.listeners: List[Callable[[dict], None]] = []
+        self._order_ids = itertools.count(1_000_000)
+        self._trade_ids = itertools.count(1)
+        self._tran_ids = itertools.count(1)
+
+    def now_ms(self) -> int:
+        return int(time.time() * 1000) + self.clock_offset_ms
+
+    def market(self, symbol: Optional[str]) -> SandboxMarket:
+        market = self.markets.get(symbol or "")
+        if market is None:
+            raise SandboxError(-1121, "Invalid symbol.")
+        return market
+
+    # --- market data ------------------------------------------------------
+
+    def exchange_info(self, rate_limits: List[dict]) -> Dict[str, Any]:
+        return {
+            "timezone": "UTC",
+            "serverTime": self.now_ms(),
+            "rateLimits": rate_limits,
+            "assets": [{"asset": "USDT", "marginAvailable": True}],
+            "symbols": [market.info for market in self.markets.values()],
+        }
+
+    def depth(self, params: Dict[str, str]) -> Dict[str, Any]:
+        _require(params, "symbol")
+        market = self.market(params["symbol"])
+        bids, asks = market.depth(int(params.get("limit", 500)))
+        now = self.now_ms()
+        return {"lastUpdateId": market.update_id, "E": now, "T": now, "bids": bids, "asks": asks}
+
+    def premium_index(self, params: Dict[str, str]):
+        symbols = [params["symbol"]] if params.get("symbol") else list(self.markets)
+        now = self.now_ms()
+        result = []
+        for symbol in symbols:
+            market = self.market(symbol)
+            result.append({
+                "symbol": symbol,
+                "markPrice": _num(market.mark),
+                "indexPrice": _num(market.mark),
+                "estimatedSettlePrice": _num(market.mark),
+                "lastFundingRate": _num(market.funding_rate),
+                "nextFundingTime": self.next_funding_time,
+                "interestRate": "0.0001",
+                "time": now,
+            })
+        return result[0] if params.get("symbol") else result
+
+    def book_ticker(self, params: Dict[str, str]):
+        symbols = [params["symbol"]] if params.get("symbol") else list(self.markets)
+        now = self.now_ms()
+        result = []
+        for symbol in symbols:
+            ticker = self.market(symbol).book_ticker(now)
+            result.append({
+                "symbol": symbol, "bidPrice": ticker["b"], "bidQty": ticker["B"],
+                "askPrice": ticker["a"], "askQty": ticker["A"], "time": now,
+            })
+        return result[0] if params.get("symbol") else result
+
+    # --- orders -----------------------------------------------------------
+
+    def new_order(self, params: Dict[str, str]) -> Dict[str, Any]:
+        _require(params, "symbol", "side", "type")
+        market = self.market(params["symbol"])
+        side, order_type = params["side"], params["type"]
+        if side not in ("BUY", "SELL"):
+            raise SandboxError(-1117, "Invalid side.")
+        if order_type not in ORDER_TYPES:
+            raise SandboxError(-1116, "Invalid orderType.")
+        position_side = self._position_side(params)
+        close_position = _flag(params.get("closePosition"))
+        if not close_position:
+            _require(params, "quantity")
+            self._check_quantity(market, float(params["quantity"]))
+        if order_type == "LIMIT":
+            _require(params, "price", "timeInForce")
+            self._check_price(market, float(params["price"]))
+        if order_type in TRIGGER_TYPES:
+            _require(params, "stopPrice")
+            self._check_trigger(market, params)
+
+        client_order_id = params.get("newClientOrderId") or f"sb-{next(self._order_ids)}"
+        if (market.symbol, client_order_id) in self.client_order_ids:
+            raise SandboxError(-4116, "ClientOrderId is duplicated.")
+
+        order = SandboxOrder(next(self._order_ids), client_order_id, params, position_side, self.now_ms())
+        if not close_position:
+            self._check_position(market, order)
+        self.orders[order.order_id] = order
+        self.client_order_ids[(market.symbol, client_order_id)] = order.order_id
+        self._order_event(order, "NEW")
+
+        if order_type == "MARKET":
+            self._take(market, order)
+        elif order_type == "LIMIT":
+            self._place_limit(market, order)
+
+        response = order.to_dict(market)
+        if order_type == "MARKET" and params.get("newOrderRespType") != "RESULT":
+            # ACK (the default) reports the order as accepted; the fill shows in queries and events
+            response.update(status="NEW", executedQty="0", cumQty="0", cumQuote="0", avgPrice="0")
+        return response
+
+    def batch_orders(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        _require(params, "batchOrders")
+        try:
+            orders = json.loads(params["batchOrders"])
+        except ValueError:
+            raise SandboxError(-1130, "Data sent for parameter 'batchOrders' is not valid.")
+        if not isinstance(orders, list) or not 0 < len(orders) <= MAX_BATCH_ORDERS:
+            raise SandboxError(-1130, "Data sent for parameter 'batchOrders' is not valid.")
+        results = []
+        for order in orders:
+            try:
+                results.append(self.new_order({k: str(v) for k, v in order.items()}))
+            except SandboxError as e:
+                results.append({"code": e.code, "msg": e.msg})
+        return results
+
+    def query_order(self, params: Dict[str, str]) -> Dict[str, Any]:
+        order = self._find(params, -2013, "Order does not exist.")
+        return order.to_dict(self.market(order.symbol))
+
+    def cancel_order(self, params: Dict[str, str]) -> Dict[str, Any]:
+        order = self._find(params, -2011, "Unknown order sent.")
+        if not order.is_open:
+            raise SandboxError(-2011, "Unknown order sent.")
+        self._finish(order, "CANCELED")
+        return order.to_dict(self.market(order.symbol))
+
+    def cancel_batch(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        _require(params, "symbol")
+        if params.get("orderIdList"):
+            keys = [{"orderId": str(i)} for i in json.loads(params["orderIdList"])]
+        elif params.get("origClientOrderIdList"):
+            keys = [{"origClientOrderId": c} for c in json.loads(params["origClientOrderIdList"])]
+        else:
+            raise SandboxError(-1102, "Mandatory parameter 'orderIdList' was not sent, was empty/null, or malformed.")
+        results = []
+        for key in keys:
+            try:
+                results.append(self.cancel_order({"symbol": params["symbol"], **key}))
+            except SandboxError as e:
+                results.append({"code": e.code, "msg": e.msg})
+        return results
+
+    def cancel_all(self, params: Dict[str, str]) -> Dict[str, Any]:
+        _require(params, "symbol")
+        self.market(params["symbol"])
+        for order in list(self.orders.values()):
+            if order.symbol == params["symbol"] and order.is_open:
+                self._finish(order, "CANCELED")
+        return {"code": 200, "msg": "The operation of cancel all open order is done."}
+
+    def open_orders(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        return [
+            order.to_dict(self.market(order.symbol))
+            for order in self.orders.values()
+            if order.is_open and (not params.get("symbol") or order.symbol == params["symbol"])
+        ]
+
+    def open_order(self, params: Dict[str, str]) -> Dict[str, Any]:
+        order = self._find(params, -2013, "Order does not exist.")
+        if not order.is_open:
+            raise SandboxError(-2013, "Order does not exist.")
+        return order.to_dict(self.market(order.symbol))
+
+    def all_orders(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        _require(params, "symbol")
+        market = self.market(params["symbol"])
+        start, end = int(params.get("startTime", 0)), int(params.get("endTime", 2 ** 62))
+        from_id = int(params.get("orderId", 0))
+        orders = [
+            order.to_dict(market)
+            for order in self.orders.values()
+            if order.symbol == market.symbol and order.order_id >= from_id and start <= order.time <= end
+        ]
+        return orders[:int(params.get("limit", 500))]
+
+    # --- account ----------------------------------------------------------
+
+    def get_position_mode(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {"dualSidePosition": self.dual_side}
+
+    def set_position_mode(self, params: Dict[str, str]) -> Dict[str, Any]:
+        _require(params, "dualSidePosition")
+        dual_side = _flag(params["dualSidePosition"])
+        if dual_side == self.dual_side:
+            raise SandboxError(-4059, "No need to change position side.")
+        if any(amount for amount, _ in self.positions.values()):
+            raise SandboxError(-4068, "Position side cannot be changed if there exists position.")
+        if any(order.is_open for order in self.orders.values()):
+            raise SandboxError(-4067, "Position side cannot be changed if there exists open orders.")
+        self.dual_side = dual_side
+        return {"code": 200, "msg": "success"}
+
+    def set_leverage(self, params: Dict[str, str]) -> Dict[str, Any]:
+        _require(params, "symbol", "leverage")
+        market = self.market(params["symbol"])
+        leverage = int(params["leverage"])
+        if not 1 <= leverage <= 125:
+            raise SandboxError(-4028, f"Leverage {leverage} is not valid")
+        self.leverage[market.symbol] = leverage
+        return {"symbol": market.symbol, "leverage": leverage, "maxNotionalValue": "1000000"}
+
+    def set_margin_type(self, params: Dict[str, str]) -> Dict[str, Any]:
+        _require(params, "symbol", "marginType")
+        market = self.market(params["symbol"])
+        if self.margin_type[market.symbol] == params["marginType"]:
+            raise SandboxError(-4046, "No need to change margin type.")
+        self.margin_type[market.symbol] = params["marginType"]
+        return {"code": 200, "msg": "success"}
+
+    def position_risk(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        symbols = [params["symbol"]] if params.get("symbol") else list(self.markets)
+        sides = ("LONG", "SHORT") if self.dual_side else ("BOTH",)
+        result = []
+        for symbol in symbols:
+            market = self.market(symbol)
+            for position_side in sides:
+                amount, entry = self.positions.get((symbol, position_side), (0.0, 0.0))
+                result.append({
+                    "symbol": symbol,
+                    "positionAmt": market.format_qty(amount),
+                    "entryPrice": _num(entry),
+                    "markPrice": _num(market.mark),
+                    "unRealizedProfit": _num(amount * (market.mark - entry)),
+                    "liquidationPrice": "0",
+                    "leverage": str(self.leverage[symbol]),
+                    "maxNotionalValue": "1000000",
+                    "marginType": "cross" if self.margin_type[symbol] == "CROSSED" else "isolated",
+                    "isolatedMargin": "0",
+                    "isAutoAddMargin": "false",
+                    "positionSide": position_side,
+                    "notional": _num(amount * market.mark),
+                    "isolatedWallet": "0",
+                    "updateTime": self.position_times.get((symbol, position_side), 0),
+                })
+        return result
+
+    def unrealized_pnl(self) -> float:
+        return sum(
+            amount * (self.markets[symbol].mark - entry)
+            for (symbol, _), (amount, entry) in self.positions.items()
+        )
+
+    def initial_margin(self) -> float:
+        return sum(
+            abs(amount) * self.markets[symbol].mark / self.leverage[symbol]
+            for (symbol, _), (amount, _) in self.positions.items()
+        )
+
+    def available_balance(self) -> float:
+        return self.wallet + self.unrealized_pnl() - self.initial_margin()
+
+    def balance(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        return [{
+            "accountAlias": "sandbox",
+            "asset": "USDT",
+            "balance": _num(self.wallet),
+            "crossWalletBalance": _num(self.wallet),
+            "crossUnPnl": _num(self.unrealized_pnl()),
+            "availableBalance": _num(self.available_balance()),
+            "maxWithdrawAmount": _num(max(self.available_balance(), 0.0)),
+            "marginAvailable": True,
+            "updateTime": self.now_ms(),
+        }]
+
+    def account(self, params: Dict[str, str]) -> Dict[str, Any]:
+        upnl = self.unrealized_pnl()
+        initial = self.initial_margin()
+        maint = sum(
+            abs(amount) * self.markets[symbol].mark * MAINT_MARGIN_RATE
+            for (symbol, _), (amount, _) in self.positions.items()
+        )
+        return {
+            "feeTier": 0,
+            "canTrade": True,
+            "canDeposit": True,
+            "canWithdraw": True,
+            "updateTime": self.now_ms(),
+            "totalInitialMargin": _num(initial),
+            "totalMaintMargin": _num(maint),
+            "totalWalletBalance": _num(self.wallet),
+            "totalUnrealizedProfit": _num(upnl),
+            "totalMarginBalance": _num(self.wallet + upnl),
+            "totalPositionInitialMargin": _num(initial),
+            "totalOpenOrderInitialMargin": "0",
+            "totalCrossWalletBalance": _num(self.wallet),
+            "totalCrossUnPnl": _num(upnl),
+            "availableBalance": _num(self.available_balance()),
+            "maxWithdrawAmount": _num(max(self.available_balance(), 0.0)),
+            "assets": [{
+                "asset": "USDT",
+                "walletBalance": _num(self.wallet),
+                "unrealizedProfit": _num(upnl),
+                "marginBalance": _num(self.wallet + upnl),
+                "maintMargin": _num(maint),
+                "initialMargin": _num(initial),
+                "crossWalletBalance": _num(self.wallet),
+                "availableBalance": _num(self.available_balance()),
+                "updateTime": self.now_ms(),
+            }],
+            "positions": [
+                {**pos, "unrealizedProfit": pos["unRealizedProfit"], "initialMargin": "0", "maintMargin": "0"}
+                for pos in self.position_risk({})
+            ],
+        }
+
+    def user_trades(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        _require(params, "symbol")
+        return self._window(
+            [t for t in self.trades if t["symbol"] == params["symbol"]], params, "time", "fromId", "id"
+        )
+
+    def income_history(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        income = [
+            i for i in self.income
+            if (not params.get("symbol") or i["symbol"] == params["symbol"])
+            and (not params.get("incomeType") or i["incomeType"] == params["incomeType"])
+        ]
+        return self._window(income, params, "time")
+
+    def commission_rate(self, params: Dict[str, str]) -> Dict[str, Any]:
+        _require(params, "symbol")
+        return {
+            "symbol": self.market(params["symbol"]).symbol,
+            "makerCommissionRate": _num(self.maker_fee),
+            "takerCommissionRate": _num(self.taker_fee),
+        }
+
+    @staticmethod
+    def _window(rows: List[dict], params: Dict[str, str], time_key: str, from_param: str = "", id_key: str = "") -> List[dict]:
+        start, end = int(params.get("startTime", 0)), int(params.get("endTime", 2 ** 62))
+        limit = int(params.get("limit", 100 if time_key == "time" and not id_key else 500))
+        if from_param and params.get(from_param):
+            rows = [r for r in rows if r[id_key] >= int(params[from_param])]
+        else:
+            rows = [r for r in rows if start <= r[time_key] <= end]
+        return rows[:limit]
+
+    # --- market steps -----------------------------------------------------
+
+    def step(self) -> Dict[str, Dict[str, dict]]:
+        """Advance every market one step; returns {symbol: {channel: event}}"""
+        now = self.now_ms()
+        events = {}
+        for symbol, market in self.markets.items():
+            events[symbol] = market.step(now)
+            self._match_resting(market)
+        if now >= self.next_funding_time:
+            self._settle_funding(now)
+        return events
+
+    def _match_resting(self, market: SandboxMarket):
+        for order in [o for o in self.orders.values() if o.symbol == market.symbol and o.is_open]:
+            if order.type == "LIMIT" and market.crosses(order.side, order.price):
+                # The book moved through the order: it fills at its own price as maker
+                self._fill(market, order, order.price, order.quantity - order.executed_qty, maker=True)
+            elif order.type in TRIGGER_TYPES and self._triggered(market, order):
+                quantity = self._trigger_quantity(order)
+                if quantity <= 0:
+                    self._finish(order, "EXPIRED")
+                    continue
+                order.quantity = quantity
+                self._take(market, order)
+
+    def _settle_funding(self, now: int):
+        changed = []
+        for (symbol, position_side), (amount, _) in self.positions.items():
+            if not amount:
+                continue
+            market = self.markets[symbol]
+            payment = amount * market.mark * market.funding_rate
+            self.wallet -= payment
+            self._add_income(symbol, "FUNDING_FEE", -payment, now)
+            changed.append((symbol, position_side))
+        for market in self.markets.values():
+            market.funding_rate = max(-0.00075, min(0.00075, market.funding_rate + market.rng.gauss(0, 0.00003)))
+        self.next_funding_time += self.funding_interval_ms
+        if changed:
+            self._account_event("FUNDING_FEE", changed)
+
+    # --- internals --------------------------------------------------------
+
+    def _position_side(self, params: Dict[str, str]) -> str:
+        position_side = params.get("positionSide", "BOTH")
+        if self.dual_side and position_side not in ("LONG", "SHORT"):
+            raise SandboxError(-4061, "Order's position side does not match user's setting.")
+        if not self.dual_side and position_side != "BOTH":
+            raise SandboxError(-4061, "Order's position side does not match user's setting.")
+        # Like the venue: reduceOnly "cannot be sent in Hedge Mode", even as "false"
+        if position_side != "BOTH" and "reduceOnly" in params:
+            raise SandboxError(-1106, "Parameter 'reduceOnly' sent when not required.")
+        return position_side
+
+    @staticmethod
+    def _check_quantity(market: SandboxMarket, quantity: float):
+        lot = market.filters.lot
+        units = quantity * lot.scale
+        if abs(units - round(units)) > 1e-6 or round(units) % lot.step_units:
+            raise SandboxError(-1111, "Precision is over the maximum defined for this asset.")
+        if quantity <= 0:
+            raise SandboxError(-4003, "Quantity less than or equal to zero.")
+        if quantity < market.filters.min_qty:
+            raise SandboxError(-4004, "Quantity less than min quantity.")
+        if quantity > market.filters.max_qty:
+            raise SandboxError(-4005, "Quantity greater than max quantity.")
+
+    @staticmethod
+    def _check_price(market: SandboxMarket, price: float):
+        ticks = price * market.filters.price.scale
+        if abs(ticks - round(ticks)) > 1e-6 or round(ticks) % market.filters.price.step_units:
+            raise SandboxError(-4014, "Price not increased by tick size.")
+        low, high = market.filters.price_bounds(market.mark)
+        if price > high:
+            raise SandboxError(-4016, f"Limit price can't be higher than {high:.{market.filters.price.decimals}f}.")
+        if price < low:
+            raise SandboxError(-4024, f"Limit price can't be lower than {low:.{market.filters.price.decimals}f}.")
+
+    def _check_trigger(self, market: SandboxMarket, params: Dict[str, str]):
+        order = SandboxOrder(0, "", params, params.get("positionSide", "BOTH"), 0)
+        if self._triggered(market, order):
+            raise SandboxError(-2021, "Order would immediately trigger.")
+
+    def _check_position(self, market: SandboxMarket, order: SandboxOrder):
+        """Reduce-only/closing orders must fit the position; opening orders need margin"""
+        amount, _ = self.positions.get((order.symbol, order.position_side), (0.0, 0.0))
+        closing = self._is_closing(order, amount)
+        # In one-way mode a plain order may close and flip the position
+        if order.reduce_only or (closing and order.position_side != "BOTH"):
+            if not closing or order.quantity > abs(amount) + 1e-12:
+                raise SandboxError(-2022, "ReduceOnly Order is rejected.")
+            return
+        price = order.price or market.mark
+        if order.quantity * price < market.filters.min_notional:
+            raise SandboxError(
+                -4164, f"Order's notional must be no smaller than {market.filters.min_notional} (unless you choose reduce only)."
+            )
+        if order.type in ("MARKET", "LIMIT"):
+            required = order.quantity * price / self.leverage[order.symbol]
+            if required > self.available_balance():
+                raise SandboxError(-2019, "Margin is insufficient.")
+
+    @staticmethod
+    def _is_closing(order: SandboxOrder, amount: float) -> bool:
+        """True when the order reduces the position it targets"""
+        if order.position_side == "LONG":
+            return order.side == "SELL"
+        if order.position_side == "SHORT":
+            return order.side == "BUY"
+        return (amount > 0 and order.side == "SELL") or (amount < 0 and order.side == "BUY")
+
+    def _triggered(self, market: SandboxMarket, order: SandboxOrder) -> bool:
+        price = market.mark if order.working_type == "MARK_PRICE" else (market.best_bid() + market.best_ask()) / 2
+        rising = (order.side == "BUY") == (order.type == "STOP_MARKET")
+        return price >= order.stop_price if rising else price <= order.stop_price
+
+    def _trigger_quantity(self, order: SandboxOrder) -> float:
+        amount, _ = self.positions.get((order.symbol, order.position_side), (0.0, 0.0))
+        if order.close_position or order.reduce_only:
+            if not amount or not self._is_closing(order, amount):
+                return 0.0
+            return abs(amount) if order.close_position else min(order.quantity, abs(amount))
+        return order.quantity
+
+    def _find(self, params: Dict[str, str], code: int, msg: str) -> SandboxOrder:
+        _require(params, "symbol")
+        if params.get("orderId"):
+            order = self.orders.get(int(params["orderId"]))
+        elif params.get("origClientOrderId"):
+            order = self.orders.get(self.client_order_ids.get((params["symbol"], params["origClientOrderId"]), -1))
+        else:
+            raise SandboxError(-1102, "Either orderId or origClientOrderId must be sent.")
+        if order is None or order.symbol != params["symbol"]:
+            raise SandboxError(code, msg)
+        return order
+
+    def _take(self, market: SandboxMarket, order: SandboxOrder, limit_price: Optional[float] = None):
+        remaining = round(order.quantity - order.executed_qty, market.filters.lot.decimals)
+        for price, quantity in market.take(order.side, remaining, limit_price):
+            self._fill(market, order, price, quantity, maker=False)
+
+    def _place_limit(self, market: SandboxMarket, order: SandboxOrder):
+        crosses = market.crosses(order.side, order.price)
+        if order.time_in_force == "GTX" and crosses:
+            self._finish(order, "EXPIRED")
+            return
+        if order.time_in_force == "FOK":
+            book = market.asks if order.side == "BUY" else market.bids
+            available = sum(
+                q for u, q in book.items()
+                if (market.price(u) <= order.price if order.side == "BUY" else market.price(u) >= order.price)
+            )
+            if available < order.quantity:
+                self._finish(order, "EXPIRED")
+                return
+        if crosses:
+            self._take(market, order, limit_price=order.price)
+        if order.is_open and order.time_in_force in ("IOC", "FOK"):
+            self._finish(order, "EXPIRED")
+
+    def _fill(self, market: SandboxMarket, order: SandboxOrder, price: float, quantity: float, maker: bool):
+        key = (order.symbol, order.position_side)
+        amount, entry = self.positions.get(key, (0.0, 0.0))
+        delta = quantity if order.side == "BUY" else -quantity
+        decimals = market.filters.lot.decimals
+
+        realized = 0.0
+        new_amount = round(amount + delta, decimals)
+        if amount == 0 or (amount > 0) == (delta > 0):
+            entry = (abs(amount) * entry + quantity * price) / abs(new_amount)
+        else:
+            closing = min(quantity, abs(amount))
+            realized = closing * (price - entry) * (1 if amount > 0 else -1)
+            if new_amount == 0:
+                entry = 0.0
+            elif (new_amount > 0) != (amount > 0):
+                entry = price
+        now = self.now_ms()
+        self.positions[key] = [new_amount, entry]
+        self.position_times[key] = now
+
+        commission = quantity * price * (self.maker_fee if maker else self.taker_fee)
+        self.wallet += realized - commission
+        order.executed_qty = round(order.executed_qty + quantity, decimals)
+        order.cum_quote += quantity * price
+        order.status = "FILLED" if order.executed_qty >= order.quantity - 1e-12 else "PARTIALLY_FILLED"
+        order.update_time = now
+
+        trade_id = next(self._trade_ids)
+        self.trades.append({
+            "symbol": order.symbol,
+            "id": trade_id,
+            "orderId": order.order_id,
+            "side": order.side,
+            "price": _num(price),
+            "qty": market.format_qty(quantity),
+            "realizedPnl": _num(realized),
+            "marginAsset": "USDT",
+            "quoteQty": _num(quantity * price),
+            "commission": _num(commission),
+            "commissionAsset": "USDT",
+            "time": now,
+            "positionSide": order.position_side,
+            "buyer": order.side == "BUY",
+            "maker": maker,
+        })
+        if realized:
+            self._add_income(order.symbol, "REALIZED_PNL", realized, now, trade_id)
+        self._add_income(order.symbol, "COMMISSION", -commission, now, trade_id)
+        self._order_event(
+            order, "TRADE", last_qty=quantity, last_price=price, commission=commission,
+            realized=realized, trade_id=trade_id, maker=maker
+        )
+        self._account_event("ORDER", [key])
+
+    def _finish(self, order: SandboxOrder, status: str):
+        order.status = status
+        order.update_time = self.now_ms()
+        self._order_event(order, status)
+
+    def _add_income(self, symbol: str, income_type: str, amount: float, now: int, trade_id: Optional[int] = None):
+        self.income.append({
+            "symbol": symbol,
+            "incomeType": income_type,
+            "income": _num(amount),
+            "asset": "USDT",
+            "info": income_type,
+            "time": now,
+            "tranId": next(self._tran_ids),
+            "tradeId": str(trade_id or ""),
+        })
+
+    def _emit(self, event: dict):
+        for listener in self.listeners:
+            listener(event)
+
+    def _order_event(
+        self,
+        order: SandboxOrder,
+        execution_type: str,
+        last_qty: float = 0.0,
+        last_price: float = 0.0,
+        commission: float = 0.0,
+        realized: float = 0.0,
+        trade_id: int = 0,
+        maker: bool = False
+    ):
+        market = self.markets[order.symbol]
+        now = self.now_ms()
+        self._emit({
+            "e": "ORDER_TRADE_UPDATE",
+            "E": now,
+            "T": now,
+            "o": {
+                "s": order.symbol,
+                "c": order.client_order_id,
+                "S": order.side,
+                "o": order.type,
+                "f": order.time_in_force,
+                "q": market.format_qty(order.quantity),
+                "p": _num(order.price),
+                "ap": _num(order.avg_price),
+                "sp": _num(order.stop_price),
+                "x": execution_type,
+                "X": order.status,
+                "i": order.order_id,
+                "l": market.format_qty(last_qty),
+                "z": market.format_qty(order.executed_qty),
+                "L": _num(last_price),
+                "N": "USDT",
+                "n": _num(commission),
+                "T": now,
+                "t": trade_id,
+                "b": "0",
+                "a": "0",
+                "m": maker,
+                "R": order.reduce_only,
+                "wt": order.working_type,
+                "ot": order.type,
+                "ps": order.position_side,
+                "cp": order.close_position,
+                "rp": _num(realized),
+            },
+        })
+
+    def _account_event(self, reason: str, keys: List[Tuple[str, str]]):
+        now = self.now_ms()
+        positions = []
+        for symbol, position_side in keys:
+            amount, entry = self.positions.get((symbol, position_side), (0.0, 0.0))
+            market = self.markets[symbol]
+            positions.append({
+                "s": symbol,
+                "pa": market.format_qty(amount),
+                "ep": _num(entry),
+                "cr": "0",
+                "up": _num(amount * (market.mark - entry)),
+                "mt": "cross" if self.margin_type[symbol] == "CROSSED" else "isolated",
+                "iw": "0",
+                "ps": position_side,
+            })
+        self._emit({
+            "e": "ACCOUNT_UPDATE",
+            "E": now,
+            "T": now,
+            "a": {
+                "m": reason,
+                "B": [{"a": "USDT", "wb": _num(self.wallet), "cw": _num(self.wallet), "bc": "0"}],
+                "P": positions,
+            },
+        })
@@ -0,0 +1,242 @@
+from typing import Dict, List, Optional, Tuple
+import math
+import random
+
+from octopus.exchange.symbol_info import SymbolFilters
+
+BOOK_LEVELS = 50
+
+# Starting price, tick size and lot step of the symbols the sandbox lists by default
+DEFAULT_MARKETS = {
+    "BTCUSDT": (60000.0, "0.1", "0.001"),
+    "ETHUSDT": (3000.0, "0.01", "0.001"),
+    "SOLUSDT": (150.0, "0.01", "0.01"),
+    "BNBUSDT": (600.0, "0.01", "0.01"),
+    "ASTERUSDT": (1.5, "0.0001", "1"),
+}
+
+
+def symbol_info(symbol: str, tick_size: str, step_size: str) -> dict:
+    """exchangeInfo entry for a sandbox symbol"""
+    filters = [
+        {"filterType": "PRICE_FILTER", "tickSize": tick_size, "minPrice": tick_size, "maxPrice": "10000000"},
+        {"filterType": "LOT_SIZE", "stepSize": step_size, "minQty": step_size, "maxQty": "100000000"},
+        {"filterType": "MARKET_LOT_SIZE", "stepSize": step_size, "minQty": step_size, "maxQty": "10000000"},
+        {"filterType": "MIN_NOTIONAL", "notional": "5"},
+        {"filterType": "PERCENT_PRICE", "multiplierUp": "1.0500", "multiplierDown": "0.9500", "multiplierDecimal": "4"},
+    ]
+    quantizers = SymbolFilters({"symbol": symbol, "filters": filters})
+    return {
+        "symbol": symbol,
+        "pair": symbol,
+        "contractType": "PERPETUAL",
+        "status": "TRADING",
+        "baseAsset": symbol[:-4],
+        "quoteAsset": "USDT",
+        "marginAsset": "USDT",
+        "pricePrecision": quantizers.price.decimals,
+        "quantityPrecision": quantizers.lot.decimals,
+        "filters": filters,
+        "orderTypes": ["LIMIT", "MARKET", "STOP_MARKET", "TAKE_PROFIT_MARKET"],
+        "timeInForce": ["GTC", "IOC", "FOK", "GTX"],
+    }
+
+
+class SandboxMarket:
+    """
+    Synthetic market for one symbol.
+
+    The mark price follows a geometric random walk. A book of BOOK_LEVELS price
+    levels per side is kept one tick either side of the mark; levels that
+    survive a move keep their (possibly consumed) quantity and are refilled
+    gradually, so taking liquidity has a visible, temporary cost. Every step
+    produces a depthUpdate diff with consistent U/u/pu ids against /depth.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        price: float,
+        tick_size: str,
+        step_size: str,
+        volatility: float = 0.0002,
+        level_notional: float = 20000.0,
+        rng: Optional[random.Random] = None
+    ):
+        self.symbol = symbol
+        self.info = symbol_info(symbol, tick_size, step_size)
+        self.filters = SymbolFilters(self.info)
+        self.volatility = volatility
+        self.level_notional = level_notional
+        self.rng = rng or random.Random()
+
+        self.mark = price
+        self.funding_rate = 0.0001
+        self.update_id = 1
+        self.bids: Dict[int, float] = {}  # price in tick units -> quantity
+        self.asks: Dict[int, float] = {}
+        self._published: Tuple[Dict[int, float], Dict[int, float]] = ({}, {})
+        self._trades: List[Tuple[float, float, bool]] = []  # (price, qty, buyer is maker)
+        self._agg_id = 0
+        self._rebuild()
+        self._published = (dict(self.bids), dict(self.asks))
+
+    # --- prices -----------------------------------------------------------
+
+    def price(self, units: int) -> float:
+        return units / self.filters.price.scale * self.filters.price.step_units
+
+    def format_price(self, units: int) -> str:
+        return self.filters.price.format_units(units * self.filters.price.step_units)
+
+    def format_qty(self, quantity: float) -> str:
+        return self.filters.lot.format_units(self.filters.lot.to_units(quantity))
+
+    def best_bid(self) -> float:
+        return self.price(max(u for u, q in self.bids.items() if q > 0))
+
+    def best_ask(self) -> float:
+        return self.price(min(u for u, q in self.asks.items() if q > 0))
+
+    def _level_qty(self, units: int) -> float:
+        quantity = self.level_notional / self.price(units) * self.rng.uniform(0.5, 1.5)
+        return max(self.filters.lot.floor(quantity), float(self.filters.lot.step))
+
+    def _rebuild(self):
+        """Re-centre the book on the mark, keeping surviving levels"""
+        tick = self.price(1)
+        mid = int(self.mark / tick)
+        for book, start, direction in ((self.bids, mid, -1), (self.asks, mid + 1, 1)):
+            wanted = {start + direction * i for i in range(BOOK_LEVELS)}
+            for units in [u for u in book if u not in wanted]:
+                del book[units]
+            for units in wanted:
+                if units not in book:
+                    book[units] = self._level_qty(units)
+                elif self.rng.random() < 0.1:
+                    # Consumed liquidity comes back over a few steps
+                    book[units] = max(book[units], self._level_qty(units))
+
+    # --- matching ---------------------------------------------------------
+
+    def take(self, side: str, quantity: float, limit_price: Optional[float] = None) -> List[Tuple[float, float]]:
+        """
+        Consume liquidity for a taker order, best level first.
+
+        Returns (price, quantity) fills. Stops at `limit_price` when given; a
+        market order larger than the whole book fills its remainder at the
+        worst level.
+        """
+        book = self.asks if side == "BUY" else self.bids
+        levels = sorted(book) if side == "BUY" else sorted(book, reverse=True)
+        fills: List[Tuple[float, float]] = []
+        remaining = quantity
+        for units in levels:
+            price = self.price(units)
+            if limit_price is not None and (price > limit_price if side == "BUY" else price < limit_price):
+                break
+            filled = min(remaining, book[units])
+            if filled <= 0:
+                continue
+            fills.append((price, filled))
+            # Emptied levels stay at 0 so the refill in _rebuild is gradual
+            book[units] = round(book[units] - filled, self.filters.lot.decimals)
+            remaining = round(remaining - filled, self.filters.lot.decimals)
+            if remaining <= 0:
+                break
+        if remaining > 0 and limit_price is None:
+            fills.append((self.price(levels[-1]), remaining))
+        for price, filled in fills:
+            self._trades.append((price, filled, side == "SELL"))
+        return fills
+
+    def crosses(self, side: str, price: float) -> bool:
+        """True when a limit order at `price` would take liquidity"""
+        return price >= self.best_ask() if side == "BUY" else price <= self.best_bid()
+
+    # --- streams ----------------------------------------------------------
+
+    def step(self, now_ms: int) -> Dict[str, dict]:
+        """Move the price one step and return this step's events by channel"""
+        self.mark *= math.exp(self.rng.gauss(0.0, self.volatility))
+        self._rebuild()
+
+        old_bids, old_asks = self._published
+        first_id = self.update_id + 1
+        previous_id = self.update_id
+        self.update_id += 1
+        events = {
+            "depth": {
+                "e": "depthUpdate",
+                "E": now_ms,
+                "T": now_ms,
+                "s": self.symbol,
+                "U": first_id,
+                "u": self.update_id,
+                "pu": previous_id,
+                "b": self._diff(old_bids, self.bids),
+                "a": self._diff(old_asks, self.asks),
+            },
+            "bookTicker": self.book_ticker(now_ms),
+        }
+        self._published = (dict(self.bids), dict(self.asks))
+
+        if not self._trades and self.rng.random() < 0.3:
+            side = "BUY" if self.rng.random() < 0.5 else "SELL"
+            price = self.best_ask() if side == "BUY" else self.best_bid()
+            self._trades.append((price, float(self.filters.lot.step), side == "SELL"))
+        if self._trades:
+            price, _, buyer_maker = self._trades[-1]
+            self._agg_id += 1
+            events["aggTrade"] = {
+                "e": "aggTrade",
+                "E": now_ms,
+                "s": self.symbol,
+                "a": self._agg_id,
+                "p": str(price),
+                "q": self.format_qty(sum(q for _, q, _ in self._trades)),
+                "f": self._agg_id,
+                "l": self._agg_id,
+                "T": now_ms,
+                "m": buyer_maker,
+            }
+            self._trades = []
+        return events
+
+    def _diff(self, old: Dict[int, float], new: Dict[int, float]) -> List[List[str]]:
+        changes = [[self.format_price(u), self.format_qty(q)] for u, q in new.items() if old.get(u, 0) != q]
+        changes += [[self.format_price(u), "0"] for u, q in old.items() if u not in new and q > 0]
+        return changes
+
+    def mark_price_event(self, now_ms: int, next_funding_time: int) -> dict:
+        return {
+            "e": "markPriceUpdate",
+            "E": now_ms,
+            "s": self.symbol,
+            "p": f"{self.mark:.8f}",
+            "i": f"{self.mark:.8f}",
+            "P": f"{self.mark:.8f}",
+            "r": f"{self.funding_rate:.8f}",
+            "T": next_funding_time,
+        }
+
+    def book_ticker(self, now_ms: int) -> dict:
+        bid = max(u for u, q in self.bids.items() if q > 0)
+        ask = min(u for u, q in self.asks.items() if q > 0)
+        return {
+            "e": "bookTicker",
+            "u": self.update_id,
+            "E": now_ms,
+            "T": now_ms,
+            "s": self.symbol,
+            "b": self.format_price(bid),
+            "B": self.format_qty(self.bids[bid]),
+            "a": self.format_price(ask),
+            "A": self.format_qty(self.asks[ask]),
+        }
+
+    def depth(self, limit: int = 500) -> Tuple[List[List[str]], List[List[str]]]:
+        """Top `limit` levels per side as [price, qty] strings"""
+        bids = [[self.format_price(u), self.format_qty(self.bids[u])] for u in sorted(self.bids, reverse=True) if self.bids[u] > 0]
+        asks = [[self.format_price(u), self.format_qty(self.asks[u])] for u in sorted(self.asks) if self.asks[u] > 0]
+        return bids[:limit], asks[:limit]
@@ -0,0 +1,420 @@
+from loguru import logger
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+from urllib.parse import parse_qsl
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import time
+
+from aiohttp import WSMsgType, web
+
+from octopus.exchange.aster.rate_limiter import ENDPOINT_WEIGHTS, ORDER_ENDPOINTS
+from octopus.sandbox.exchange import SandboxError, SandboxExchange
+
+PUBLIC, KEYED, SIGNED = "public", "keyed", "signed"
+LISTEN_KEY_TTL_MS = 60 * 60 * 1000
+MAX_RECV_WINDOW_MS = 60000
+MARK_PRICE_INTERVAL_MS = 1000
+LATENCY_SAMPLES = 10000
+
+
+def _percentiles(samples: Deque[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50": round(pick(0.50), 3),
+        "p90": round(pick(0.90), 3),
+        "p99": round(pick(0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class _Subscriber:
+    """One websocket client and the streams it listens to; sends go through a queue to keep their order"""
+
+    def __init__(self, ws: web.WebSocketResponse, streams: List[str], combined: bool, listen_key: Optional[str] = None):
+        self.ws = ws
+        self.streams: Set[str] = set(streams)
+        self.combined = combined
+        self.listen_key = listen_key
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def push(self, stream: str, event: dict):
+        self.queue.put_nowait({"stream": stream, "data": event} if self.combined else event)
+
+    async def writer(self):
+        while True:
+            message = await self.queue.get()
+            if message is None or self.ws.closed:
+                return
+            await self.ws.send_str(json.dumps(message))
+
+
+class SandboxServer:
+    """
+    Local stand-in for the Aster futures REST and websocket APIs.
+
+    Signed requests are verified exactly like `API._get_sign` produces them
+    (HMAC-SHA256 of the raw query string before `&signature=`), timestamps are
+    checked against recvWindow, and request weight / order counts are
+    enforced with the same endpoint weights the client's RateLimiter uses,
+    returning the X-MBX-* usage headers and 429 + Retry-After when exceeded.
+
+    Faults can be injected: `latency_ms` (+ uniform `jitter_ms`) before every
+    REST request is handled, and `error_rate` of requests fail with a 503 or
+    -1001 before being processed or — for order endpoints — with a 503 after
+    the order was executed, so unknown-outcome handling can be exercised.
+
+    Tick-to-trade latency is the time from publishing a symbol's latest
+    market event to receiving an order for that symbol; it and per-endpoint
+    service times are reported at GET /sandbox/stats.
+    """
+
+    def __init__(
+        self,
+        exchange: SandboxExchange,
+        api_key: str,
+        api_secret: str,
+        tick_interval: float = 0.1,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        weight_limit: int = 2400,
+        order_limit: int = 1200,
+        seed: Optional[int] = None
+    ):
+        self.exchange = exchange
+        self.api_key = api_key
+        self.api_secret = api_secret.encode("utf-8")
+        self.tick_interval = tick_interval
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limits = [
+            {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": weight_limit},
+            {"rateLimitType": "ORDERS", "interval": "MINUTE", "intervalNum": 1, "limit": order_limit},
+        ]
+        self.rng = random.Random(seed)
+
+        self.listen_keys: Dict[str, int] = {}  # listenKey -> expiry (ms)
+        self.subscribers: Set[_Subscriber] = set()
+        self._window = 0
+        self._used_weight = 0
+        self._order_count = 0
+        self._last_tick: Dict[str, float] = {}  # symbol -> perf_counter() of the last published market event
+        self._last_mark_ms = 0
+        self.tick_to_trade: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.service_times: Dict[str, Deque[float]] = {}
+        self.counters: Dict[str, int] = {"requests": 0, "rejected": 0, "rate_limited": 0, "injected_errors": 0}
+        self._market_task: Optional[asyncio.Task] = None
+
+        self.routes: Dict[tuple, tuple] = {
+            ("GET", "/fapi/v1/ping"): (PUBLIC, lambda p: {}),
+            ("GET", "/fapi/v1/time"): (PUBLIC, lambda p: {"serverTime": exchange.now_ms()}),
+            ("GET", "/fapi/v1/exchangeInfo"): (PUBLIC, lambda p: exchange.exchange_info(self.rate_limits)),
+            ("GET", "/fapi/v1/depth"): (PUBLIC, exchange.depth),
+            ("GET", "/fapi/v1/premiumIndex"): (PUBLIC, exchange.premium_index),
+            ("GET", "/fapi/v1/ticker/bookTicker"): (PUBLIC, exchange.book_ticker),
+            ("POST", "/fapi/v1/listenKey"): (KEYED, self._new_listen_key),
+            ("PUT", "/fapi/v1/listenKey"): (KEYED, self._renew_listen_key),
+            ("DELETE", "/fapi/v1/listenKey"): (KEYED, self._close_listen_key),
+            ("POST", "/fapi/v1/order"): (SIGNED, exchange.new_order),
+            ("GET", "/fapi/v1/order"): (SIGNED, exchange.query_order),
+            ("DELETE", "/fapi/v1/order"): (SIGNED, exchange.cancel_order),
+            ("POST", "/fapi/v1/batchOrders"): (SIGNED, exchange.batch_orders),
+            ("DELETE", "/fapi/v1/batchOrders"): (SIGNED, exchange.cancel_batch),
+            ("DELETE", "/fapi/v1/allOpenOrders"): (SIGNED, exchange.cancel_all),
+            ("GET", "/fapi/v1/openOrders"): (SIGNED, exchange.open_orders),
+            ("GET", "/fapi/v1/openOrder"): (SIGNED, exchange.open_order),
+            ("GET", "/fapi/v1/allOrders"): (SIGNED, exchange.all_orders),
+            ("GET", "/fapi/v1/positionSide/dual"): (SIGNED, exchange.get_position_mode),
+            ("POST", "/fapi/v1/positionSide/dual"): (SIGNED, exchange.set_position_mode),
+            ("POST", "/fapi/v1/leverage"): (SIGNED, exchange.set_leverage),
+            ("POST", "/fapi/v1/marginType"): (SIGNED, exchange.set_margin_type),
+            ("GET", "/fapi/v2/positionRisk"): (SIGNED, exchange.position_risk),
+            ("GET", "/fapi/v2/balance"): (SIGNED, exchange.balance),
+            ("GET", "/fapi/v2/account"): (SIGNED, exchange.account),
+            ("GET", "/fapi/v1/userTrades"): (SIGNED, exchange.user_trades),
+            ("GET", "/fapi/v1/income"): (SIGNED, exchange.income_history),
+            ("GET", "/fapi/v1/commissionRate"): (SIGNED, exchange.commission_rate),
+        }
+        exchange.listeners.append(self._publish_user_event)
+
+    # --- app --------------------------------------------------------------
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/fapi/{path:.*}", self._handle_rest)
+        app.router.add_get("/sandbox/stats", self._handle_stats)
+        app.router.add_get("/stream", self._handle_stream)
+        app.router.add_get("/ws", self._handle_stream)
+        app.router.add_get("/ws/{name}", self._handle_stream)
+        app.on_startup.append(self._start_market)
+        app.on_cleanup.append(self._stop_market)
+        return app
+
+    async def _start_market(self, app: web.Application):
+        self._market_task = asyncio.create_task(self._market_loop())
+
+    async def _stop_market(self, app: web.Application):
+        if self._market_task is not None:
+            self._market_task.cancel()
+        for subscriber in list(self.subscribers):
+            subscriber.queue.put_nowait(None)
+            await subscriber.ws.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "tick_to_trade_ms": _percentiles(self.tick_to_trade),
+            "service_ms": {endpoint: _percentiles(samples) for endpoint, samples in self.service_times.items()},
+            "subscribers": len(self.subscribers),
+        }
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    # --- REST -------------------------------------------------------------
+
+    async def _handle_rest(self, request: web.Request) -> web.Response:
+        received = time.perf_counter()
+        delay = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        self.counters["requests"] += 1
+
+        key = (request.method, request.path)
+        route = self.routes.get(key)
+        if route is None:
+            return self._error(SandboxError(-1000, f"Unsupported endpoint {request.method} {request.path}", 404))
+        security, handler = route
+
+        fault = self.rng.random() < self.error_rate
+        if fault and (key not in ORDER_ENDPOINTS or self.rng.random() < 0.5):
+            self.counters["injected_errors"] += 1
+            if self.rng.random() < 0.5:
+                return web.Response(status=503, text="Service Unavailable")
+            return self._error(SandboxError(-1001, "Internal error; unable to process your request. Please try again."))
+
+        try:
+            params = self._authenticate(request, security)
+            headers = self._count(key, params)
+            if key in ORDER_ENDPOINTS:
+                for symbol in self._order_symbols(params):
+                    if symbol in self._last_tick:
+                        self.tick_to_trade.append((received - self._last_tick[symbol]) * 1000)
+            result = handler(params)
+        except SandboxError as e:
+            self.counters["rejected"] += 1
+            return self._error(e, e.headers)
+        finally:
+            self.service_times.setdefault(request.path, deque(maxlen=LATENCY_SAMPLES)).append(
+                (time.perf_counter() - received) * 1000
+            )
+
+        if fault:
+            # Executed, but the client never learns the outcome
+            self.counters["injected_errors"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        return web.json_response(result, headers=headers)
+
+    @staticmethod
+    def _order_symbols(params: Dict[str, str]) -> Set[str]:
+        if "batchOrders" not in params:
+            return {params.get("symbol", "")}
+        try:
+            return {order.get("symbol", "") for order in json.loads(params["batchOrders"])}
+        except (ValueError, AttributeError):
+            return set()
+
+    @staticmethod
+    def _error(error: SandboxError, headers: Optional[Dict[str, str]] = None) -> web.Response:
+        return web.json_response({"code": error.code, "msg": error.msg}, status=error.status, headers=headers)
+
+    def _authenticate(self, request: web.Request, security: str) -> Dict[str, str]:
+        raw = request.rel_url.raw_query_string
+        if security == PUBLIC:
+            return dict(parse_qsl(raw, keep_blank_values=True))
+        if request.headers.get("X-MBX-APIKEY") != self.api_key:
+            raise SandboxError(-2015, "Invalid API-key, IP, or permissions for action.", 401)
+        if security == KEYED:
+            return dict(parse_qsl(raw, keep_blank_values=True))
+
+        payload, separator, signature = raw.rpartition("&signature=")
+        if not separator:
+            raise SandboxError(-1102, "Mandatory parameter 'signature' was not sent, was empty/null, or malformed.")
+        expected = hmac.new(self.api_secret, payload.encode("utf-8"), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, signature):
+            raise SandboxError(-1022, "Signature for this request is not valid.")
+
+        params = dict(parse_qsl(payload, keep_blank_values=True))
+        if "timestamp" not in params:
+            raise SandboxError(-1102, "Mandatory parameter 'timestamp' was not sent, was empty/null, or malformed.")
+        recv_window = int(params.get("recvWindow", 5000))
+        if recv_window > MAX_RECV_WINDOW_MS:
+            raise SandboxError(-1131, "recvWindow must be less than 60000")
+        now = self.exchange.now_ms()
+        timestamp = int(params["timestamp"])
+        if timestamp > now + 1000 or now - timestamp > recv_window:
+            raise SandboxError(-1021, "Timestamp for this request is outside of the recvWindow.")
+        return params
+
+    def _count(self, key: tuple, params: Dict[str, str]) -> Dict[str, str]:
+        """Charge the request against the 1-minute weight and order windows"""
+        window = int(time.time() // 60)
+        if window != self._window:
+            self._window, self._used_weight, self._order_count = window, 0, 0
+
+        weight = ENDPOINT_WEIGHTS.get(key, 1)
+        weight = weight(params) if callable(weight) else weight
+        orders = ORDER_ENDPOINTS.get(key, 0)
+        orders = orders(params) if callable(orders) else orders
+        weight_limit, order_limit = (limit["limit"] for limit in self.rate_limits)
+
+        self._used_weight += weight
+        over = self._used_weight > weight_limit
+        if not over and orders:
+            self._order_count += orders
+            over = self._order_count > order_limit
+        headers = {"X-MBX-USED-WEIGHT-1M": str(self._used_weight), "X-MBX-ORDER-COUNT-1M": str(self._order_count)}
+        if over:
+            self.counters["rate_limited"] += 1
+            raise SandboxError(
+                -1003,
+                "Too many requests; current limit is exceeded, please use the websocket for live updates.",
+                429,
+                {**headers, "Retry-After": str(max(1, int((window + 1) * 60 - time.time())))}
+            )
+        return headers
+
+    def _new_listen_key(self, params: Dict[str, str]) -> Dict[str, str]:
+        listen_key = secrets.token_hex(32)
+        self.listen_keys[listen_key] = self.exchange.now_ms() + LISTEN_KEY_TTL_MS
+        return {"listenKey": listen_key}
+
+    def _renew_listen_key(self, params: Dict[str, str]) -> Dict[str, Any]:
+        listen_key = params.get("listenKey", "")
+        if listen_key not in self.listen_keys:
+            raise SandboxError(-1125, "This listenKey does not exist.")
+        self.listen_keys[listen_key] = self.exchange.now_ms() + LISTEN_KEY_TTL_MS
+        return {}
+
+    def _close_listen_key(self, params: Dict[str, str]) -> Dict[str, Any]:
+        self.listen_keys.pop(params.get("listenKey", ""), None)
+        return {}
+
+    # --- websockets -------------------------------------------------------
+
+    async def _handle_stream(self, request: web.Request) -> web.WebSocketResponse:
+        name = request.match_info.get("name", "")
+        if name in self.listen_keys:
+            subscriber_args = ([], False, name)
+        elif request.path == "/stream":
+            streams = [s for s in request.query.get("streams", "").split("/") if s]
+            subscriber_args = (streams, True, None)
+        else:
+            subscriber_args = ([s for s in name.split("/") if s], False, None)
+
+        ws = web.WebSocketResponse(autoping=True)
+        await ws.prepare(request)
+        subscriber = _Subscriber(ws, *subscriber_args)
+        self.subscribers.add(subscriber)
+        writer = asyncio.create_task(subscriber.writer())
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.TEXT:
+                    self._on_ws_message(subscriber, message.data)
+                elif message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self.subscribers.discard(subscriber)
+            subscriber.queue.put_nowait(None)
+            await writer
+        return ws
+
+    def _on_ws_message(self, subscriber: _Subscriber, data: str):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        method, params = message.get("method"), message.get("params") or []
+        result = None
+        if method == "SUBSCRIBE":
+            subscriber.streams.update(params)
+        elif method == "UNSUBSCRIBE":
+            subscriber.streams.difference_update(params)
+        elif method == "LIST_SUBSCRIPTIONS":
+            result = sorted(subscriber.streams)
+        subscriber.queue.put_nowait({"result": result, "id": message.get("id")})
+
+    def _publish_user_event(self, event: dict):
+        for subscriber in self.subscribers:
+            if subscriber.listen_key is not None:
+                subscriber.push(subscriber.listen_key, event)
+
+    async def _market_loop(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                self._publish_market(self.exchange.step())
+                self._expire_listen_keys()
+            except Exception as e:
+                logger.exception(f"Sandbox market step failed: {e}")
+            await asyncio.sleep(max(0.0, self.tick_interval - (time.perf_counter() - started)))
+
+    def _publish_market(self, events: Dict[str, Dict[str, dict]]):
+        now = self.exchange.now_ms()
+        if now - self._last_mark_ms >= MARK_PRICE_INTERVAL_MS:
+            self._last_mark_ms = now
+            for symbol, market in self.exchange.markets.items():
+                events[symbol]["markPrice"] = market.mark_price_event(now, self.exchange.next_funding_time)
+
+        published = time.perf_counter()
+        for subscriber in self.subscribers:
+            if subscriber.listen_key is not None:
+                continue
+            for stream in subscriber.streams:
+                symbol, _, channel = stream.partition("@")
+                symbol_events = events.get(symbol.upper())
+                if symbol_events is None:
+                    continue
+                channel = channel.split("@")[0]
+                if channel.startswith("depth") and channel != "depth":
+                    # Partial book depth (<symbol>@depth5/10/20) is a snapshot of the top levels
+                    bids, asks = self.exchange.markets[symbol.upper()].depth(int(channel[5:] or 20))
+                    subscriber.push(stream, {**symbol_events["depth"], "b": bids, "a": asks})
+                elif channel in symbol_events:
+                    subscriber.push(stream, symbol_events[channel])
+        for symbol in events:
+            self._last_tick[symbol] = published
+
+    def _expire_listen_keys(self):
+        now = self.exchange.now_ms()
+        for listen_key, expires in list(self.listen_keys.items()):
+            if expires < now:
+                del self.listen_keys[listen_key]
+                for subscriber in self.subscribers:
+                    if subscriber.listen_key == listen_key:
+                        subscriber.push(listen_key, {"e": "listenKeyExpired", "E": now, "listenKey": listen_key})
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8700):
+        """Run until cancelled"""
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        logger.info(f"Sandbox exchange listening on http://{host}:{port} (ws://{host}:{port})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
@@ -1,14 +1,26 @@
 from loguru import logger
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
+import threading
 import time
 import random
 
 from octopus.config.settings import settings
-from octopus.exchange.aster_client import AsterExchangeClient
+from octopus.exchange.aster_client import PAIR_LEGS, AsterExchangeClient
+from octopus.exchange.market_stream import MarketStream
+from octopus.exchange.user_stream import UserStream
+from octopus.exchange.order_book import OrderBookManager
+from octopus.exchange.execution import SlicedExecutor
 from octopus.strategy.risk_manager import RiskManager
-from octopus.database.db import get_db
-from octopus.database.models import Trade, Position
+from octopus.strategy.order_reconciler import FillReconciler
+from octopus.strategy.hedge_monitor import HedgeMonitor
+from octopus.strategy.portfolio_risk import RiskAction
+from octopus.strategy.recovery import recover_strategy, save_checkpoint
+from octopus.database.journal import PositionClosed, PositionOpened, TradeRecord, journal
+from octopus.database.stats import get_stats
+from octopus.exchange.retry_policy import is_transient
+from octopus.utils.fixed_point import fixed_div, fixed_mul, from_fixed, to_fixed
+from octopus.utils.scheduler import MonotonicClock, Scheduler, Timer
 
 class DeltaNeutralStrategy:
     """
@@ -21,39 +33,322 @@ class DeltaNeutralStrategy:
     4. Target: $15K daily volume, $200K weekly holding time equivalent
     """
     
-    def __init__(self):
-        self.client = AsterExchangeClient()
+    def __init__(
+        self,
+        symbol: Optional[str] = None,
+        client: Optional[AsterExchangeClient] = None,
+        order_books: Optional[OrderBookManager] = None,
+        clock=None,
+        snapshot: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Without arguments the strategy trades trading_pairs[0] and starts its own
+        client and streams. StrategyRunner passes a symbol plus the client,
+        order books and /fapi/v2/account snapshot it shares between all symbols.
+        """
+        self.symbol = symbol or settings.trading_pairs[0]  # Start with BTCUSDT
         self.risk_manager = RiskManager()
-        self.symbol = settings.trading_pairs[0]  # Start with BTCUSDT
+        self.clock = clock or MonotonicClock()
+        self.market_stream: Optional[MarketStream] = None
+        self.user_stream: Optional[UserStream] = None
+        self.order_books = order_books
+        
+        if client is not None:
+            self.client = client
+        else:
+            self.client = AsterExchangeClient()
+            self._start_streams()
+            self._set_position_mode()
+        self.executor = SlicedExecutor(self.client, self.order_books)
+        self.hedge_monitor = HedgeMonitor(self.symbol, self.client, self.clock)
         
-        # Initialize leverage and position mode
         try:
             self.client.set_leverage(self.symbol, settings.leverage)
-            # Set position mode to hedge mode for delta-neutral trading
-            self.client.set_position_mode(True)  # True = hedge mode
-            logger.info(f"✅ Leverage set to {settings.leverage}x, position mode set to hedge")
+            logger.info(f"✅ {self.symbol} leverage set to {settings.leverage}x")
         except Exception as e:
-            logger.warning(f"Could not set leverage/position mode: {e}")
-            # Continue anyway - these might already be set
+            logger.warning(f"Could not set leverage: {e}")
+            # Continue anyway - it might already be set
+        
+        # Costs of earlier fills, and fills of orders whose response was lost (crash, timeout)
+        self.fill_reconciler = FillReconciler(self.client, self.symbol)
+        self._reconcile_fills()
         
         # Strategy state
         self.active_positions: Dict[str, Dict] = {}  # position_side -> position data
         self.last_rotation_time: Optional[datetime] = None
+        self.protective_order_ids: List[int] = []  # exchange-side stops of the current pair
+        self.halted = False  # set by a portfolio-wide stop; no new pairs are opened
+        
+        # Event-driven scheduling (see attach())
+        self.scheduler: Optional[Scheduler] = None
+        self._portfolio_risk = False  # a portfolio risk engine applies the stop-loss instead
+        self._rotation_timer: Optional[Timer] = None
+        self._cycle_lock = threading.Lock()
+        self._cycle_requested = False
+        self._last_risk_check = 0.0
+        
+        # Pick up where the last run left off instead of opening a second pair on top
+        self._recover(snapshot if snapshot is not None else self.client.get_account_snapshot())
+    
+    def _recover(self, snapshot: Dict[str, Any]):
+        """Restore positions, hold-time clocks and stops from the DB, checkpoint and exchange"""
+        state = recover_strategy(self.symbol, snapshot, self.clock.wall())
+        self.active_positions = state.active_positions
+        self.protective_order_ids = list(state.protective_order_ids)
+        self.halted = state.halted and not settings.clear_halt_on_start
+        if state.halted:
+            if self.halted:
+                logger.critical(
+                    f"{self.symbol} is halted by a portfolio limit from an earlier run; "
+                    "no new pairs until restarted with CLEAR_HALT_ON_START=true"
+                )
+            else:
+                logger.warning(f"{self.symbol}: cleared the portfolio halt from an earlier run")
+        if state.active_positions:
+            logger.info(
+                f"♻️ Recovered {self.symbol}: {', '.join(state.active_positions)} legs open"
+                + (f", {len(state.untracked)} untracked" if state.untracked else "")
+            )
+        if state.stale:
+            logger.warning(f"{self.symbol}: closed stale position rows for flat legs {state.stale}")
+        for side in state.orphaned:
+            logger.critical(f"{self.symbol}: orphaned {side} leg without its hedge")
+            if settings.close_orphaned_legs:
+                self._close_orphaned_leg(side)
+        self._checkpoint()
+    
+    def _close_orphaned_leg(self, position_side: str):
+        try:
+            self._close_and_record(position_side)
+        except Exception as e:
+            logger.error(f"Failed to close orphaned {self.symbol} {position_side} leg: {e}")
+    
+    def _close_and_record(self, position_side: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Close one leg, or the whole pair when `position_side` is None, and record it.
+        
+        Every close goes through here: the pair's protective stops are canceled
+        first, then the fills are journaled as trades, the legs' Position rows
+        are closed and the state is checkpointed. Returns {position_side: order}.
+        """
+        try:
+            self._cancel_protective_orders()
+        except Exception as e:
+            # Stops left behind would act on the next pair; opening a pair cancels them again
+            logger.warning(f"Failed to cancel {self.symbol} protective orders before closing: {e}")
+        if position_side is None:
+            results = self.executor.close_pair(self.symbol)
+            sides = [side for side in PAIR_LEGS if side in results or side in self.active_positions]
+        else:
+            result = self.client.close_position(self.symbol, position_side)
+            results = {position_side: result} if result else {}
+            sides = [position_side]
+        
+        # Realized PnL arrives with the fills (see FillReconciler)
+        closed_at = self.clock.wall()
+        records = self._trade_records(results, closed_at)
+        for side in sides:
+            avg_price = results.get(side, {}).get('avgPrice')
+            records.append(PositionClosed(
+                closed_at=closed_at,
+                symbol=self.symbol,
+                position_side=side,
+                exit_price=to_fixed(avg_price) if avg_price else None  # None: the leg was already flat
+            ))
+            self.active_positions.pop(side, None)
+            logger.info(f"Closed {self.symbol} {side} position")
+        journal.submit(*records)
+        self._checkpoint()
+        return results
+    
+    def _checkpoint(self):
+        """Persist the state a restart needs; one row per symbol, overwritten"""
+        try:
+            save_checkpoint(
+                self.symbol, self.active_positions, self.protective_order_ids, self.halted, self.clock.wall()
+            )
+        except Exception as e:
+            logger.error(f"Failed to checkpoint {self.symbol}: {e}")
+    
+    def _start_streams(self):
+        # Stream market data so prices are read from memory instead of REST
+        if settings.market_stream_enabled:
+            self.market_stream = MarketStream([self.symbol])
+            self.client.market_cache = self.market_stream.cache
+            if settings.order_book_enabled:
+                self.order_books = OrderBookManager(self.client, self.market_stream.cache, [self.symbol])
+            self.market_stream.start()
+        
+        # Track positions/balances from the user data stream instead of polling positionRisk
+        if settings.user_stream_enabled:
+            try:
+                self.user_stream = UserStream(self.client)
+                self.client.account_state = self.user_stream.state
+                self.user_stream.start()
+            except Exception as e:
+                logger.warning(f"Could not start user data stream, polling REST instead: {e}")
+                self.user_stream = None
+                self.client.account_state = None
+    
+    def _set_position_mode(self):
+        try:
+            # Set position mode to hedge mode for delta-neutral trading
+            self.client.set_position_mode(True)  # True = hedge mode
+            logger.info("✅ Position mode set to hedge")
+        except Exception as e:
+            logger.warning(f"Could not set position mode: {e}")
+            # Continue anyway - it might already be set
+    
+    def attach(self, scheduler: Scheduler, portfolio_risk: bool = False):
+        """
+        Drive this strategy from a scheduler instead of a polling loop.
+        
+        Registers a fixed-rate cycle every `cycle_interval_sec`, a deadline for
+        the next rotation, and stream callbacks: position changes trigger a
+        cycle right away and mark price ticks trigger a local risk check (unless
+        a portfolio risk engine sends this strategy its actions instead).
+        """
+        self.scheduler = scheduler
+        self._portfolio_risk = portfolio_risk
+        scheduler.every(settings.cycle_interval_sec, self.trigger_cycle, name=f"{self.symbol} cycle")
+        if settings.checkpoint_interval_sec > 0:
+            scheduler.every(
+                settings.checkpoint_interval_sec, self._checkpoint,
+                name=f"{self.symbol} checkpoint", delay=settings.checkpoint_interval_sec
+            )
+        opened = [p['opened_at'] for p in self.active_positions.values() if p.get('is_active')]
+        if opened:
+            self._schedule_rotation(min(opened))
+        if self.client.market_cache is not None and not portfolio_risk:
+            self.client.market_cache.add_listener('markPriceUpdate', self._on_mark_price)
+        if self.client.account_state is not None:
+            self.client.account_state.add_listener('ACCOUNT_UPDATE', self._on_account_update)
+    
+    def trigger_cycle(self):
+        """Run a cycle now; if one is already running, run another right after it"""
+        if not self._cycle_lock.acquire(blocking=False):
+            self._cycle_requested = True
+            return
+        try:
+            while True:
+                self._cycle_requested = False
+                try:
+                    self.run_cycle()
+                except Exception as e:
+                    self._schedule_retry(e)
+                    return
+                if not self._cycle_requested:
+                    return
+        finally:
+            self._cycle_lock.release()
+    
+    def _schedule_retry(self, error: Exception):
+        # Transient errors already got in-process retries; try again soon rather than next period
+        delay = 5 if is_transient(error) else 60
+        logger.info(f"{self.symbol}: retrying cycle in {delay} seconds")
+        self.scheduler.call_later(delay, self.trigger_cycle, name=f"{self.symbol} retry")
+    
+    def _schedule_rotation(self, opened_at: datetime):
+        """Wake up exactly when the hold time is over"""
+        if self.scheduler is None:
+            return
+        if self._rotation_timer is not None:
+            self._rotation_timer.cancel()
+        remaining = settings.position_hold_time_min * 60 - (self.clock.wall() - opened_at).total_seconds()
+        self._rotation_timer = self.scheduler.call_later(
+            max(0.0, remaining) + 1, self.trigger_cycle, name=f"{self.symbol} rotation"
+        )
+    
+    def _on_account_update(self, event: dict):
+        # Called on the user stream thread: hand over to the scheduler
+        if any(pos['s'] == self.symbol for pos in event.get('a', {}).get('P', [])):
+            # Timed here rather than on the scheduler so time-to-hedge isn't skewed by a busy cycle
+            imbalance = self.hedge_monitor.observe(self.client.account_state.position_risk(self.symbol))
+            if imbalance and settings.hedge_repair_enabled:
+                self.scheduler.call_later(
+                    settings.hedge_repair_delay_sec, self._check_hedge, name=f"{self.symbol} hedge check"
+                )
+            self.scheduler.post(self.trigger_cycle, name=f"{self.symbol} position change")
+    
+    def _check_hedge(self):
+        # Waits for a running cycle: a pair being opened is one-legged until both fills are reported
+        with self._cycle_lock:
+            self._repair_hedge()
+    
+    def _repair_hedge(self, positions: Optional[List[Dict]] = None):
+        """Top up or reduce a leg when LONG and SHORT have drifted apart by a lot step or more"""
+        try:
+            if settings.hedge_repair_enabled:
+                self.hedge_monitor.repair(positions)
+            else:
+                self.hedge_monitor.observe(positions)
+        except Exception as e:
+            logger.error(f"Hedge repair failed for {self.symbol}: {e}")
+    
+    def _on_mark_price(self, event: dict):
+        # Called on the market stream thread; throttled, and only while positions are tracked locally
+        if event.get('s') != self.symbol or not self.active_positions:
+            return
+        account_state = self.client.account_state
+        if account_state is None or not account_state.is_synced:
+            return
+        now = self.clock.now()
+        if now - self._last_risk_check < settings.risk_check_interval_sec:
+            return
+        self._last_risk_check = now
+        self.scheduler.post(self._check_risk, name=f"{self.symbol} risk check")
+    
+    def handle_risk_action(self, action: RiskAction, still_required: Optional[Callable[[], bool]] = None):
+        """
+        Carry out an action from the portfolio risk engine.
+        
+        `still_required` is re-checked once no cycle is running: a pair being
+        opened looks one-legged until both fills are reported.
+        """
+        if action.kind == "ALERT":
+            logger.warning(f"⚠️ {self.symbol} {action.reason}: {action.value:.4f}")
+            return
+        with self._cycle_lock:
+            if still_required is not None and not still_required():
+                return
+            logger.warning(f"Risk action {action.kind} on {self.symbol} ({action.reason} {action.value:.2f})")
+            if action.kind == "CLOSE_ALL":
+                self.halted = True
+                logger.critical(f"{self.symbol} halted by portfolio limit: {action.reason}")
+            self._close_and_record()
+    
+    def _check_risk(self):
+        """
+        Risk check between cycles from local positions: the user stream's, or
+        the backtest exchange's. Skipped rather than polling REST when the
+        stream has gone out of sync; the next cycle checks instead.
+        """
+        account_state = self.client.account_state
+        if account_state is not None and not account_state.is_synced:
+            return
+        if not self._cycle_lock.acquire(blocking=False):
+            return  # a cycle is running and checks risk itself
+        try:
+            self._check_and_close_risky_positions(self.client.get_position_risk(symbol=self.symbol))
+        finally:
+            self._cycle_lock.release()
     
     def run_cycle(self):
         """
-        Main strategy loop - call this periodically (e.g., every 10 minutes)
+        Main strategy loop - run from a Scheduler via attach(), or call periodically
         """
         logger.info("=" * 50)
-        logger.info("Running strategy cycle...")
+        logger.info(f"Running {self.symbol} strategy cycle...")
         
         try:
             # Step 1: Check current positions
             positions = self.client.get_position_risk(symbol=self.symbol)
             self._update_active_positions(positions)
+            self._repair_hedge(positions)
             
-            # Step 2: Risk check - close if needed
-            self._check_and_close_risky_positions(positions)
+            # Step 2: Risk check - close if needed (the portfolio engine checks the pair's net PnL)
+            if not self._portfolio_risk:
+                self._check_and_close_risky_positions(positions)
             
             # Step 3: Decide action based on state
             if self._should_open_new_positions():
@@ -64,7 +359,8 @@ class DeltaNeutralStrategy:
                 logger.info("Holding current positions...")
                 self._log_position_status()
             
-            # Step 4: Log stats
+            # Step 4: Pull commission, realized PnL and funding, then log stats
+            self._reconcile_fills()
             self._log_daily_stats()
             
         except Exception as e:
@@ -73,6 +369,9 @@ class DeltaNeutralStrategy:
     
     def _should_open_new_positions(self) -> bool:
         """Check if we should open new delta-neutral positions"""
+        if self.halted:
+            return False
+        
         # No active positions
         if not self.active_positions or all(
             not pos.get('is_active', False) for pos in self.active_positions.values()
@@ -95,7 +394,7 @@ class DeltaNeutralStrategy:
             if not opened_at:
                 continue
             
-            hold_time = datetime.utcnow() - opened_at
+            hold_time = self.clock.wall() - opened_at
             if hold_time.total_seconds() / 60 < settings.position_hold_time_min:
                 logger.info(f"Position {position_side} held for {hold_time.total_seconds()/60:.1f} min, need {settings.position_hold_time_min} min")
                 return False
@@ -112,66 +411,66 @@ class DeltaNeutralStrategy:
         price = self.client.get_mark_price(self.symbol)
         
         # Calculate position size
-        quantity = self.risk_manager.calculate_position_size(price)
+        filters = self.client.get_symbol_filters(self.symbol)
+        quantity = self.risk_manager.calculate_position_size(price, filters)
         
         # Add slight randomization (±5%) to avoid wash trading detection
-        quantity = quantity * random.uniform(0.95, 1.05)
-        quantity = round(quantity, 3)
+        quantity = filters.quantize_qty(quantity * random.uniform(0.95, 1.05))
+        if not quantity or not filters.meets_min_notional(quantity, price):
+            logger.warning(f"Position size for {self.symbol} is below the exchange minimum, not opening")
+            return
+        
+        self._log_expected_slippage(quantity)
+        
+        # Leftovers of a pair closed by its stops would otherwise act on the new pair
+        self._cancel_protective_orders()
         
         try:
-            # Open LONG position
-            long_order = self.client.place_market_order(
-                symbol=self.symbol,
-                side="BUY",
-                quantity=quantity,
-                position_side="LONG"
-            )
+            # Both legs go out in one batch request per slice, so the hedge gap is a single round trip
+            orders = self.executor.open_pair(self.symbol, quantity)
             
-            # Small delay to appear natural
-            time.sleep(random.uniform(2, 5))
+            # Record in database (written behind by the journal, off the order path)
+            opened_at = self.clock.wall()
+            legs: Dict[str, Dict[str, int]] = {}
+            records = self._trade_records(orders, opened_at)
+            for trade in records:
+                leg = legs.setdefault(trade.position_side, {"quantity": 0, "notional": 0})
+                leg["quantity"] += trade.quantity
+                leg["notional"] += trade.notional
+            entry_prices = {pos_side: fixed_div(leg["notional"], leg["quantity"]) for pos_side, leg in legs.items()}
             
-            # Open SHORT position
-            short_order = self.client.place_market_order(
-                symbol=self.symbol,
-                side="SELL",
-                quantity=quantity,
-                position_side="SHORT"
-            )
-            
-            # Record in database
-            opened_at = datetime.utcnow()
-            with get_db() as db:
-                for order, pos_side in [(long_order, "LONG"), (short_order, "SHORT")]:
-                    trade = Trade(
-                        symbol=self.symbol,
-                        side=order['side'],
-                        position_side=pos_side,
-                        quantity=float(order['executedQty']),
-                        price=float(order['avgPrice']),
-                        notional=float(order['executedQty']) * float(order['avgPrice']),
-                        order_id=str(order['orderId']),
-                        commission=float(order.get('commission', 0))
-                    )
-                    db.add(trade)
-                    
-                    position = Position(
-                        symbol=self.symbol,
-                        position_side=pos_side,
-                        entry_price=float(order['avgPrice']),
-                        quantity=float(order['executedQty']),
-                        leverage=settings.leverage,
-                        notional=float(order['executedQty']) * float(order['avgPrice']),
-                        is_active=True
-                    )
-                    db.add(position)
+            for pos_side, leg in legs.items():
+                records.append(PositionOpened(
+                    opened_at=opened_at,
+                    symbol=self.symbol,
+                    position_side=pos_side,
+                    entry_price=entry_prices[pos_side],
+                    quantity=leg["quantity"],
+                    leverage=settings.leverage,
+                    notional=leg["notional"]
+                ))
+            journal.submit(*records)
             
             # Update state
             self.active_positions = {
-                "LONG": {"opened_at": opened_at, "is_active": True, "entry_price": float(long_order['avgPrice'])},
-                "SHORT": {"opened_at": opened_at, "is_active": True, "entry_price": float(short_order['avgPrice'])}
+                pos_side: {
+                    "opened_at": opened_at,
+                    "is_active": True,
+                    "entry_price": from_fixed(entry_price)
+                }
+                for pos_side, entry_price in entry_prices.items()
             }
             
-            logger.success(f"✅ Delta-neutral pair opened: {quantity} BTC @ ${price}")
+            self._schedule_rotation(opened_at)
+            
+            if settings.protective_orders_enabled:
+                self._place_protective_orders({
+                    pos_side: from_fixed(entry_price)
+                    for pos_side, entry_price in entry_prices.items() if entry_price
+                })
+            self._checkpoint()
+            
+            logger.success(f"✅ Delta-neutral pair opened: {quantity} {self.symbol} @ ${price}")
             
         except Exception as e:
             logger.error(f"Failed to open positions: {e}")
@@ -182,52 +481,88 @@ class DeltaNeutralStrategy:
         logger.info("Rotating positions...")
         
         try:
-            # Close existing positions
-            for position_side in ["LONG", "SHORT"]:
-                close_result = self.client.close_position(self.symbol, position_side)
-                if close_result:
-                    logger.info(f"Closed {position_side} position")
-                    
-                    # Record in database
-                    with get_db() as db:
-                        position = db.query(Position).filter(
-                            Position.symbol == self.symbol,
-                            Position.position_side == position_side,
-                            Position.is_active == True
-                        ).first()
-                        
-                        if position:
-                            position.is_active = False
-                            position.closed_at = datetime.utcnow()
-                            position.exit_price = float(close_result.get('avgPrice', 0))
-                            position.hold_time_minutes = int(
-                                (position.closed_at - position.opened_at).total_seconds() / 60
-                            )
-                            position.realized_pnl = float(close_result.get('realizedPnl', 0))
-            
-            # Small delay
-            time.sleep(random.uniform(5, 10))
+            # Close both legs in one batch request per slice
+            self._close_and_record()
             
-            # Open new positions
-            self.active_positions = {}
+            # Small delay, then open new positions
+            delay = random.uniform(5, 10)
+            if self.scheduler is not None:
+                self.scheduler.call_later(delay, self.trigger_cycle, name=f"{self.symbol} reopen")
+                return
+            time.sleep(delay)
             self._open_delta_neutral_pair()
             
         except Exception as e:
             logger.error(f"Rotation failed: {e}")
             raise
     
+    def _trade_records(self, orders: Dict[str, Dict[str, Any]], timestamp: datetime) -> List[TradeRecord]:
+        """Trade rows for filled orders; commission and realized PnL are added by the FillReconciler"""
+        records = []
+        for order in orders.values():
+            executed_qty = to_fixed(order.get('executedQty', 0))
+            if not executed_qty:
+                continue
+            avg_price = to_fixed(order.get('avgPrice') or 0)
+            records.append(TradeRecord(
+                timestamp=timestamp,
+                symbol=self.symbol,
+                side=order['side'],
+                position_side=order['positionSide'],
+                quantity=executed_qty,
+                price=avg_price,
+                notional=to_fixed(order['cumQuote']) if order.get('cumQuote') else fixed_mul(executed_qty, avg_price),
+                order_id=str(order['orderId']),
+                client_order_id=order.get('clientOrderId')
+            ))
+        return records
+    
+    def _reconcile_fills(self):
+        if not settings.fill_reconcile_enabled:
+            return
+        try:
+            # Rows the journal still holds would look like unrecorded orders
+            journal.flush()
+            self.fill_reconciler.run()
+        except Exception as e:
+            logger.warning(f"Fill reconciliation failed for {self.symbol}: {e}")
+    
+    def _place_protective_orders(self, entry_prices: Dict[str, float]):
+        """Put stop/take-profit orders on the exchange so the pair is protected between cycles"""
+        try:
+            results = self.client.place_protective_orders(
+                self.symbol,
+                entry_prices,
+                stop_pct=settings.protective_stop_pct,
+                take_profit_pct=settings.protective_take_profit_pct
+            )
+        except Exception as e:
+            logger.error(f"Failed to place protective orders for {self.symbol}: {e}")
+            return
+        self.protective_order_ids = [r['orderId'] for r in results if 'orderId' in r]
+        if len(self.protective_order_ids) < len(results):
+            logger.warning(f"Only {len(self.protective_order_ids)}/{len(results)} protective orders placed for {self.symbol}")
+    
+    def _cancel_protective_orders(self):
+        if not self.protective_order_ids:
+            return
+        try:
+            self.client.cancel_orders(self.symbol, self.protective_order_ids)
+            self.protective_order_ids = []
+        except Exception as e:
+            logger.error(f"Failed to cancel protective orders for {self.symbol}: {e}")
+            raise
+    
     def _check_and_close_risky_positions(self, positions: List[Dict]):
-        """Close positions that exceed risk limits"""
+        """Close the pair when either leg exceeds risk limits; closing one leg would leave the other naked"""
         for pos in positions:
             if float(pos['positionAmt']) == 0:
                 continue
             
             if self.risk_manager.should_close_position(pos):
-                logger.warning(f"Closing risky position: {pos['positionSide']}")
-                self.client.close_position(self.symbol, pos['positionSide'])
-                
-                if pos['positionSide'] in self.active_positions:
-                    self.active_positions[pos['positionSide']]['is_active'] = False
+                logger.warning(f"Closing {self.symbol} pair: {pos['positionSide']} leg exceeds risk limits")
+                self._close_and_record()
+                return
     
     def _update_active_positions(self, positions: List[Dict]):
         """Update internal state from exchange positions"""
@@ -236,25 +571,30 @@ class DeltaNeutralStrategy:
                 if pos['positionSide'] in self.active_positions:
                     self.active_positions[pos['positionSide']]['is_active'] = False
     
+    def _log_expected_slippage(self, quantity: float):
+        """Log the slippage both legs are expected to pay, from the local order book"""
+        book = self.order_books.get(self.symbol) if self.order_books else None
+        if book is None:
+            return
+        buy_bps = book.estimate_slippage_bps("BUY", quantity)
+        sell_bps = book.estimate_slippage_bps("SELL", quantity)
+        if buy_bps is not None and sell_bps is not None:
+            logger.info(f"Expected slippage for {quantity}: BUY {buy_bps:.2f} bps | SELL {sell_bps:.2f} bps")
+    
     def _log_position_status(self):
         """Log current position status"""
         for pos_side, data in self.active_positions.items():
             if data.get('is_active'):
                 opened_at = data.get('opened_at')
                 if opened_at:
-                    hold_time = (datetime.utcnow() - opened_at).total_seconds() / 60
+                    hold_time = (self.clock.wall() - opened_at).total_seconds() / 60
                     logger.info(f"Position {pos_side}: held for {hold_time:.1f} minutes")
     
     def _log_daily_stats(self):
         """Log daily trading statistics"""
-        with get_db() as db:
-            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            trades_today = db.query(Trade).filter(Trade.timestamp >= today_start).all()
-            
-            total_volume = sum(t.notional for t in trades_today)
-            total_pnl = sum(t.realized_pnl for t in trades_today)
-            total_fees = sum(t.commission for t in trades_today)
-            
-            logger.info(f"📊 Today's Stats: Volume=${total_volume:.2f} | PnL=${total_pnl:.2f} | Fees=${total_fees:.2f}")
+        today = get_stats(self.symbol, self.clock.wall())["today"]
+        logger.info(
+            f"📊 {self.symbol} Today's Stats: Volume=${today.volume:.2f} | PnL=${today.realized_pnl:.2f} | "
+            f"Fees=${today.fees:.2f}"
+        )
 
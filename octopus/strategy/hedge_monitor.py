@@ -0,0 +1,144 @@
+from loguru import logger
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+import threading
+
+from octopus.config.settings import settings
+from octopus.database.journal import HedgeWindow, TradeRecord, journal
+from octopus.exchange.aster_client import PAIR_LEGS, new_client_order_id
+from octopus.utils.fixed_point import FIXED_DECIMALS, fixed_mul, format_units, from_fixed, to_fixed
+
+
+class HedgeMonitor:
+    """
+    Watches that a symbol's LONG and SHORT legs hold the same quantity.
+
+    `observe()` is fed every position change (ACCOUNT_UPDATE fills, cycle
+    position reads). An imbalance of at least one lot step opens a window that
+    closes once the legs match again; each window is stored as a
+    HedgeImbalance row, so pair opens give their time-to-hedge and naked legs
+    show how long they were exposed. `repair()` corrects an imbalance that has
+    outlasted hedge_repair_delay_sec: it tops up the smaller leg, or reduces
+    the larger one when the smaller leg is flat or the top-up would be below
+    the minimum notional.
+    """
+
+    def __init__(self, symbol: str, client, clock):
+        self.symbol = symbol
+        self.client = client
+        self.clock = clock
+        self.imbalanced_since: Optional[float] = None
+        self.max_imbalance = 0  # fixed point
+        self.correction: Optional[str] = None
+        self._started_at = None
+        self._repair_due = 0.0  # clock.now() before which the window is left alone
+        self._lock = threading.Lock()
+
+    def observe(self, positions: Optional[List[Dict[str, Any]]] = None) -> float:
+        """
+        Update the imbalance window from current positions.
+
+        Returns the signed tradable imbalance (LONG minus SHORT, in whole lot
+        steps), 0.0 when the legs are hedged.
+        """
+        held = self._held(positions)
+        imbalance = held["LONG"] - held["SHORT"]
+        filters = self.client.get_symbol_filters(self.symbol)
+        tradable = filters.quantize_qty(format_units(abs(imbalance), FIXED_DECIMALS))
+        with self._lock:
+            now = self.clock.now()
+            if tradable:
+                if self.imbalanced_since is None:
+                    self.imbalanced_since = now
+                    self._started_at = self.clock.wall()
+                    self.max_imbalance = 0
+                    self.correction = None
+                    self._repair_due = now + settings.hedge_repair_delay_sec
+                self.max_imbalance = max(self.max_imbalance, abs(imbalance))
+                return tradable if imbalance > 0 else -tradable
+            if self.imbalanced_since is not None:
+                self._close_window(now - self.imbalanced_since)
+            return 0.0
+
+    def repair(self, positions: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """Place the order that restores the hedge, if the imbalance is due for repair"""
+        if positions is None:
+            positions = self.client.get_position_risk(symbol=self.symbol)
+        imbalance = self.observe(positions)
+        if not imbalance or self.clock.now() < self._repair_due:
+            return None
+
+        held = self._held(positions)
+        quantity = abs(imbalance)
+        larger, smaller = ("LONG", "SHORT") if imbalance > 0 else ("SHORT", "LONG")
+        price = self.client.get_mark_price(self.symbol)
+        filters = self.client.get_symbol_filters(self.symbol)
+        if held[smaller] > 0 and filters.meets_min_notional(quantity, price):
+            action, position_side, side, reduce_only = "TOP_UP", smaller, PAIR_LEGS[smaller][0], False
+        else:
+            action, position_side, side, reduce_only = "REDUCE", larger, PAIR_LEGS[larger][1], True
+
+        logger.warning(
+            f"⚖️ {self.symbol} legs unbalanced for {self.clock.now() - self.imbalanced_since:.1f}s "
+            f"(LONG {from_fixed(held['LONG'])} / SHORT {from_fixed(held['SHORT'])}): {action} {position_side} {quantity}"
+        )
+        order = self.client.place_market_order(
+            symbol=self.symbol,
+            side=side,
+            quantity=quantity,
+            position_side=position_side,
+            reduce_only=reduce_only,
+            client_order_id=new_client_order_id(position_side[0] + action[0])
+        )
+        self.correction = f"{action} {position_side} {quantity}"
+        # Positions from the stream lag the fill; don't correct the same gap twice
+        self._repair_due = self.clock.now() + settings.hedge_repair_delay_sec
+        self._record_trade(order)
+        return order
+
+    def _held(self, positions: Optional[List[Dict[str, Any]]]) -> Dict[str, int]:
+        """Quantity held per leg, in fixed point"""
+        if positions is None:
+            positions = self.client.get_position_risk(symbol=self.symbol)
+        held = {"LONG": 0, "SHORT": 0}
+        for pos in positions:
+            if pos['symbol'] == self.symbol and pos['positionSide'] in held:
+                held[pos['positionSide']] = abs(to_fixed(pos['positionAmt']))
+        return held
+
+    def _close_window(self, duration: float):
+        """Record a finished imbalance window (called with the lock held)"""
+        if self.correction or duration > settings.hedge_repair_delay_sec:
+            logger.info(f"⚖️ {self.symbol} legs hedged again after {duration:.2f}s (max gap {from_fixed(self.max_imbalance)})")
+        else:
+            logger.debug(f"{self.symbol} time to hedge: {duration * 1000:.0f} ms")
+        try:
+            journal.submit(HedgeWindow(
+                symbol=self.symbol,
+                started_at=self._started_at,
+                ended_at=self._started_at + timedelta(seconds=duration),
+                duration_sec=duration,
+                max_imbalance=self.max_imbalance,
+                correction=self.correction
+            ))
+        except Exception as e:
+            logger.error(f"Failed to record hedge imbalance for {self.symbol}: {e}")
+        self.imbalanced_since = None
+        self.correction = None
+
+    def _record_trade(self, order: Dict[str, Any]):
+        executed_qty = to_fixed(order.get('executedQty', 0))
+        if not executed_qty:
+            return
+        avg_price = to_fixed(order.get('avgPrice') or 0)
+        journal.submit(TradeRecord(
+            timestamp=self.clock.wall(),
+            symbol=self.symbol,
+            side=order['side'],
+            position_side=order['positionSide'],
+            quantity=executed_qty,
+            price=avg_price,
+            notional=to_fixed(order['cumQuote']) if order.get('cumQuote') else fixed_mul(executed_qty, avg_price),
+            order_id=str(order['orderId']),
+            client_order_id=order.get('clientOrderId')
+        ))
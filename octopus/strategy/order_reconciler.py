@@ -0,0 +1,230 @@
+from loguru import logger
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+import time
+
+from octopus.database.db import get_db
+from octopus.database.journal import TradeRecord, apply_events
+from octopus.database.models import Position, SyncCursor, Trade
+from octopus.database.stats import add_fill_costs, add_funding, apply_deltas, new_deltas
+from octopus.exchange.aster_client import CLIENT_ORDER_ID_PREFIX
+from octopus.exchange.execution import parent_client_order_id
+from octopus.utils.fixed_point import fixed_div, fixed_mul, to_fixed
+
+PAGE_LIMIT = 1000
+FIRST_RUN_LOOKBACK_HOURS = 24  # how far back a symbol without cursors starts
+
+
+class ReconcileResult(NamedTuple):
+    fills: int = 0           # new fills read
+    updated: int = 0         # trade rows whose commission/PnL were added to
+    inserted: int = 0        # filled orders of ours that had no trade row
+    funding: int = 0         # funding payments recorded
+
+
+def _utc(time_ms: int) -> datetime:
+    return datetime.fromtimestamp(int(time_ms) / 1000, timezone.utc).replace(tzinfo=None)
+
+
+class FillReconciler:
+    """
+    Brings commission, realized PnL and funding in from the exchange.
+
+    Order responses carry neither commission nor realized PnL, so trades are
+    recorded without them. Each run reads only what is new since the last
+    one: fills (userTrades) after the stored trade id and FUNDING_FEE income
+    after the stored time. Fills are summed per order and added to that
+    order's trade row, or to the row of its parent client order id for the
+    slices of a sliced order; filled orders of ours with no row at all (lost
+    responses) are inserted from their fills. Realized PnL is also added to
+    the position it closed, and funding is split between the legs open when
+    it settled. Cursors, rows and DailyStats deltas commit in one transaction,
+    so a fill is never lost or counted twice. REALIZED_PNL and COMMISSION
+    income entries duplicate the fills one for one and are not read.
+    """
+
+    def __init__(self, client, symbol: str):
+        self.client = client
+        self.symbol = symbol
+        self.fills_cursor = f"userTrades:{symbol}"
+        self.funding_cursor = f"income:FUNDING_FEE:{symbol}"
+
+    def run(self) -> ReconcileResult:
+        with get_db() as db:
+            cursors = {
+                c.name: (c.last_id or 0, c.last_time or 0)
+                for c in db.query(SyncCursor).filter(SyncCursor.name.in_([self.fills_cursor, self.funding_cursor]))
+            }
+        since = int((time.time() - FIRST_RUN_LOOKBACK_HOURS * 3600) * 1000)
+        fills = self._fetch_fills(cursors.get(self.fills_cursor), since)
+        funding = self._fetch_funding(cursors.get(self.funding_cursor), since)
+        if not fills and not funding:
+            return ReconcileResult()
+
+        orders = self._group_fills(fills)
+        with get_db() as db:
+            rows = {
+                row.order_id: row
+                for row in db.query(Trade).filter(Trade.order_id.in_(list(orders)))
+            }
+            unknown = [order_id for order_id in orders if order_id not in rows]
+            if unknown:
+                rows.update(self._match_unknown(db, unknown, min(orders[o]["time"] for o in unknown)))
+
+            deltas = new_deltas()
+            inserts: List[TradeRecord] = []
+            updated = 0
+            for order_id, order in orders.items():
+                row = rows.get(order_id)
+                if isinstance(row, Trade):
+                    row.commission = (row.commission or 0) + order["commission"]
+                    row.realized_pnl = (row.realized_pnl or 0) + order["realized_pnl"]
+                    add_fill_costs(deltas, self.symbol, _utc(order["time"]), order["realized_pnl"], order["commission"])
+                    updated += 1
+                elif isinstance(row, str):
+                    inserts.append(self._trade_record(order_id, row, order))
+                if order["realized_pnl"]:
+                    self._add_position_pnl(db, order)
+
+            for entry in funding:
+                self._add_funding(db, entry)
+                add_funding(deltas, self.symbol, _utc(entry['time']), to_fixed(entry['income']))
+
+            if fills:
+                self._save_cursor(db, self.fills_cursor, fills[-1]['id'], fills[-1]['time'])
+            if funding:
+                self._save_cursor(db, self.funding_cursor, funding[-1]['tranId'], funding[-1]['time'])
+            apply_deltas(db, deltas)
+            apply_events(db, inserts)
+
+        if inserts:
+            logger.warning(f"Reconciled {len(inserts)} unrecorded {self.symbol} orders from the exchange")
+        result = ReconcileResult(len(fills), updated, len(inserts), len(funding))
+        logger.debug(f"{self.symbol} reconciled: {result}")
+        return result
+
+    # --- exchange reads ---------------------------------------------------
+
+    def _fetch_fills(self, cursor: Optional[tuple], since: int) -> List[Dict[str, Any]]:
+        """userTrades after the cursor's trade id (or since `since` on the first run), oldest first"""
+        params = {"fromId": cursor[0] + 1} if cursor else {"startTime": since}
+        fills = []
+        while True:
+            page = self.client.get_account_trades(self.symbol, limit=PAGE_LIMIT, **params)
+            fills += page
+            if len(page) < PAGE_LIMIT:
+                return fills
+            params = {"fromId": int(page[-1]['id']) + 1}
+
+    def _fetch_funding(self, cursor: Optional[tuple], since: int) -> List[Dict[str, Any]]:
+        """FUNDING_FEE income after the cursor (time, tranId), oldest first"""
+        last = (cursor[1], cursor[0]) if cursor else (since, 0)
+        start = last[0]
+        entries = []
+        while True:
+            page = self.client.get_income_history(
+                symbol=self.symbol, incomeType="FUNDING_FEE", startTime=start, limit=PAGE_LIMIT
+            )
+            # startTime is inclusive; entries at the cursor's millisecond were already read
+            entries += [e for e in page if (int(e['time']), int(e['tranId'])) > last]
+            if len(page) < PAGE_LIMIT or int(page[-1]['time']) == start:
+                return entries
+            start = int(page[-1]['time'])
+
+    def _match_unknown(self, db, order_ids: List[str], since_ms: int) -> Dict[str, Any]:
+        """
+        Resolve fills of orders without a trade row through their client order
+        id: slices map to their parent's row (Trade), unrecorded orders of ours
+        to their client order id (str). Orders not sent by us are left out.
+        """
+        client_ids: Dict[str, str] = {}
+        for order in self.client.get_all_orders(self.symbol, startTime=since_ms - 60_000, limit=PAGE_LIMIT):
+            if str(order['orderId']) in order_ids:
+                client_ids[str(order['orderId'])] = order.get('clientOrderId', '')
+        parents = {
+            row.client_order_id: row
+            for row in db.query(Trade).filter(
+                Trade.client_order_id.in_([parent_client_order_id(cid) for cid in client_ids.values()])
+            )
+        }
+        matched: Dict[str, Any] = {}
+        for order_id, cid in client_ids.items():
+            parent = parents.get(parent_client_order_id(cid))
+            if parent is not None:
+                matched[order_id] = parent
+            elif cid.startswith(CLIENT_ORDER_ID_PREFIX):
+                matched[order_id] = cid
+        return matched
+
+    # --- writes -----------------------------------------------------------
+
+    @staticmethod
+    def _group_fills(fills: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Fills summed per order id; amounts in fixed point, so the sums are exact"""
+        orders: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+            "quantity": 0, "quote": 0, "commission": 0, "realized_pnl": 0
+        })
+        for fill in fills:
+            order = orders[str(fill['orderId'])]
+            quantity = to_fixed(fill['qty'])
+            order["quantity"] += quantity
+            if fill.get('quoteQty'):
+                order["quote"] += to_fixed(fill['quoteQty'])
+            else:
+                order["quote"] += fixed_mul(quantity, to_fixed(fill['price']))
+            order["commission"] += to_fixed(fill.get('commission', '0'))
+            order["realized_pnl"] += to_fixed(fill.get('realizedPnl', '0'))
+            order["side"] = fill['side']
+            order["position_side"] = fill.get('positionSide', 'BOTH')
+            order["time"] = int(fill['time'])
+        return dict(orders)
+
+    def _trade_record(self, order_id: str, client_order_id: str, order: Dict[str, Any]) -> TradeRecord:
+        return TradeRecord(
+            timestamp=_utc(order["time"]),
+            symbol=self.symbol,
+            side=order["side"],
+            position_side=order["position_side"],
+            quantity=order["quantity"],
+            price=fixed_div(order["quote"], order["quantity"]),
+            notional=order["quote"],
+            order_id=order_id,
+            client_order_id=client_order_id,
+            realized_pnl=order["realized_pnl"],
+            commission=order["commission"]
+        )
+
+    def _add_position_pnl(self, db, order: Dict[str, Any]):
+        """Credit an order's realized PnL to the position it reduced: the leg's latest one opened before it"""
+        position = db.query(Position).filter(
+            Position.symbol == self.symbol,
+            Position.position_side == order["position_side"],
+            Position.opened_at <= _utc(order["time"])
+        ).order_by(Position.opened_at.desc()).first()
+        if position is not None:
+            position.realized_pnl = (position.realized_pnl or 0) + order["realized_pnl"]
+
+    def _add_funding(self, db, entry: Dict[str, Any]):
+        """Split a funding payment between the legs that were open when it settled"""
+        settled_at = _utc(entry['time'])
+        legs = {}
+        for position in db.query(Position).filter(
+            Position.symbol == self.symbol,
+            Position.opened_at <= settled_at,
+            (Position.closed_at.is_(None)) | (Position.closed_at >= settled_at)
+        ).order_by(Position.opened_at):
+            legs[position.position_side] = position  # latest per side
+        if not legs:
+            return
+        # Split in whole units; the first leg takes the remainder so the shares add up exactly
+        share, remainder = divmod(to_fixed(entry['income']), len(legs))
+        for i, position in enumerate(legs.values()):
+            position.funding_fee = (position.funding_fee or 0) + share + (remainder if i == 0 else 0)
+
+    @staticmethod
+    def _save_cursor(db, name: str, last_id: Any, last_time: Any):
+        db.merge(SyncCursor(
+            name=name, last_id=int(last_id), last_time=int(last_time),
+            updated_at=datetime.now(timezone.utc).replace(tzinfo=None)
+        ))
@@ -0,0 +1,219 @@
+from loguru import logger
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import threading
+
+import numpy as np
+
+from octopus.config.settings import settings
+
+DEFAULT_MAINT_MARGIN_RATE = 0.005
+
+
+class RiskAction(NamedTuple):
+    kind: str                     # "CLOSE_PAIR", "CLOSE_ALL" or "ALERT"
+    symbol: Optional[str]
+    position_side: Optional[str]
+    reason: str
+    value: float
+
+
+class PortfolioRisk:
+    """
+    Risk limits evaluated for the whole book at once.
+
+    Positions of all symbols live in parallel NumPy arrays (one row per
+    symbol/position side) and are parsed once when they change, not on every
+    check. `evaluate()` computes PnL, net delta per symbol, margin ratio and
+    drawdown for all rows in a single vectorized pass and returns the actions
+    the limits call for, so it can run on every mark price update.
+    """
+
+    def __init__(
+        self,
+        stop_loss_pct: float = None,
+        max_drift_pct: float = None,
+        max_drawdown_pct: float = None,
+        funding_rate_threshold: float = None,
+        max_margin_ratio: float = None,
+        capacity: int = 64
+    ):
+        self.stop_loss_pct = settings.stop_loss_pct if stop_loss_pct is None else stop_loss_pct
+        self.max_drift_pct = settings.max_pnl_drift_pct if max_drift_pct is None else max_drift_pct
+        self.max_drawdown_pct = settings.max_drawdown_pct if max_drawdown_pct is None else max_drawdown_pct
+        self.funding_rate_threshold = (
+            settings.funding_rate_threshold if funding_rate_threshold is None else funding_rate_threshold
+        )
+        self.max_margin_ratio = settings.max_margin_ratio if max_margin_ratio is None else max_margin_ratio
+
+        self.rows: Dict[Tuple[str, str], int] = {}
+        self.row_keys: List[Tuple[str, str]] = []
+        self.symbols: Dict[str, int] = {}
+        self.symbol_names: List[str] = []
+        self.qty = np.zeros(capacity)          # signed position amount
+        self.entry = np.zeros(capacity)
+        self.mark = np.zeros(capacity)
+        self.leverage = np.ones(capacity)
+        self.maint_rate = np.full(capacity, DEFAULT_MAINT_MARGIN_RATE)
+        self.symbol_idx = np.zeros(capacity, dtype=np.intp)
+        self.funding_rate = np.zeros(capacity)  # per symbol index
+        self.wallet_balance: Optional[float] = None  # unknown until seeded or streamed
+        self.peak_equity = 0.0
+        self.halted = False  # drawdown limit acted on; not checked again until reset_halt()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.row_keys)
+
+    def _symbol(self, symbol: str) -> int:
+        idx = self.symbols.get(symbol)
+        if idx is None:
+            idx = self.symbols[symbol] = len(self.symbol_names)
+            self.symbol_names.append(symbol)
+            if idx >= len(self.funding_rate):
+                self.funding_rate = np.concatenate([self.funding_rate, np.zeros(len(self.funding_rate))])
+        return idx
+
+    def _row(self, symbol: str, position_side: str) -> int:
+        key = (symbol, position_side)
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = len(self.row_keys)
+            self.row_keys.append(key)
+            if row >= len(self.qty):
+                self._grow()
+            self.symbol_idx[row] = self._symbol(symbol)
+            self.leverage[row] = settings.leverage
+        return row
+
+    def _grow(self):
+        n = len(self.qty)
+        self.qty = np.concatenate([self.qty, np.zeros(n)])
+        self.entry = np.concatenate([self.entry, np.zeros(n)])
+        self.mark = np.concatenate([self.mark, np.zeros(n)])
+        self.leverage = np.concatenate([self.leverage, np.ones(n)])
+        self.maint_rate = np.concatenate([self.maint_rate, np.full(n, DEFAULT_MAINT_MARGIN_RATE)])
+        self.symbol_idx = np.concatenate([self.symbol_idx, np.zeros(n, dtype=np.intp)])
+
+    def load_positions(self, positions: Iterable[dict]):
+        """Load rows from /fapi/v2/positionRisk-shaped dicts"""
+        with self._lock:
+            for pos in positions:
+                row = self._row(pos['symbol'], pos['positionSide'])
+                self.qty[row] = float(pos['positionAmt'])
+                self.entry[row] = float(pos['entryPrice'])
+                mark = float(pos.get('markPrice') or 0)
+                if mark:
+                    self.mark[row] = mark
+                if pos.get('leverage'):
+                    self.leverage[row] = float(pos['leverage'])
+
+    def update_position(self, symbol: str, position_side: str, qty: float, entry_price: float):
+        with self._lock:
+            row = self._row(symbol, position_side)
+            self.qty[row] = qty
+            self.entry[row] = entry_price
+
+    def update_mark(self, symbol: str, price: float, funding_rate: Optional[float] = None):
+        """New mark price for every row of `symbol`"""
+        with self._lock:
+            idx = self.symbols.get(symbol)
+            if idx is None:
+                return
+            n = len(self.row_keys)
+            self.mark[:n][self.symbol_idx[:n] == idx] = price
+            if funding_rate is not None:
+                self.funding_rate[idx] = funding_rate
+
+    def set_maint_margin_rate(self, symbol: str, rate: float):
+        with self._lock:
+            idx = self.symbols.get(symbol)
+            if idx is not None:
+                n = len(self.row_keys)
+                self.maint_rate[:n][self.symbol_idx[:n] == idx] = rate
+
+    def set_wallet_balance(self, balance: float):
+        self.wallet_balance = balance
+
+    def halt(self):
+        """Latch the drawdown limit once its CLOSE_ALL has been carried out"""
+        self.halted = True
+
+    def reset_halt(self):
+        """Check the drawdown limit again, measured from the next equity seen"""
+        with self._lock:
+            self.halted = False
+            self.peak_equity = 0.0
+
+    def evaluate(self) -> List[RiskAction]:
+        """Check every limit for the whole book; returns the actions required, most severe first"""
+        with self._lock:
+            n = len(self.row_keys)
+            if n == 0:
+                return []
+            qty = self.qty[:n]
+            entry = self.entry[:n]
+            mark = self.mark[:n]
+            symbol_idx = self.symbol_idx[:n]
+            n_symbols = len(self.symbol_names)
+
+            open_rows = (qty != 0) & (entry > 0) & (mark > 0)
+            abs_qty = np.abs(qty)
+            cost = abs_qty * entry
+            pnl = qty * (mark - entry)
+            notional = abs_qty * mark
+
+            # Net delta per symbol relative to its gross exposure
+            net = np.bincount(symbol_idx, weights=np.where(open_rows, qty * mark, 0.0), minlength=n_symbols)
+            gross = np.bincount(symbol_idx, weights=np.where(open_rows, notional, 0.0), minlength=n_symbols)
+            delta_pct = np.divide(np.abs(net) * 100, gross, out=np.zeros(n_symbols), where=gross > 0)
+
+            # Stop-loss on each pair's net PnL: a hedged leg loses what the other gains
+            pair_pnl = np.bincount(symbol_idx, weights=np.where(open_rows, pnl, 0.0), minlength=n_symbols)
+            pair_cost = np.bincount(symbol_idx, weights=np.where(open_rows, cost, 0.0), minlength=n_symbols)
+            pair_pnl_pct = np.divide(pair_pnl * 100, pair_cost, out=np.zeros(n_symbols), where=pair_cost > 0)
+
+            # Equity limits wait for the balance: an unknown balance isn't a zero one
+            margin_ratio = drawdown_pct = 0.0
+            if self.wallet_balance is not None:
+                equity = self.wallet_balance + float(pnl[open_rows].sum())
+                maint_margin = float((notional * self.maint_rate[:n])[open_rows].sum())
+                margin_ratio = maint_margin / equity if equity > 0 else (1.0 if maint_margin else 0.0)
+                self.peak_equity = max(self.peak_equity, equity)
+                drawdown_pct = (self.peak_equity - equity) / self.peak_equity * 100 if self.peak_equity > 0 else 0.0
+
+            drift_symbols = np.flatnonzero(delta_pct > self.max_drift_pct)
+            stop_symbols = np.flatnonzero((pair_pnl_pct < -self.stop_loss_pct) & (delta_pct <= self.max_drift_pct))
+            funding = self.funding_rate[:n_symbols] * 100
+            funding_symbols = np.flatnonzero((np.abs(funding) > self.funding_rate_threshold) & (gross > 0))
+
+        actions: List[RiskAction] = []
+        if self.max_drawdown_pct and not self.halted and drawdown_pct > self.max_drawdown_pct:
+            actions.append(RiskAction("CLOSE_ALL", None, None, "drawdown", drawdown_pct))
+        if self.max_margin_ratio and margin_ratio > self.max_margin_ratio:
+            actions.append(RiskAction("CLOSE_ALL", None, None, "margin_ratio", margin_ratio))
+        for i in drift_symbols:
+            actions.append(RiskAction("CLOSE_PAIR", self.symbol_names[i], None, "net_delta", float(delta_pct[i])))
+        for i in stop_symbols:
+            actions.append(RiskAction("CLOSE_PAIR", self.symbol_names[i], None, "stop_loss", float(pair_pnl_pct[i])))
+        for i in funding_symbols:
+            actions.append(RiskAction("ALERT", self.symbol_names[i], None, "funding_rate", float(funding[i])))
+        return actions
+
+    def attach(self, market_cache=None, account_state=None):
+        """Keep the arrays current from the market and user data streams"""
+        if market_cache is not None:
+            market_cache.add_listener('markPriceUpdate', self._on_mark_price)
+        if account_state is not None:
+            account_state.add_listener('ACCOUNT_UPDATE', self._on_account_update)
+
+    def _on_mark_price(self, event: dict):
+        self.update_mark(event['s'], float(event['p']), float(event.get('r') or 0))
+
+    def _on_account_update(self, event: dict):
+        data = event.get('a', {})
+        for pos in data.get('P', []):
+            self.update_position(pos['s'], pos['ps'], float(pos['pa']), float(pos['ep']))
+        for bal in data.get('B', []):
+            if bal['a'] == 'USDT':
+                self.set_wallet_balance(float(bal['wb']))
+        logger.debug(f"Portfolio risk updated from account event: {len(self)} positions")
@@ -0,0 +1,143 @@
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+import json
+
+from octopus.config.settings import settings
+from octopus.database.db import get_db
+from octopus.database.journal import CheckpointSaved, PositionClosed, journal
+from octopus.database.models import Position, StrategyCheckpoint
+from octopus.utils.fixed_point import fixed_mul, to_fixed
+
+PAIR_SIDES = ("LONG", "SHORT")
+PORTFOLIO_CHECKPOINT = "*portfolio*"  # checkpoint row of the portfolio risk engine; never a symbol
+
+
+class RecoveredState(NamedTuple):
+    active_positions: Dict[str, Dict]  # position_side -> {"opened_at", "is_active", "entry_price"}
+    protective_order_ids: List[int]
+    halted: bool
+    orphaned: List[str]   # legs open on the exchange without the opposite leg
+    untracked: List[str]  # legs open on the exchange with no active Position row (row created)
+    stale: List[str]      # active Position rows whose leg is flat on the exchange (row closed)
+
+
+def save_checkpoint(
+    symbol: str,
+    active_positions: Dict[str, Dict],
+    protective_order_ids: List[int],
+    halted: bool,
+    now: datetime
+):
+    """Overwrite the symbol's checkpoint row with the current strategy state"""
+    state = {
+        "active_positions": {
+            side: {
+                "opened_at": data["opened_at"].isoformat(),
+                "entry_price": data.get("entry_price", 0.0)
+            }
+            for side, data in active_positions.items()
+            if data.get("is_active") and data.get("opened_at")
+        },
+        "protective_order_ids": list(protective_order_ids),
+        "halted": halted
+    }
+    journal.submit(CheckpointSaved(symbol=symbol, updated_at=now, state=json.dumps(state)))
+
+
+def save_portfolio_checkpoint(peak_equity: float, halted: bool, now: datetime):
+    """Overwrite the portfolio risk engine's checkpoint: the drawdown peak and halt latch"""
+    state = {"peak_equity": peak_equity, "halted": halted}
+    journal.submit(CheckpointSaved(symbol=PORTFOLIO_CHECKPOINT, updated_at=now, state=json.dumps(state)))
+
+
+def load_checkpoint(symbol: str) -> Optional[Dict[str, Any]]:
+    with get_db() as db:
+        row = db.get(StrategyCheckpoint, symbol)
+        return json.loads(row.state) if row is not None else None
+
+
+def recover_strategy(symbol: str, snapshot: Dict[str, Any], now: datetime) -> RecoveredState:
+    """
+    Rebuild a strategy's state after a restart.
+
+    The exchange snapshot (/fapi/v2/account) is the source of truth for which
+    legs are open. Hold-time clocks come from the active Position rows, then the
+    last checkpoint, then the exchange's position update time. Position rows are
+    brought in line with the exchange: rows of flat legs are closed and open
+    legs without a row get one.
+    """
+    open_legs = {
+        pos['positionSide']: pos
+        for pos in snapshot.get('positions', [])
+        if pos['symbol'] == symbol and pos['positionSide'] in PAIR_SIDES and float(pos['positionAmt']) != 0
+    }
+    checkpoint = load_checkpoint(symbol) or {}
+    checkpointed = checkpoint.get("active_positions", {})
+
+    active_positions: Dict[str, Dict] = {}
+    untracked: List[str] = []
+    stale: List[str] = []
+    closes: List[PositionClosed] = []
+    with get_db() as db:
+        rows = db.query(Position).filter(
+            Position.symbol == symbol,
+            Position.is_active.is_(True)
+        ).order_by(Position.opened_at.desc()).all()
+        rows_by_side = {}
+        for row in rows:
+            if row.position_side not in open_legs:
+                stale.append(row.position_side)
+            elif row.position_side not in rows_by_side:
+                rows_by_side[row.position_side] = row
+                continue
+            # Flat legs, and older duplicates of an open leg (only the newest row stays active)
+            closes.append(PositionClosed(
+                closed_at=now,
+                symbol=symbol,
+                position_side=row.position_side,
+                exit_price=None,
+                position_id=row.id
+            ))
+
+        for side, pos in open_legs.items():
+            row = rows_by_side.get(side)
+            entry_price = float(pos['entryPrice'])
+            if row is not None:
+                opened_at = row.opened_at
+            elif side in checkpointed:
+                opened_at = datetime.fromisoformat(checkpointed[side]["opened_at"])
+            elif pos.get('updateTime'):
+                opened_at = datetime.utcfromtimestamp(int(pos['updateTime']) / 1000)
+            else:
+                opened_at = now
+
+            if row is None:
+                quantity = abs(to_fixed(pos['positionAmt']))
+                db.add(Position(
+                    opened_at=opened_at,
+                    symbol=symbol,
+                    position_side=side,
+                    entry_price=to_fixed(pos['entryPrice']),
+                    quantity=quantity,
+                    leverage=int(float(pos.get('leverage') or settings.leverage)),
+                    notional=fixed_mul(quantity, to_fixed(pos['entryPrice'])),
+                    is_active=True
+                ))
+                untracked.append(side)
+
+            active_positions[side] = {"opened_at": opened_at, "is_active": True, "entry_price": entry_price}
+
+    # Closed through the journal like every other close, so DailyStats count them
+    if closes:
+        journal.submit(*closes)
+
+    orphaned = [side for side in open_legs if len(open_legs) == 1]
+    return RecoveredState(
+        active_positions=active_positions,
+        # Kept even when flat: leftover closePosition stops would act on the next pair
+        protective_order_ids=checkpoint.get("protective_order_ids", []),
+        halted=checkpoint.get("halted", False),
+        orphaned=orphaned,
+        untracked=untracked,
+        stale=stale
+    )
@@ -1,6 +1,11 @@
 from loguru import logger
 from octopus.config.settings import settings
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from octopus.exchange.symbol_info import Quantizer, SymbolFilters
+from octopus.utils.fixed_point import fixed_mul, from_fixed, parse_units, to_fixed
+
+# Lot used when sizing without a symbol's filters (0.001 for BTC)
+DEFAULT_LOT = Quantizer("0.001")
 
 class RiskManager:
     """Manages position sizing and risk controls"""
@@ -11,18 +16,33 @@ class RiskManager:
         self.leverage = settings.leverage
         self.stop_loss_pct = settings.stop_loss_pct
     
-    def calculate_position_size(self, price: float) -> float:
+    def calculate_position_size(self, price: float, filters: Optional[SymbolFilters] = None) -> float:
         """
         Calculate position size in base currency (e.g., BTC)
         
         Formula: 
         Position Size = (Capital * Max% * Leverage) / Price
+        
+        With `filters`, the size is computed in the symbol's integer units:
+        snapped down to the MARKET_LOT_SIZE step, 0.0 if it falls below minQty
+        or MIN_NOTIONAL. Without, it is snapped down to 0.001.
         """
         max_notional = self.capital * (self.max_position_size_pct / 100) * self.leverage
-        quantity = max_notional / price
         
-        # Round to reasonable precision (0.001 for BTC)
-        quantity = round(quantity, 3)
+        if filters is not None:
+            lot = filters.market_lot
+            price_units = filters.price.to_units(price)
+            # Notional in quantity units times price units, so the division lands in quantity units
+            notional_units = parse_units(max_notional, lot.decimals + filters.price.decimals)
+            qty_units = filters.quantize_qty_units(notional_units // price_units if price_units > 0 else 0)
+            if qty_units and not filters.meets_min_notional_units(qty_units, price_units):
+                logger.warning(
+                    f"Position size {lot.format_units(qty_units)} below {filters.symbol} min notional {filters.min_notional}"
+                )
+                qty_units = 0
+            quantity = qty_units / lot.scale
+        else:
+            quantity = DEFAULT_LOT.floor(max_notional / price)
         
         logger.debug(f"Position size: {quantity} @ ${price} = ${quantity * price} notional")
         return quantity
@@ -50,13 +70,12 @@ class RiskManager:
         return False
     
     def get_current_exposure(self, positions: list) -> float:
-        """Calculate total notional exposure across all positions"""
+        """Calculate total notional exposure across all positions (summed in fixed point)"""
         total = sum(
-            abs(float(pos['positionAmt'])) * float(pos['entryPrice'])
+            fixed_mul(abs(to_fixed(pos['positionAmt'])), to_fixed(pos['entryPrice']))
             for pos in positions
-            if float(pos['positionAmt']) != 0
         )
-        return total
+        return from_fixed(total)
     
     def can_open_new_position(self, price: float, positions: list) -> bool:
         """Check if we can open a new position without exceeding limits"""
@@ -0,0 +1,214 @@
+from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import time
+
+from octopus.config.settings import settings
+from octopus.data.recorder import MarketRecorder
+from octopus.database.journal import journal
+from octopus.exchange.aster_client import AsterExchangeClient
+from octopus.exchange.market_stream import MarketStream
+from octopus.exchange.order_book import OrderBookManager
+from octopus.exchange.user_stream import UserStream
+from octopus.strategy.delta_neutral import DeltaNeutralStrategy
+from octopus.strategy.portfolio_risk import PortfolioRisk, RiskAction
+from octopus.strategy.recovery import PORTFOLIO_CHECKPOINT, load_checkpoint, save_portfolio_checkpoint
+from octopus.utils.scheduler import Scheduler
+
+ALERT_INTERVAL_SEC = 300
+SEED_RETRY_SEC = 30
+
+
+class StrategyRunner:
+    """
+    Runs one DeltaNeutralStrategy per configured trading pair.
+
+    All strategies share one exchange client (one HTTP connection pool, rate
+    limiter, clock and filter cache), one market stream, one user data stream
+    and the database writer. Every symbol's state machine runs on a bounded
+    thread pool, so cycle time stays roughly flat as symbols are added.
+
+    `run()` drives everything from a Scheduler: fixed-rate cycles, rotation
+    deadlines and stream-triggered checks all run on the same thread pool.
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None):
+        self.symbols = list(symbols or settings.trading_pairs)
+        self.client = AsterExchangeClient()
+        self.market_stream: Optional[MarketStream] = None
+        self.order_books: Optional[OrderBookManager] = None
+        self.user_stream: Optional[UserStream] = None
+        self.recorder: Optional[MarketRecorder] = None
+        self._start_streams()
+
+        try:
+            self.client.set_position_mode(True)  # hedge mode, account-wide
+            logger.info("✅ Position mode set to hedge")
+        except Exception as e:
+            logger.warning(f"Could not set position mode: {e}")
+
+        # One account snapshot restores every strategy after a restart
+        snapshot = self.client.get_account_snapshot()
+        self.strategies: Dict[str, DeltaNeutralStrategy] = {
+            symbol: DeltaNeutralStrategy(
+                symbol=symbol, client=self.client, order_books=self.order_books, snapshot=snapshot
+            )
+            for symbol in self.symbols
+        }
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, min(settings.max_concurrent_symbols, len(self.symbols))),
+            thread_name_prefix="strategy"
+        )
+        self.scheduler = Scheduler(executor=self.executor)
+        self.portfolio_risk: Optional[PortfolioRisk] = None
+        self._pending_actions: Set[Tuple] = set()
+        self._last_alert: Dict[Tuple, float] = {}
+        if self.market_stream is not None and self.client.account_state is not None:
+            self._start_portfolio_risk()
+        for strategy in self.strategies.values():
+            strategy.attach(self.scheduler, portfolio_risk=self.portfolio_risk is not None)
+        logger.info(f"Strategy runner ready: {', '.join(self.symbols)}")
+
+    def _start_streams(self):
+        if settings.market_stream_enabled:
+            self.market_stream = MarketStream(self.symbols)
+            self.client.market_cache = self.market_stream.cache
+            if settings.order_book_enabled:
+                self.order_books = OrderBookManager(self.client, self.market_stream.cache, self.symbols)
+            if settings.recorder_enabled:
+                self.recorder = MarketRecorder()
+                self.recorder.attach(self.market_stream.cache)
+                self.recorder.start()
+            self.market_stream.start()
+
+        if settings.user_stream_enabled:
+            try:
+                self.user_stream = UserStream(self.client)
+                self.client.account_state = self.user_stream.state
+                self.user_stream.start()
+            except Exception as e:
+                logger.warning(f"Could not start user data stream, polling REST instead: {e}")
+                self.user_stream = None
+                self.client.account_state = None
+
+    def _start_portfolio_risk(self):
+        """Evaluate the whole book's limits on every mark price update"""
+        self.portfolio_risk = PortfolioRisk()
+        self._restore_portfolio_risk()
+        self._seed_portfolio_risk()
+        self.portfolio_risk.attach(self.market_stream.cache, self.client.account_state)
+        # Registered after the engine's own listener, so marks are updated before evaluation
+        self.market_stream.cache.add_listener('markPriceUpdate', self._on_mark_price)
+        if settings.checkpoint_interval_sec > 0:
+            self.scheduler.every(
+                settings.checkpoint_interval_sec, self._checkpoint_portfolio_risk,
+                name="portfolio risk checkpoint", delay=settings.checkpoint_interval_sec
+            )
+
+    def _restore_portfolio_risk(self):
+        """Carry the drawdown peak and halt latch over from an earlier run"""
+        state = load_checkpoint(PORTFOLIO_CHECKPOINT) or {}
+        self.portfolio_risk.peak_equity = state.get("peak_equity", 0.0)
+        if not state.get("halted"):
+            return
+        if settings.clear_halt_on_start:
+            self.portfolio_risk.reset_halt()
+            logger.warning("Cleared the portfolio drawdown halt from an earlier run")
+        else:
+            self.portfolio_risk.halt()
+
+    def _checkpoint_portfolio_risk(self):
+        try:
+            save_portfolio_checkpoint(
+                self.portfolio_risk.peak_equity, self.portfolio_risk.halted, self.scheduler.clock.wall()
+            )
+        except Exception as e:
+            logger.error(f"Failed to checkpoint portfolio risk: {e}")
+
+    def _seed_portfolio_risk(self):
+        """
+        Load positions and the wallet balance from REST.
+
+        Retried until it succeeds or an ACCOUNT_UPDATE delivers the balance;
+        until then the margin and drawdown limits are not evaluated.
+        """
+        if self.portfolio_risk.wallet_balance is not None:
+            return
+        try:
+            positions = self.client.fetch_position_risk()
+            balances = self.client.fetch_account_balance()
+        except Exception as e:
+            logger.warning(f"Could not seed portfolio risk from REST, retrying in {SEED_RETRY_SEC}s: {e}")
+            self.scheduler.call_later(SEED_RETRY_SEC, self._seed_portfolio_risk, name="portfolio risk seed")
+            return
+        self.portfolio_risk.load_positions(positions)
+        for bal in balances:
+            if bal['asset'] == 'USDT':
+                self.portfolio_risk.set_wallet_balance(float(bal['balance']))
+
+    def _on_mark_price(self, event: dict):
+        for action in self.portfolio_risk.evaluate():
+            key = (action.kind, action.symbol, action.position_side)
+            if key in self._pending_actions:
+                continue
+            if action.symbol is not None and action.symbol not in self.strategies:
+                continue
+            if action.kind == "ALERT":
+                now = time.monotonic()
+                if now - self._last_alert.get(key, -ALERT_INTERVAL_SEC) < ALERT_INTERVAL_SEC:
+                    continue
+                self._last_alert[key] = now
+            self._pending_actions.add(key)
+            self.scheduler.post(lambda a=action, k=key: self._dispatch(a, k), name=f"risk {action.kind}")
+
+    def _dispatch(self, action: RiskAction, key: Tuple):
+        def still_required() -> bool:
+            return any((a.kind, a.symbol, a.position_side) == key for a in self.portfolio_risk.evaluate())
+
+        try:
+            if action.kind == "CLOSE_ALL" and action.reason == "drawdown":
+                self._halt(action, still_required)
+            elif action.symbol is None:
+                for strategy in self.strategies.values():
+                    strategy.handle_risk_action(action, still_required)
+            else:
+                self.strategies[action.symbol].handle_risk_action(action, still_required)
+        finally:
+            self._pending_actions.discard(key)
+
+    def _halt(self, action: RiskAction, still_required: Callable[[], bool]):
+        """
+        Close every strategy for a drawdown and stop opening pairs.
+
+        Decided once for all strategies: closing one pair changes equity, and a
+        halt that stopped half way would leave the rest open. Latched first,
+        because equity stays below the peak after closing and every tick would
+        ask again.
+        """
+        if not still_required():
+            return
+        self.portfolio_risk.halt()
+        self._checkpoint_portfolio_risk()
+        for strategy in self.strategies.values():
+            try:
+                strategy.handle_risk_action(action)
+            except Exception as e:
+                logger.error(f"Failed to close {strategy.symbol} for the portfolio halt: {e}")
+
+    def run(self):
+        """Run the scheduler until stop(); every strategy runs its first cycle right away"""
+        self.scheduler.run_forever()
+
+    def stop(self):
+        """Stop scheduling, wait for running cycles, write out the journal and close the streams"""
+        self.scheduler.stop()
+        self.executor.shutdown(wait=True)
+        if self.portfolio_risk is not None:
+            self._checkpoint_portfolio_risk()
+        journal.close()
+        if self.user_stream is not None:
+            self.user_stream.stop()
+        if self.market_stream is not None:
+            self.market_stream.stop()
+        if self.recorder is not None:
+            self.recorder.stop()
@@ -0,0 +1,75 @@
+from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal
+from typing import Union
+
+# Scale of the prices, quantities and USDT amounts stored in the database:
+# every tick and lot size in exchangeInfo is a whole number of 1e-8 units
+FIXED_DECIMALS = 8
+FIXED_SCALE = 10 ** FIXED_DECIMALS
+
+Number = Union[str, int, float]
+
+
+def parse_units(value: Number, decimals: int, truncate: bool = False) -> int:
+    """
+    `value` in integer units of 10^-decimals.
+
+    Decimal strings, as the API sends them, are converted digit by digit with
+    no float in between. Digits beyond `decimals` are rounded half up, or cut
+    toward zero with `truncate`. Floats are scaled and rounded the same way.
+    """
+    if isinstance(value, int):
+        return value * 10 ** decimals
+    if isinstance(value, float):
+        scaled = value * 10 ** decimals
+        # The 1e-9 nudge keeps 0.3 / 0.1 style inputs from truncating one unit down
+        if truncate:
+            return int(scaled + 1e-9) if scaled >= 0 else int(scaled - 1e-9)
+        return int(round(scaled))
+    text = value.strip()
+    if 'e' in text or 'E' in text:
+        rounding = ROUND_DOWN if truncate else ROUND_HALF_UP
+        return int(Decimal(text).scaleb(decimals).to_integral_value(rounding))
+    negative = text.startswith('-')
+    whole, _, frac = text.lstrip('+-').partition('.')
+    units = int(whole or '0') * 10 ** decimals + int(frac[:decimals].ljust(decimals, '0') or '0')
+    if not truncate and frac[decimals:decimals + 1] >= '5':
+        units += 1
+    return -units if negative else units
+
+
+def format_units(units: int, decimals: int) -> str:
+    """Exact decimal string for a value in integer units of 10^-decimals"""
+    if decimals == 0:
+        return str(units)
+    sign = '-' if units < 0 else ''
+    whole, frac = divmod(abs(units), 10 ** decimals)
+    return f"{sign}{whole}.{frac:0{decimals}d}"
+
+
+def round_div(numerator: int, denominator: int) -> int:
+    """Integer division rounded half up (away from zero on a tie)"""
+    if denominator < 0:
+        numerator, denominator = -numerator, -denominator
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def to_fixed(value: Number) -> int:
+    """Price, quantity or USDT amount in the 1e-8 units used for storage"""
+    return parse_units(value, FIXED_DECIMALS)
+
+
+def from_fixed(units: int) -> float:
+    return units / FIXED_SCALE
+
+
+def fixed_mul(a: int, b: int) -> int:
+    """Product of two fixed-point values (quantity * price = notional)"""
+    return round_div(a * b, FIXED_SCALE)
+
+
+def fixed_div(a: int, b: int) -> int:
+    """Quotient of two fixed-point values (notional / quantity = price); 0 when b is 0"""
+    return round_div(a * FIXED_SCALE, b) if b else 0
@@ -0,0 +1,175 @@
+from loguru import logger
+from collections import defaultdict
+from concurrent.futures import Executor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+import heapq
+import itertools
+import threading
+import time
+
+
+class MonotonicClock:
+    """Real time: `now()` is monotonic seconds for scheduling, `wall()` is UTC for records"""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def wall(self) -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SimulatedClock:
+    """
+    Clock that only moves when told to.
+
+    `Scheduler.run_until()` advances it from deadline to deadline, so hours of
+    strategy time run in milliseconds and deterministically.
+    """
+
+    def __init__(self, start: Optional[datetime] = None):
+        self.start = start or datetime.now(timezone.utc).replace(tzinfo=None)
+        self.elapsed = 0.0
+
+    def now(self) -> float:
+        return self.elapsed
+
+    def wall(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def advance_to(self, t: float):
+        self.elapsed = max(self.elapsed, t)
+
+
+class Timer:
+    """Handle of a scheduled callback; `cancel()` it to drop the callback"""
+
+    __slots__ = ('deadline', 'callback', 'name', 'interval', 'cancelled')
+
+    def __init__(self, deadline: float, callback: Callable[[], Any], name: str, interval: Optional[float] = None):
+        self.deadline = deadline
+        self.callback = callback
+        self.name = name
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Deadline scheduler and event bus.
+
+    Callbacks are kept in a heap keyed by deadline; the loop sleeps exactly
+    until the next one is due (or until something is posted from another
+    thread), so a deadline fires within milliseconds instead of at the next
+    poll. Periodic timers are fixed-rate: the next run is the previous deadline
+    plus the interval, so callback duration never drifts the schedule.
+
+    Callbacks run on the scheduler thread, or on `executor` when given.
+    """
+
+    def __init__(self, clock=None, executor: Optional[Executor] = None):
+        self.clock = clock or MonotonicClock()
+        self.executor = executor
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._handlers: Dict[str, List[Callable[[Any], Any]]] = defaultdict(list)
+        self._cond = threading.Condition()
+        self._running = False
+
+    def call_at(self, deadline: float, callback: Callable[[], Any], name: str = "") -> Timer:
+        """Run `callback` once at `deadline` (clock.now() time)"""
+        return self._push(Timer(deadline, callback, name or _name(callback)))
+
+    def call_later(self, delay: float, callback: Callable[[], Any], name: str = "") -> Timer:
+        """Run `callback` once after `delay` seconds"""
+        return self.call_at(self.clock.now() + delay, callback, name)
+
+    def every(self, interval: float, callback: Callable[[], Any], name: str = "", delay: float = 0.0) -> Timer:
+        """Run `callback` every `interval` seconds at a fixed rate, first after `delay`"""
+        return self._push(Timer(self.clock.now() + delay, callback, name or _name(callback), interval))
+
+    def post(self, callback: Callable[[], Any], name: str = "") -> Timer:
+        """Run `callback` as soon as possible; safe to call from any thread"""
+        return self.call_at(self.clock.now(), callback, name)
+
+    def on(self, event: str, handler: Callable[[Any], Any]):
+        """Subscribe `handler(payload)` to an event emitted with `emit()`"""
+        self._handlers[event].append(handler)
+
+    def emit(self, event: str, payload: Any = None):
+        """Dispatch an event to its handlers on the scheduler; safe to call from any thread"""
+        for handler in self._handlers.get(event, ()):
+            self.post(lambda h=handler: h(payload), name=f"{event}:{_name(handler)}")
+
+    def run_forever(self):
+        """Run callbacks as they become due until `stop()`"""
+        self._running = True
+        while self._running:
+            with self._cond:
+                timer = self._pop_due()
+                if timer is None:
+                    timeout = self._heap[0][0] - self.clock.now() if self._heap else None
+                    self._cond.wait(timeout)
+                    continue
+            self._dispatch(timer)
+
+    def run_until(self, t: float):
+        """Simulated time: run every callback due up to `t`, advancing the clock to each deadline"""
+        while self._heap and self._heap[0][0] <= t:
+            deadline, _, timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                continue
+            self.clock.advance_to(deadline)
+            self._dispatch(timer)
+        self.clock.advance_to(t)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def pending(self) -> int:
+        return sum(1 for _, _, timer in self._heap if not timer.cancelled)
+
+    def _push(self, timer: Timer) -> Timer:
+        with self._cond:
+            heapq.heappush(self._heap, (timer.deadline, next(self._seq), timer))
+            self._cond.notify()
+        return timer
+
+    def _pop_due(self) -> Optional[Timer]:
+        now = self.clock.now()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, timer = heapq.heappop(self._heap)
+            if not timer.cancelled:
+                return timer
+        return None
+
+    def _dispatch(self, timer: Timer):
+        if timer.interval is not None:
+            # Fixed rate; if a run overran whole periods, skip them instead of bursting
+            now = self.clock.now()
+            timer.deadline += timer.interval
+            if timer.deadline <= now:
+                timer.deadline += (now - timer.deadline) // timer.interval * timer.interval + timer.interval
+            self._push(timer)
+        if self.executor is not None:
+            self.executor.submit(self._run, timer)
+        else:
+            self._run(timer)
+
+    @staticmethod
+    def _run(timer: Timer):
+        if timer.cancelled:
+            return
+        try:
+            timer.callback()
+        except Exception as e:
+            logger.error(f"Scheduled task {timer.name} failed: {e}")
+
+
+def _name(callback: Callable) -> str:
+    return getattr(callback, '__qualname__', None) or getattr(callback, '__name__', None) or repr(callback)
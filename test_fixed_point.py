@@ -0,0 +1,158 @@
+"""Fixed-point amounts: parsing, rounding and the float-to-integer migration"""
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String, create_engine, text
+from sqlalchemy.orm import declarative_base
+
+from octopus.database.db import configure_db, get_db, init_db
+from octopus.database.models import Position, Trade
+from octopus.exchange.symbol_info import Quantizer
+from octopus.utils.fixed_point import (
+    fixed_div, fixed_mul, format_units, from_fixed, parse_units, round_div, to_fixed
+)
+
+
+def test_parse_units_strings_are_exact():
+    """API strings convert digit by digit, rounding half up past the last decimal"""
+    assert parse_units("0.1", 8) == 10_000_000
+    assert parse_units("60123.45", 2) == 6_012_345
+    assert parse_units("-0.00000001", 8) == -1
+    assert parse_units("1.234565", 5) == 123_457
+    assert parse_units("1.234564", 5) == 123_456
+    assert parse_units("-1.234565", 5) == -123_457
+    assert parse_units("1.234569", 5, truncate=True) == 123_456
+    assert parse_units(".5", 1) == 5
+    assert parse_units("1e-3", 8) == 100_000
+
+
+def test_parse_units_floats():
+    """Floats round to the nearest unit; truncation tolerates representation error"""
+    assert parse_units(0.1 + 0.2, 8) == 30_000_000
+    assert parse_units(0.3, 1, truncate=True) == 3
+    assert parse_units(0.29999, 1, truncate=True) == 2
+    assert parse_units(-0.29999, 1, truncate=True) == -2
+    assert parse_units(3, 2) == 300
+
+
+def test_format_units_round_trip():
+    for text_value in ("0.00100000", "60123.45000000", "-0.00000001", "0.00000000"):
+        assert format_units(parse_units(text_value, 8), 8) == text_value
+    assert format_units(5, 0) == "5"
+
+
+def test_round_div_half_up():
+    assert round_div(5, 2) == 3
+    assert round_div(-5, 2) == -3
+    assert round_div(4, 3) == 1
+    assert round_div(5, -2) == -3
+
+
+def test_fixed_arithmetic():
+    qty, price = to_fixed("0.003"), to_fixed("60123.45")
+    assert fixed_mul(qty, price) == to_fixed("180.37035")
+    assert fixed_div(fixed_mul(qty, price), qty) == price
+    assert fixed_div(price, 0) == 0
+    assert from_fixed(to_fixed("1.5")) == 1.5
+
+
+def test_quantizer_rounding():
+    lot = Quantizer("0.001")
+    assert lot.floor(0.0019999) == 0.001
+    assert lot.floor(0.3) == 0.3
+    assert lot.round(0.0015) == 0.002
+    assert lot.format(0.1 + 0.2) == "0.300"
+
+    tick = Quantizer("0.10")
+    assert tick.decimals == 1
+    assert tick.format("60123.19") == "60123.1"
+
+    half = Quantizer("0.5")
+    assert half.round("1.25") == 1.5
+    assert half.round("1.24") == 1.0
+    assert half.floor("1.49") == 1.0
+    assert half.format_units(half.round_units(7.75)) == "8.0"
+
+    whole = Quantizer("1")
+    assert whole.format(12.9) == "12"
+
+
+LegacyBase = declarative_base()
+
+
+class LegacyTrade(LegacyBase):
+    """trades as created before amounts were stored in fixed point"""
+    __tablename__ = 'trades'
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    symbol = Column(String, nullable=False)
+    side = Column(String, nullable=False)
+    position_side = Column(String, nullable=False)
+    order_type = Column(String, default="MARKET")
+    quantity = Column(Float, nullable=False)
+    price = Column(Float, nullable=False)
+    notional = Column(Float, nullable=False)
+    order_id = Column(String, unique=True)
+    realized_pnl = Column(Float, default=0.0)
+    commission = Column(Float, default=0.0)
+    status = Column(String, default="FILLED")
+
+
+class LegacyPosition(LegacyBase):
+    __tablename__ = 'positions'
+    id = Column(Integer, primary_key=True)
+    opened_at = Column(DateTime, default=datetime.utcnow)
+    closed_at = Column(DateTime, nullable=True)
+    symbol = Column(String, nullable=False)
+    position_side = Column(String, nullable=False)
+    entry_price = Column(Float, nullable=False)
+    exit_price = Column(Float, nullable=True)
+    quantity = Column(Float, nullable=False)
+    leverage = Column(Integer, nullable=False)
+    notional = Column(Float, nullable=False)
+    hold_time_minutes = Column(Integer, default=0)
+    realized_pnl = Column(Float, default=0.0)
+    is_active = Column(Boolean, default=True)
+
+
+def test_float_database_migrates_to_fixed(tmp_path):
+    """A float-era database is rebuilt with integer columns holding the same amounts"""
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    legacy = create_engine(url)
+    LegacyBase.metadata.create_all(legacy)
+    opened_at = datetime(2025, 1, 2, 3, 4, 5)
+    with legacy.begin() as conn:
+        conn.execute(LegacyTrade.__table__.insert(), [
+            dict(timestamp=opened_at, symbol="BTCUSDT", side="BUY", position_side="LONG",
+                 quantity=0.003, price=60123.45, notional=0.003 * 60123.45, order_id="1",
+                 realized_pnl=-0.1 - 0.2, commission=0.07214814),
+            dict(timestamp=opened_at, symbol="BTCUSDT", side="SELL", position_side="SHORT",
+                 quantity=0.003, price=60123.4, notional=180.3702, order_id="2",
+                 realized_pnl=0.0, commission=0.0),
+        ])
+        conn.execute(LegacyPosition.__table__.insert(), [
+            dict(opened_at=opened_at, symbol="BTCUSDT", position_side="LONG", entry_price=60123.45,
+                 exit_price=None, quantity=0.003, leverage=5, notional=180.37035, is_active=True),
+        ])
+    legacy.dispose()
+
+    configure_db(url)
+    init_db()
+    init_db()  # a second run finds nothing left to convert
+
+    with get_db() as db:
+        trades = {t.order_id: t for t in db.query(Trade).all()}
+        position = db.query(Position).one()
+        assert trades["1"].quantity == 300_000
+        assert trades["1"].price == 6_012_345_000_000
+        assert trades["1"].notional == to_fixed("180.37035")
+        assert trades["1"].realized_pnl == -30_000_000
+        assert trades["1"].commission == 7_214_814
+        assert trades["1"].timestamp == opened_at
+        assert trades["2"].client_order_id is None
+        assert position.exit_price is None
+        assert position.entry_price == to_fixed("60123.45")
+        assert position.funding_fee in (0, None)
+        column_types = {
+            row[1]: row[2] for row in db.execute(text("PRAGMA table_info(trades)")).fetchall()
+        }
+        assert column_types["price"] == "INTEGER"
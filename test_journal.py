@@ -0,0 +1,146 @@
+"""Write-behind journal: batching, flushing, position closes and failed batches"""
+from datetime import datetime, timedelta
+import threading
+
+import pytest
+
+from octopus.config.settings import settings
+from octopus.database.db import _writer_lock, configure_db, get_db, init_db
+from octopus.database.journal import (
+    CheckpointSaved, Journal, PositionClosed, PositionOpened, TradeRecord
+)
+from octopus.database.models import Position, StrategyCheckpoint, Trade
+from octopus.database.stats import get_stats
+from octopus.utils.fixed_point import to_fixed
+
+NOW = datetime(2025, 3, 4, 12, 0, 0)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    configure_db(f"sqlite:///{tmp_path / 'journal.db'}")
+    init_db()
+    return tmp_path
+
+
+@pytest.fixture
+def journal(db_path):
+    journal = Journal(maxsize=100, batch_size=50)
+    yield journal
+    journal.close()
+
+
+def trade(order_id: str, notional: str = "100", ts: datetime = NOW) -> TradeRecord:
+    return TradeRecord(
+        timestamp=ts, symbol="BTCUSDT", side="BUY", position_side="LONG", quantity=to_fixed("0.001"),
+        price=to_fixed("100000"), notional=to_fixed(notional), order_id=order_id, commission=to_fixed("0.04")
+    )
+
+
+def opened(side: str, at: datetime, price: str = "100000") -> PositionOpened:
+    return PositionOpened(
+        opened_at=at, symbol="BTCUSDT", position_side=side, entry_price=to_fixed(price),
+        quantity=to_fixed("0.001"), leverage=5, notional=to_fixed("100")
+    )
+
+
+def test_flush_commits_everything_submitted(journal):
+    journal.submit(trade("1"), trade("2", "50"), opened("LONG", NOW), opened("SHORT", NOW))
+    journal.flush()
+    with get_db() as db:
+        assert sorted(t.order_id for t in db.query(Trade).all()) == ["1", "2"]
+        assert db.query(Position).filter(Position.is_active.is_(True)).count() == 2
+    today = get_stats("BTCUSDT", NOW)["today"]
+    assert today.num_trades == 2
+    assert today.volume == 150.0
+    assert today.fees == 0.08
+
+
+def test_close_writes_out_the_queue(journal):
+    """close() drains the queue and stops the writer; a later submit is written synchronously"""
+    with _writer_lock:
+        journal.submit(*(trade(str(i)) for i in range(20)))
+    journal.close()
+    with get_db() as db:
+        assert db.query(Trade).count() == 20
+    journal.submit(trade("20"))
+    assert journal._thread is None
+    with get_db() as db:
+        assert db.query(Trade).count() == 21
+
+
+def test_submit_racing_close_is_not_dropped(journal):
+    """Events submitted while close() runs are written, either by the writer or by the caller"""
+    submitted = threading.Event()
+
+    def submit_all():
+        for i in range(200):
+            journal.submit(trade(str(i)))
+            submitted.set()
+
+    thread = threading.Thread(target=submit_all)
+    thread.start()
+    submitted.wait(2)
+    journal.close()
+    thread.join(5)
+    with get_db() as db:
+        assert db.query(Trade).count() == 200
+
+
+def test_duplicate_order_id_only_drops_that_record(journal):
+    """A unique violation fails the batch, which is retried record by record"""
+    with _writer_lock:
+        # The writer takes "1" and waits for the lock; the rest queue up as one batch
+        journal.submit(trade("1"))
+        journal.submit(trade("2"), trade("1"), trade("3"), opened("LONG", NOW))
+    journal.flush()
+    with get_db() as db:
+        assert sorted(t.order_id for t in db.query(Trade).all()) == ["1", "2", "3"]
+        assert db.query(Position).count() == 1
+    # The rolled back batch didn't leave its stats behind
+    assert get_stats("BTCUSDT", NOW)["today"].num_trades == 3
+
+
+def test_position_closed_targets_the_newest_active_row(journal):
+    journal.submit(opened("LONG", NOW - timedelta(hours=3)), opened("LONG", NOW - timedelta(hours=1)))
+    journal.flush()
+    with get_db() as db:
+        older, newer = (p.id for p in db.query(Position).order_by(Position.opened_at).all())
+
+    journal.submit(PositionClosed(closed_at=NOW, symbol="BTCUSDT", position_side="LONG", exit_price=to_fixed("101000")))
+    journal.flush()
+    with get_db() as db:
+        assert db.get(Position, newer).is_active is False
+        assert db.get(Position, newer).exit_price == to_fixed("101000")
+        assert db.get(Position, newer).hold_time_minutes == 60
+        assert db.get(Position, older).is_active is True
+
+    journal.submit(PositionClosed(
+        closed_at=NOW, symbol="BTCUSDT", position_side="LONG", exit_price=None, realized_pnl=to_fixed("-1"),
+        position_id=older
+    ))
+    # Nothing left to close: ignored
+    journal.submit(PositionClosed(closed_at=NOW, symbol="BTCUSDT", position_side="SHORT", exit_price=None))
+    journal.flush()
+    with get_db() as db:
+        row = db.get(Position, older)
+        assert row.is_active is False
+        assert row.exit_price is None
+        assert row.realized_pnl == to_fixed("-1")
+    assert get_stats("BTCUSDT", NOW)["today"].positions_closed == 2
+
+
+def test_checkpoint_is_overwritten(journal):
+    journal.submit(CheckpointSaved("BTCUSDT", NOW, '{"a": 1}'), CheckpointSaved("BTCUSDT", NOW, '{"a": 2}'))
+    journal.flush()
+    with get_db() as db:
+        assert [c.state for c in db.query(StrategyCheckpoint).all()] == ['{"a": 2}']
+
+
+def test_disabled_journal_writes_synchronously(db_path, monkeypatch):
+    monkeypatch.setattr(settings, "journal_enabled", False)
+    journal = Journal()
+    journal.submit(trade("1"))
+    assert journal._thread is None
+    with get_db() as db:
+        assert db.query(Trade).count() == 1
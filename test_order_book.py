@@ -0,0 +1,119 @@
+"""Local order book: level bookkeeping and snapshot/diff synchronization"""
+import random
+
+from octopus.exchange.order_book import BookSide, LocalOrderBook
+
+
+def diff(first: int, last: int, prev: int, bids=(), asks=()) -> dict:
+    return {"e": "depthUpdate", "s": "BTCUSDT", "U": first, "u": last, "pu": prev,
+            "b": [list(level) for level in bids], "a": [list(level) for level in asks]}
+
+
+def snapshot(last_update_id: int) -> dict:
+    return {"lastUpdateId": last_update_id,
+            "bids": [["100.0", "1.0"], ["99.0", "2.0"]],
+            "asks": [["101.0", "1.5"], ["102.0", "3.0"]]}
+
+
+def synced_book(last_update_id: int = 100) -> LocalOrderBook:
+    book = LocalOrderBook("BTCUSDT")
+    book.load_snapshot(snapshot(last_update_id))
+    return book
+
+
+def test_book_side_matches_sorted_reference():
+    """Random diffs leave the same levels as a plain dict sorted on every query"""
+    rnd = random.Random(7)
+    for is_bid in (True, False):
+        side = BookSide(is_bid)
+        reference = {}
+        for _ in range(5000):
+            price = round(rnd.uniform(90, 110), 1)
+            qty = 0.0 if rnd.random() < 0.4 else round(rnd.uniform(0.1, 5), 3)
+            side.set(price, qty)
+            if qty:
+                reference[price] = qty
+            else:
+                reference.pop(price, None)
+            expected = sorted(reference.items(), reverse=is_bid)
+            assert side.best() == (expected[0] if expected else None)
+        assert side.levels(10) == expected[:10]
+        assert len(side) == len(reference)
+        assert len(side._heap) <= 2 * len(side) + 64
+
+
+def test_book_side_walks():
+    asks = BookSide(is_bid=False)
+    for price, qty in ((101.0, 1.0), (102.0, 2.0), (103.0, 4.0)):
+        asks.set(price, qty)
+    assert asks.qty_until(102.0) == 3.0
+    assert asks.vwap(2.0) == (101.0 + 102.0) / 2
+    assert asks.vwap(10.0) is None
+
+    bids = BookSide(is_bid=True)
+    for price, qty in ((100.0, 1.0), (99.0, 2.0), (98.0, 4.0)):
+        bids.set(price, qty)
+    assert bids.best() == (100.0, 1.0)
+    assert bids.qty_until(99.0) == 3.0
+
+
+def test_snapshot_replays_buffered_diffs():
+    """Diffs older than the snapshot are dropped; the first kept one must straddle lastUpdateId"""
+    book = LocalOrderBook("BTCUSDT")
+    assert book.on_depth_event(diff(90, 95, 89, bids=[("100.0", "9.0")])) is False
+    assert book.on_depth_event(diff(96, 105, 95, asks=[("101.0", "0")])) is False
+    book.load_snapshot(snapshot(100))
+    assert book.is_synced
+    assert book.last_update_id == 105
+    assert book.best_bid() == (100.0, 1.0)
+    assert book.best_ask() == (102.0, 3.0)
+
+
+def test_pu_chaining():
+    """Each diff's pu must be the previous diff's u"""
+    book = synced_book()
+    assert book.on_depth_event(diff(98, 110, 97, bids=[("100.5", "1.0")]))
+    assert book.on_depth_event(diff(111, 120, 110, bids=[("100.5", "0")], asks=[("100.8", "2.0")]))
+    assert book.is_synced
+    assert book.last_update_id == 120
+    assert book.best_bid() == (100.0, 1.0)
+    assert book.best_ask() == (100.8, 2.0)
+    assert book.mid_price() == (100.0 + 100.8) / 2
+
+
+def test_gap_requires_resync():
+    """A missed diff empties the book and asks for a new snapshot"""
+    book = synced_book()
+    assert book.on_depth_event(diff(98, 110, 97))
+    assert book.on_depth_event(diff(121, 130, 120, bids=[("100.2", "1.0")])) is False
+    assert not book.is_synced
+    assert book.needs_snapshot
+    assert book.best_bid() is None
+    assert book.levels("BUY", 5) == []
+
+    # Diffs keep being buffered until the new snapshot arrives
+    assert book.on_depth_event(diff(131, 140, 130, asks=[("101.0", "5.0")])) is False
+    book.load_snapshot(snapshot(135))
+    assert book.is_synced
+    assert book.last_update_id == 140
+    assert book.best_ask() == (101.0, 5.0)
+
+
+def test_snapshot_behind_the_diffs_resyncs():
+    """A snapshot older than every buffered diff doesn't line up and is discarded"""
+    book = LocalOrderBook("BTCUSDT")
+    book.on_depth_event(diff(120, 130, 119))
+    book.load_snapshot(snapshot(100))
+    assert not book.is_synced
+    assert book.needs_snapshot
+
+    book.load_snapshot(snapshot(125))
+    assert book.is_synced
+    assert book.last_update_id == 130
+
+
+def test_stale_diff_after_sync_is_ignored():
+    book = synced_book()
+    assert book.on_depth_event(diff(90, 99, 89, bids=[("100.0", "0")]))
+    assert book.is_synced
+    assert book.best_bid() == (100.0, 1.0)
@@ -0,0 +1,225 @@
+"""Fill and funding reconciliation against the exchange's userTrades and income history"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from octopus.database.db import configure_db, get_db, init_db
+from octopus.database.journal import PositionClosed, PositionOpened, TradeRecord, apply_events
+from octopus.database.models import Position, SyncCursor, Trade
+from octopus.database.stats import get_stats, rebuild_daily_stats
+from octopus.exchange.execution import slice_client_order_id
+from octopus.strategy import order_reconciler
+from octopus.strategy.order_reconciler import FillReconciler
+from octopus.utils.fixed_point import to_fixed
+
+T0 = datetime(2025, 3, 4, 8, 0, 0)
+T0_MS = int((T0 - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+class FakeExchange:
+    """userTrades, FUNDING_FEE income and allOrders of one symbol, paged like the API"""
+
+    def __init__(self):
+        self.fills = []
+        self.income = []
+        self.orders = []
+        self.calls = []
+
+    def get_account_trades(self, symbol, limit, fromId=None, startTime=None):
+        self.calls.append(("userTrades", fromId, startTime))
+        rows = [f for f in self.fills if (fromId is None or f['id'] >= fromId)
+                and (startTime is None or f['time'] >= startTime)]
+        return rows[:limit]
+
+    def get_income_history(self, symbol, incomeType, startTime, limit):
+        self.calls.append(("income", startTime))
+        return [e for e in self.income if e['time'] >= startTime][:limit]
+
+    def get_all_orders(self, symbol, startTime, limit):
+        return [o for o in self.orders if o['time'] >= startTime][:limit]
+
+    def fill(self, fill_id, order_id, qty="0.001", price="100000", commission="0.04", pnl="0", side="BUY",
+             position_side="LONG", minutes=0):
+        self.fills.append({
+            "id": fill_id, "orderId": order_id, "qty": qty, "price": price, "commission": commission,
+            "realizedPnl": pnl, "side": side, "positionSide": position_side,
+            "time": T0_MS + minutes * 60_000
+        })
+
+    def funding(self, tran_id, income, minutes):
+        self.income.append({"tranId": tran_id, "income": income, "time": T0_MS + minutes * 60_000})
+
+
+@pytest.fixture
+def exchange(tmp_path, monkeypatch):
+    configure_db(f"sqlite:///{tmp_path / 'reconcile.db'}")
+    init_db()
+    # Read everything, however old the test data is
+    monkeypatch.setattr(order_reconciler, "FIRST_RUN_LOOKBACK_HOURS", 24 * 365 * 100)
+    return FakeExchange()
+
+
+def record(*events):
+    with get_db() as db:
+        apply_events(db, list(events))
+
+
+def trade_row(order_id: str, client_order_id: str = None, position_side: str = "LONG", side: str = "BUY"):
+    return TradeRecord(
+        timestamp=T0, symbol="BTCUSDT", side=side, position_side=position_side, quantity=to_fixed("0.001"),
+        price=to_fixed("100000"), notional=to_fixed("100"), order_id=order_id, client_order_id=client_order_id
+    )
+
+
+def cursor(name: str):
+    with get_db() as db:
+        row = db.get(SyncCursor, name)
+        return row.last_id, row.last_time
+
+
+def test_fills_add_costs_and_advance_the_cursor(exchange):
+    record(trade_row("10"), trade_row("11", side="SELL"))
+    exchange.fill(1, 10, commission="0.02")
+    exchange.fill(2, 10, commission="0.02")
+    exchange.fill(3, 11, side="SELL", commission="0.04", pnl="1.5", minutes=1)
+    reconciler = FillReconciler(exchange, "BTCUSDT")
+
+    result = reconciler.run()
+    assert (result.fills, result.updated, result.inserted) == (3, 2, 0)
+    assert cursor("userTrades:BTCUSDT") == (3, T0_MS + 60_000)
+    with get_db() as db:
+        rows = {t.order_id: t for t in db.query(Trade).all()}
+        assert rows["10"].commission == to_fixed("0.04")
+        assert rows["11"].realized_pnl == to_fixed("1.5")
+    stats = get_stats("BTCUSDT", T0)["today"]
+    assert stats.fees == 0.08
+    assert stats.realized_pnl == 1.5
+
+    # Nothing new: reads from after the cursor and changes nothing
+    assert reconciler.run().fills == 0
+    assert exchange.calls[-2] == ("userTrades", 4, None)
+    exchange.fill(4, 11, commission="0.01", minutes=2)
+    assert reconciler.run().fills == 1
+    assert get_stats("BTCUSDT", T0)["today"].fees == 0.09
+
+
+def test_fills_are_paged(exchange, monkeypatch):
+    monkeypatch.setattr(order_reconciler, "PAGE_LIMIT", 2)
+    record(trade_row("10"))
+    for fill_id in range(1, 6):
+        exchange.fill(fill_id, 10, commission="0.01")
+    assert FillReconciler(exchange, "BTCUSDT").run().fills == 5
+    assert cursor("userTrades:BTCUSDT")[0] == 5
+    with get_db() as db:
+        assert db.query(Trade).one().commission == to_fixed("0.05")
+
+
+def test_unrecorded_orders_are_inserted_and_slices_map_to_their_parent(exchange):
+    record(trade_row("10", client_order_id="oc-parent-LC"))
+    exchange.orders = [
+        {"orderId": 20, "clientOrderId": slice_client_order_id("oc-parent-LC", 1), "time": T0_MS},
+        {"orderId": 30, "clientOrderId": "oc-lost-SB", "time": T0_MS},
+        {"orderId": 40, "clientOrderId": "manual", "time": T0_MS},
+    ]
+    exchange.fill(1, 20, commission="0.03")
+    exchange.fill(2, 30, qty="0.002", price="50000", commission="0.05", side="BUY", position_side="SHORT")
+    exchange.fill(3, 40, commission="9")
+
+    result = FillReconciler(exchange, "BTCUSDT").run()
+    assert (result.updated, result.inserted) == (1, 1)
+    with get_db() as db:
+        rows = {t.order_id: t for t in db.query(Trade).all()}
+        assert set(rows) == {"10", "30"}
+        assert rows["10"].commission == to_fixed("0.03")
+        assert rows["30"].client_order_id == "oc-lost-SB"
+        assert rows["30"].price == to_fixed("50000")
+        assert rows["30"].notional == to_fixed("100")
+    assert get_stats("BTCUSDT", T0)["today"].num_trades == 2
+
+
+def test_funding_is_split_between_open_legs(exchange):
+    record(
+        PositionOpened(opened_at=T0 - timedelta(hours=8), symbol="BTCUSDT", position_side="LONG",
+                       entry_price=to_fixed("100000"), quantity=to_fixed("0.001"), leverage=5,
+                       notional=to_fixed("100")),
+        PositionOpened(opened_at=T0 - timedelta(hours=8), symbol="BTCUSDT", position_side="SHORT",
+                       entry_price=to_fixed("100000"), quantity=to_fixed("0.001"), leverage=5,
+                       notional=to_fixed("100")),
+    )
+    exchange.funding(100, "-0.00000003", minutes=0)
+    exchange.funding(101, "0.01", minutes=0)
+
+    assert FillReconciler(exchange, "BTCUSDT").run().funding == 2
+    with get_db() as db:
+        fees = {p.position_side: p.funding_fee for p in db.query(Position).all()}
+    # Whole units: the shares add up to the payments exactly
+    assert sum(fees.values()) == to_fixed("0.01") - 3
+    assert sorted(fees.values()) == sorted([to_fixed("0.005") - 1, to_fixed("0.005") - 2])
+    assert get_stats("BTCUSDT", T0)["today"].funding == pytest.approx(0.00999997)
+    assert cursor("income:FUNDING_FEE:BTCUSDT") == (101, T0_MS)
+
+
+def test_funding_cursor_skips_entries_already_read_at_the_same_millisecond(exchange):
+    record(PositionOpened(opened_at=T0 - timedelta(hours=1), symbol="BTCUSDT", position_side="LONG",
+                          entry_price=to_fixed("100000"), quantity=to_fixed("0.001"), leverage=5,
+                          notional=to_fixed("100")))
+    exchange.funding(100, "0.5", minutes=0)
+    reconciler = FillReconciler(exchange, "BTCUSDT")
+    assert reconciler.run().funding == 1
+
+    # startTime is inclusive: the entry at the cursor's time comes back but isn't counted again
+    exchange.funding(101, "0.25", minutes=0)
+    assert reconciler.run().funding == 1
+    assert exchange.calls[-1] == ("income", T0_MS)
+    with get_db() as db:
+        assert db.query(Position).one().funding_fee == to_fixed("0.75")
+
+
+def test_funding_skips_closed_positions(exchange):
+    record(PositionOpened(opened_at=T0 - timedelta(hours=3), symbol="BTCUSDT", position_side="LONG",
+                          entry_price=to_fixed("100000"), quantity=to_fixed("0.001"), leverage=5,
+                          notional=to_fixed("100")))
+    with get_db() as db:
+        position = db.query(Position).one()
+        position.is_active = False
+        position.closed_at = T0 - timedelta(hours=1)
+    exchange.funding(100, "0.5", minutes=0)
+    assert FillReconciler(exchange, "BTCUSDT").run().funding == 1
+    with get_db() as db:
+        assert db.query(Position).one().funding_fee in (0, None)
+    # Still counted in the stats: the account was paid
+    assert get_stats("BTCUSDT", T0)["today"].funding == 0.5
+
+
+def test_rebuilt_stats_match_incremental(exchange):
+    """Trades, fills, funding and closes give the same DailyStats whether counted as they come or rebuilt"""
+    record(
+        PositionOpened(opened_at=T0 - timedelta(hours=2), symbol="BTCUSDT", position_side="LONG",
+                       entry_price=to_fixed("100000"), quantity=to_fixed("0.001"), leverage=5,
+                       notional=to_fixed("100")),
+        PositionOpened(opened_at=T0 - timedelta(hours=2), symbol="BTCUSDT", position_side="SHORT",
+                       entry_price=to_fixed("100000"), quantity=to_fixed("0.001"), leverage=5,
+                       notional=to_fixed("100")),
+        trade_row("10"), trade_row("11", position_side="SHORT", side="SELL"),
+    )
+    exchange.fill(1, 10, commission="0.04")
+    exchange.fill(2, 11, side="SELL", position_side="SHORT", commission="0.04")
+    exchange.funding(100, "0.03", minutes=0)
+    reconciler = FillReconciler(exchange, "BTCUSDT")
+    reconciler.run()
+
+    record(
+        trade_row("12", side="SELL"), trade_row("13", position_side="SHORT"),
+        PositionClosed(closed_at=T0 + timedelta(hours=1), symbol="BTCUSDT", position_side="LONG",
+                       exit_price=to_fixed("101000")),
+        PositionClosed(closed_at=T0 + timedelta(hours=1), symbol="BTCUSDT", position_side="SHORT",
+                       exit_price=to_fixed("101000")),
+    )
+    exchange.fill(3, 12, side="SELL", commission="0.05", pnl="1", minutes=60)
+    exchange.fill(4, 13, position_side="SHORT", commission="0.05", pnl="-1.2", minutes=60)
+    reconciler.run()
+
+    incremental = get_stats("BTCUSDT", T0)
+    assert incremental["today"].funding == 0.03
+    rebuild_daily_stats(force=True)
+    assert get_stats("BTCUSDT", T0) == incremental
@@ -0,0 +1,98 @@
+"""Portfolio risk limits"""
+from octopus.strategy.portfolio_risk import PortfolioRisk
+
+
+def test_drifted_pair_closes_once():
+    """A pair over both the drift and the stop limit gets a single CLOSE_PAIR"""
+    risk = PortfolioRisk(stop_loss_pct=1.0, max_drift_pct=0.8, max_drawdown_pct=5.0,
+                         funding_rate_threshold=0.05, max_margin_ratio=0.8)
+    risk.set_wallet_balance(10_000.0)
+    risk.load_positions([
+        dict(symbol="BTCUSDT", positionSide="LONG", positionAmt="1", entryPrice="100", markPrice="95"),
+        dict(symbol="BTCUSDT", positionSide="SHORT", positionAmt="-0.5", entryPrice="100", markPrice="95"),
+    ])
+    assert [(a.kind, a.symbol, a.reason) for a in risk.evaluate()] == [("CLOSE_PAIR", "BTCUSDT", "net_delta")]
+
+
+def test_hedged_price_move_does_not_stop():
+    """A 5% move costs one leg what the other gains; the pair's net PnL is flat"""
+    risk = PortfolioRisk(stop_loss_pct=1.0, max_drift_pct=0.8, max_drawdown_pct=5.0,
+                         funding_rate_threshold=0.05, max_margin_ratio=0.8)
+    risk.set_wallet_balance(10_000.0)
+    risk.load_positions([
+        dict(symbol="BTCUSDT", positionSide="LONG", positionAmt="1", entryPrice="100", markPrice="105"),
+        dict(symbol="BTCUSDT", positionSide="SHORT", positionAmt="-1", entryPrice="100", markPrice="105"),
+    ])
+    assert risk.evaluate() == []
+
+
+def test_pair_net_loss_closes_pair():
+    """Entries apart by more than the stop lose on the pair as a whole"""
+    risk = PortfolioRisk(stop_loss_pct=1.0, max_drift_pct=0.8, max_drawdown_pct=5.0,
+                         funding_rate_threshold=0.05, max_margin_ratio=0.8)
+    risk.set_wallet_balance(10_000.0)
+    risk.load_positions([
+        dict(symbol="ETHUSDT", positionSide="LONG", positionAmt="1", entryPrice="103", markPrice="100"),
+        dict(symbol="ETHUSDT", positionSide="SHORT", positionAmt="-1", entryPrice="100", markPrice="100"),
+    ])
+    actions = risk.evaluate()
+    assert [(a.kind, a.symbol, a.reason) for a in actions] == [("CLOSE_PAIR", "ETHUSDT", "stop_loss")]
+    assert actions[0].value < -1.0
+
+
+def test_unknown_balance_skips_equity_limits():
+    """No margin or drawdown action before the wallet balance is known"""
+    risk = PortfolioRisk(stop_loss_pct=1.0, max_drift_pct=0.8, max_drawdown_pct=5.0,
+                         funding_rate_threshold=0.05, max_margin_ratio=0.8)
+    risk.load_positions([
+        dict(symbol="BTCUSDT", positionSide="LONG", positionAmt="1", entryPrice="100", markPrice="100"),
+        dict(symbol="BTCUSDT", positionSide="SHORT", positionAmt="-1", entryPrice="100", markPrice="100"),
+    ])
+    assert risk.evaluate() == []
+
+    risk.set_wallet_balance(0.0)
+    assert [(a.kind, a.reason) for a in risk.evaluate()] == [("CLOSE_ALL", "margin_ratio")]
+
+
+def test_drawdown_closes_all():
+    risk = PortfolioRisk(stop_loss_pct=1.0, max_drift_pct=0.8, max_drawdown_pct=5.0,
+                         funding_rate_threshold=0.05, max_margin_ratio=0.8)
+    risk.load_positions([
+        dict(symbol="BTCUSDT", positionSide="LONG", positionAmt="1", entryPrice="100", markPrice="100"),
+        dict(symbol="BTCUSDT", positionSide="SHORT", positionAmt="-1", entryPrice="100", markPrice="100"),
+    ])
+    risk.set_wallet_balance(10_000.0)
+    assert risk.evaluate() == []
+    assert risk.peak_equity == 10_000.0
+
+    risk.set_wallet_balance(9_000.0)
+    actions = risk.evaluate()
+    assert [(a.kind, a.reason) for a in actions] == [("CLOSE_ALL", "drawdown")]
+    assert actions[0].value == 10.0
+
+    # Once halted, the next tick below the peak doesn't close everything again
+    risk.halt()
+    risk.update_mark("BTCUSDT", 100.0)
+    assert risk.evaluate() == []
+
+    # Reset measures the drawdown from the current equity
+    risk.reset_halt()
+    assert risk.evaluate() == []
+    assert risk.peak_equity == 9_000.0
+    risk.set_wallet_balance(8_000.0)
+    assert [(a.kind, a.reason) for a in risk.evaluate()] == [("CLOSE_ALL", "drawdown")]
+
+
+def test_funding_rate_alert():
+    risk = PortfolioRisk(stop_loss_pct=1.0, max_drift_pct=0.8, max_drawdown_pct=5.0,
+                         funding_rate_threshold=0.05, max_margin_ratio=0.8)
+    risk.set_wallet_balance(10_000.0)
+    risk.load_positions([
+        dict(symbol="BTCUSDT", positionSide="LONG", positionAmt="1", entryPrice="100", markPrice="100"),
+        dict(symbol="BTCUSDT", positionSide="SHORT", positionAmt="-1", entryPrice="100", markPrice="100"),
+    ])
+    risk.update_mark("BTCUSDT", 100.0, funding_rate=0.001)
+    assert [(a.kind, a.symbol, a.reason) for a in risk.evaluate()] == [("ALERT", "BTCUSDT", "funding_rate")]
+    # Only symbols with open positions are reported
+    risk.update_mark("ETHUSDT", 100.0, funding_rate=0.001)
+    assert len(risk.evaluate()) == 1
@@ -0,0 +1,100 @@
+"""Client-side request weight and order count limiter"""
+from octopus.exchange.aster.rate_limiter import RateLimiter
+
+LIMITS = [
+    {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": 100},
+    {"rateLimitType": "ORDERS", "interval": "SECOND", "intervalNum": 10, "limit": 10},
+]
+
+
+class FakeClock:
+    def __init__(self, t: float = 999_980.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def make_limiter(clock: FakeClock) -> RateLimiter:
+    return RateLimiter(LIMITS, safety_margin=0.9, clock=clock)
+
+
+def test_endpoint_costs():
+    limiter = make_limiter(FakeClock())
+    assert limiter.cost("GET", "/fapi/v1/depth", {"limit": 1000}) == (20, 0)
+    assert limiter.cost("GET", "/fapi/v1/depth?limit=50") == (2, 0)
+    assert limiter.cost("GET", "/fapi/v1/ticker/price") == (2, 0)
+    assert limiter.cost("GET", "/fapi/v1/ticker/price", {"symbol": "BTCUSDT"}) == (1, 0)
+    assert limiter.cost("POST", "/fapi/v1/order") == (1, 1)
+    assert limiter.cost("POST", "/fapi/v1/batchOrders", {"batchOrders": [{}, {}, {}]}) == (5, 3)
+    assert limiter.cost("GET", "/fapi/v1/unlisted") == (1, 0)
+
+
+def test_weight_window_rolls_over():
+    """Requests past the safety margin wait until the minute window rolls over"""
+    clock = FakeClock(999_980.0)  # 20s into a minute window
+    limiter = make_limiter(clock)
+    for _ in range(4):
+        assert limiter.reserve("GET", "/fapi/v1/depth", {"limit": 1000}) == 0
+    assert limiter.usage()["x-mbx-used-weight-1m"] == (80, 100)
+    # 80 + 20 would exceed the 90 budget: wait the remaining 40s of the window
+    assert limiter.reserve("GET", "/fapi/v1/depth", {"limit": 1000}) == 40.0
+    assert limiter.reserve("GET", "/fapi/v1/time") == 0
+
+    clock.t = 1_000_020.0
+    assert limiter.reserve("GET", "/fapi/v1/depth", {"limit": 1000}) == 0
+    assert limiter.usage()["x-mbx-used-weight-1m"] == (20, 100)
+
+
+def test_order_window_only_counts_orders():
+    clock = FakeClock(1_000_000.0)
+    limiter = make_limiter(clock)
+    for _ in range(9):
+        assert limiter.reserve("POST", "/fapi/v1/order") == 0
+    assert limiter.reserve("POST", "/fapi/v1/order") == 10.0
+    assert limiter.reserve("GET", "/fapi/v2/positionRisk") == 0
+    clock.t += 10
+    assert limiter.reserve("POST", "/fapi/v1/order") == 0
+
+
+def test_server_usage_headers_raise_local_count():
+    """Weight used by other processes on the same IP counts too"""
+    clock = FakeClock(1_000_000.0)
+    limiter = make_limiter(clock)
+    limiter.reserve("GET", "/fapi/v1/time")
+    limiter.update({"X-MBX-USED-WEIGHT-1M": "86", "Content-Type": "application/json"})
+    assert limiter.usage()["x-mbx-used-weight-1m"] == (86, 100)
+    # 40s into the window: 86 + 5 is over the budget of 90
+    assert limiter.reserve("GET", "/fapi/v2/account") == 20.0
+    # A lower server count never lowers local usage
+    limiter.update({"x-mbx-used-weight-1m": "10"})
+    assert limiter.usage()["x-mbx-used-weight-1m"] == (86, 100)
+
+
+def test_retry_after_blocks_every_request():
+    clock = FakeClock(1_000_000.0)
+    limiter = make_limiter(clock)
+    limiter.on_rate_limited(429, {"Retry-After": "7"})
+    assert limiter.blocked_for == 7.0
+    assert limiter.reserve("GET", "/fapi/v1/time") == 7.0
+    clock.t += 7
+    assert limiter.blocked_for == 0
+    assert limiter.reserve("GET", "/fapi/v1/time") == 0
+
+
+def test_rate_limited_without_retry_after_waits_for_shortest_window():
+    clock = FakeClock(1_000_003.0)
+    limiter = make_limiter(clock)
+    limiter.on_rate_limited(418, {})
+    # The 10s order window rolls over first
+    assert limiter.blocked_for == 7.0
+
+
+def test_exchange_info_replaces_limits():
+    limiter = make_limiter(FakeClock())
+    limiter.load_exchange_info({"rateLimits": [
+        {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": 2400},
+    ]})
+    assert set(limiter.usage()) == {"x-mbx-used-weight-1m"}
+    limiter.load_exchange_info({})
+    assert set(limiter.usage()) == {"x-mbx-used-weight-1m"}
@@ -0,0 +1,96 @@
+"""Deadline scheduler on a simulated clock"""
+import threading
+
+from octopus.utils.scheduler import Scheduler, SimulatedClock
+
+
+def make_scheduler():
+    clock = SimulatedClock()
+    return Scheduler(clock=clock), clock
+
+
+def test_fixed_rate_does_not_drift():
+    """A periodic callback taking 3s still runs at 0, 10, 20, ...; run_until advances to each deadline"""
+    scheduler, clock = make_scheduler()
+    runs = []
+
+    def cycle():
+        runs.append(clock.now())
+        clock.advance_to(clock.now() + 3)
+
+    scheduler.every(10, cycle)
+    scheduler.run_until(45)
+    assert runs == [0, 10, 20, 30, 40]
+    assert clock.now() == 45
+
+
+def test_overrun_skips_missed_periods():
+    """A run overrunning two periods is followed by one late run, not one per missed period"""
+    scheduler, clock = make_scheduler()
+    runs = []
+
+    def slow():
+        runs.append(clock.now())
+        if len(runs) == 2:
+            clock.advance_to(clock.now() + 25)
+
+    scheduler.every(10, slow)
+    scheduler.run_until(60)
+    assert runs == [0, 10, 35, 40, 50, 60]
+
+
+def test_one_shot_timers_run_in_deadline_order():
+    scheduler, clock = make_scheduler()
+    order = []
+    scheduler.call_later(5, lambda: order.append(("b", clock.now())))
+    scheduler.call_at(2, lambda: order.append(("a", clock.now())))
+    cancelled = scheduler.call_later(3, lambda: order.append(("cancelled", clock.now())))
+    scheduler.every(4, lambda: order.append(("tick", clock.now())), delay=4)
+    cancelled.cancel()
+    assert scheduler.pending() == 3
+    scheduler.run_until(8)
+    assert order == [("a", 2), ("tick", 4), ("b", 5), ("tick", 8)]
+
+
+def test_callbacks_can_schedule_more_work():
+    """A posted callback runs at the current time; a failing one doesn't stop the loop"""
+    scheduler, clock = make_scheduler()
+    seen = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    def first():
+        scheduler.post(lambda: seen.append(("posted", clock.now())))
+        scheduler.call_later(1, lambda: seen.append(("later", clock.now())))
+
+    scheduler.call_at(3, boom)
+    scheduler.call_at(3, first)
+    scheduler.run_until(10)
+    assert seen == [("posted", 3), ("later", 4)]
+
+
+def test_emit_runs_handlers_on_the_scheduler():
+    scheduler, _ = make_scheduler()
+    received = []
+    scheduler.on("fill", lambda payload: received.append(("a", payload)))
+    scheduler.on("fill", lambda payload: received.append(("b", payload)))
+    scheduler.emit("fill", 42)
+    scheduler.emit("unknown", 1)
+    assert received == []
+    scheduler.run_until(0)
+    assert received == [("a", 42), ("b", 42)]
+
+
+def test_run_forever_wakes_for_posted_work():
+    """The real-time loop sleeps until the next deadline and wakes up when work is posted"""
+    scheduler = Scheduler()
+    done = threading.Event()
+    thread = threading.Thread(target=scheduler.run_forever, daemon=True)
+    thread.start()
+    scheduler.call_later(3600, lambda: None)
+    scheduler.post(done.set)
+    assert done.wait(2)
+    scheduler.stop()
+    thread.join(2)
+    assert not thread.is_alive()
@@ -0,0 +1,57 @@
+"""Columnar market data store"""
+import os
+
+import numpy as np
+
+from octopus.data.store import SCHEMAS, ColumnStore
+
+
+def mark_rows(*rows) -> np.ndarray:
+    """(time, price) pairs as mark rows"""
+    return np.array([(t, price, price, 0.0001, 0) for t, price in rows], dtype=SCHEMAS["mark"])
+
+
+def test_append_and_read(tmp_path):
+    """Rows come back per column, split by UTC day"""
+    store = ColumnStore(str(tmp_path))
+    store.append("BTCUSDT", "mark", mark_rows((1000, 1.0), (86_400_000, 2.0)))
+    data = store.read("BTCUSDT", "mark")
+    assert data["time"].tolist() == [1000, 86_400_000]
+    assert data["price"].tolist() == [1.0, 2.0]
+    assert [day for day, _ in store.segments("BTCUSDT", "mark")] == ["19700101", "19700102"]
+
+
+def test_torn_append_is_truncated(tmp_path):
+    """A column left one row longer by a crash is cut back before the next append"""
+    store = ColumnStore(str(tmp_path))
+    store.append("BTCUSDT", "mark", mark_rows((1000, 1.0), (2000, 2.0)))
+    store.close()
+    with open(os.path.join(str(tmp_path), "BTCUSDT", "mark", "19700101", "time.bin"), "ab") as f:
+        f.write(np.array([3000], dtype="<i8").tobytes())
+
+    store = ColumnStore(str(tmp_path))
+    store.append("BTCUSDT", "mark", mark_rows((4000, 4.0)))
+    data = store.read("BTCUSDT", "mark")
+    assert data["time"].tolist() == [1000, 2000, 4000]
+    assert data["price"].tolist() == [1.0, 2.0, 4.0]
+    assert data["index_price"].tolist() == [1.0, 2.0, 4.0]
+    assert store.segments("BTCUSDT", "mark")[0][1]["rows"] == 3
+
+
+def test_torn_append_with_open_files(tmp_path):
+    """The same store instance also realigns columns written behind its back"""
+    store = ColumnStore(str(tmp_path))
+    store.append("BTCUSDT", "mark", mark_rows((1000, 1.0), (2000, 2.0)))
+    with open(os.path.join(str(tmp_path), "BTCUSDT", "mark", "19700101", "time.bin"), "ab") as f:
+        f.write(np.array([3000], dtype="<i8").tobytes())
+    store.append("BTCUSDT", "mark", mark_rows((4000, 4.0)))
+    data = store.read("BTCUSDT", "mark")
+    assert data["time"].tolist() == [1000, 2000, 4000]
+    assert data["price"].tolist() == [1.0, 2.0, 4.0]
+
+
+def test_older_rows_are_dropped(tmp_path):
+    store = ColumnStore(str(tmp_path))
+    store.append("BTCUSDT", "mark", mark_rows((2000, 2.0)))
+    store.append("BTCUSDT", "mark", mark_rows((1000, 1.0), (3000, 3.0)))
+    assert store.read("BTCUSDT", "mark")["time"].tolist() == [2000, 3000]